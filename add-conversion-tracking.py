@@ -1,104 +1,233 @@
 #!/usr/bin/env python3
 """
 Add conversion tracking and GTM to all HTML files
+
+Usage: python3 add-conversion-tracking.py [--jobs N] [--force] [--mode stream|soup] [--parser lxml]
+                                          [--gtm-load eager|interaction|idle]
+
+The GTM loader and the conversion events (click_phone, click_whatsapp,
+form_submit) live in assets/js/tracking.js. The script minifies and
+fingerprints it, then puts a single deferred tag in every page's <head>:
+
+    <script defer src="/assets/js/tracking.<hash>.min.js" data-gtm-id="GTM-XXXXX" data-gtm-load="eager"></script>
+
+plus the GTM <noscript> iframe at the start of <body>. --gtm-load
+interaction/idle loads GTM on the first user interaction or when the
+browser is idle instead of right after parsing; events that happen
+before wait in dataLayer. They are lost if the page is left before GTM
+has loaded: with interaction/idle, a click_phone or click_whatsapp whose
+click navigates away (tel:, wa.me in the same tab) on a page where GTM
+is not loaded yet is not counted. Keep eager when those conversions
+matter more than the deferred GTM load. The load mode is part of the
+conversion-tracking pass version, so changing it updates every page.
+Pages with the inline snippets of earlier
+versions of this script are migrated, and a tag with another GTM ID or
+load mode is updated.
+
+The default stream mode only inserts the snippets and copies every other
+byte of the page unchanged; --mode soup re-serializes through
+BeautifulSoup like the original version of this script.
 """
 
+import argparse
 import os
+import re
+from functools import partial
 from pathlib import Path
-from bs4 import BeautifulSoup
+
+from sitetools.assets import MANIFEST_PATH, fingerprint_assets, load_manifest, logical_url, save_manifest
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.jsmin import JSSyntaxError, check_equivalent, minify_js
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.parsing import add_parser_argument, parse_fragment, parse_html, set_backend
+from sitetools.pipeline import PASSES, register_pass
+from sitetools.rewriter import HTMLRewriter, file_contains
 
 ROOT_DIR = Path(".")
+TRACKING_SOURCE = ROOT_DIR / "assets" / "js" / "tracking.js"
+TRACKING_SCRIPT = '/assets/js/tracking.min.js'
 
-# GTM snippet (replace GTM-XXXXX with your actual GTM ID)
-GTM_HEAD = """<!-- Google Tag Manager -->
-<script>(function(w,d,s,l,i){w[l]=w[l]||[];w[l].push({'gtm.start':
-new Date().getTime(),event:'gtm.js'});var f=d.getElementsByTagName(s)[0],
-j=d.createElement(s),dl=l!='dataLayer'?'&l='+l:'';j.async=true;j.src=
-'https://www.googletagmanager.com/gtm.js?id='+i+dl;f.parentNode.insertBefore(j,f);
-})(window,document,'script','dataLayer','GTM-XXXXX');</script>
-<!-- End Google Tag Manager -->"""
-
-GTM_BODY = """<!-- Google Tag Manager (noscript) -->
-<noscript><iframe src="https://www.googletagmanager.com/ns.html?id=GTM-XXXXX"
+# Replace GTM-XXXXX with your actual GTM ID
+GTM_ID = 'GTM-XXXXX'
+
+# When tracking.js loads GTM: eager, interaction or idle (--gtm-load;
+# an environment variable so worker processes inherit it)
+GTM_LOAD = 'eager'
+GTM_LOAD_MODES = ('eager', 'interaction', 'idle')
+GTM_LOAD_ENV = 'SITE_GTM_LOAD'
+
+TRACKING_TAG = '<script defer src="{src}" data-gtm-id="{gtm_id}" data-gtm-load="{load}"></script>'
+
+GTM_BODY = f"""<!-- Google Tag Manager (noscript) -->
+<noscript><iframe src="https://www.googletagmanager.com/ns.html?id={GTM_ID}"
 height="0" width="0" style="display:none;visibility:hidden"></iframe></noscript>
 <!-- End Google Tag Manager (noscript) -->"""
 
-# Conversion tracking script
-CONVERSION_SCRIPT = """<script>
-// Conversion tracking events
-(function() {
-  const dataLayer = window.dataLayer || [];
-
-  // Track phone clicks
-  document.addEventListener('click', function(e) {
-    const phoneLink = e.target.closest('a[href^="tel:"]');
-    if (phoneLink) {
-      dataLayer.push({
-        'event': 'click_phone',
-        'phone_number': phoneLink.getAttribute('href'),
-        'page_path': window.location.pathname,
-        'page_title': document.title
-      });
-    }
-
-    // Track WhatsApp clicks
-    const waLink = e.target.closest('a[href*="wa.me"]');
-    if (waLink) {
-      dataLayer.push({
-        'event': 'click_whatsapp',
-        'page_path': window.location.pathname,
-        'page_title': document.title
-      });
-    }
-  });
-
-  // Track form submissions
-  const forms = document.querySelectorAll('form');
-  forms.forEach(form => {
-    form.addEventListener('submit', function(e) {
-      dataLayer.push({
-        'event': 'form_submit',
-        'form_id': this.id || 'unknown',
-        'page_path': window.location.pathname
-      });
-    });
-  });
-})();
-</script>"""
-
-def add_tracking(filepath):
-    """Add GTM and conversion tracking to HTML file"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+NOSCRIPT_MARKER = 'googletagmanager.com/ns.html'
 
-    # Check if GTM already exists
-    if soup.find(string=lambda text: 'googletagmanager.com/gtm.js' in text if text else False):
-        return False
+# Inline snippets written by earlier versions of this script
+LEGACY_MARKERS = ('googletagmanager.com/gtm.js', '// Conversion tracking events')
+LEGACY_RE = re.compile(r'<!-- Google Tag Manager -->\s*<script>.*?</script>\s*<!-- End Google Tag Manager -->\s*'
+                       r'|<script>\s*// Conversion tracking events.*?</script>\s*', re.S)
 
-    # Add GTM to <head>
-    head = soup.find('head')
-    if head:
-        gtm_head_tag = BeautifulSoup(GTM_HEAD, 'html.parser')
-        head.insert(0, gtm_head_tag)
+_tracking_src = None
+
+def gtm_load():
+    return os.environ.get(GTM_LOAD_ENV) or GTM_LOAD
+
+def tracking_src():
+    """URL of tracking.min.js, fingerprinted if minify-assets.py or main() hashed it"""
+    global _tracking_src
+    if _tracking_src is None:
+        _tracking_src = load_manifest().get(TRACKING_SCRIPT, TRACKING_SCRIPT)
+    return _tracking_src
+
+def tracking_attrs():
+    return {'src': tracking_src(), 'data-gtm-id': GTM_ID, 'data-gtm-load': gtm_load()}
+
+def tracking_tag():
+    attrs = tracking_attrs()
+    return TRACKING_TAG.format(src=attrs['src'], gtm_id=attrs['data-gtm-id'], load=attrs['data-gtm-load'])
+
+def is_tracking_script(src):
+    return logical_url(src or '') == TRACKING_SCRIPT
+
+def remove_legacy_snippets(text):
+    """Drop the inline GTM loader and conversion script of earlier versions"""
+    if not any(marker in text for marker in LEGACY_MARKERS):
+        return text
+    return LEGACY_RE.sub('', text)
+
+def insert_tracking(soup):
+    """Add or update the tracking tag and the GTM noscript in a parsed page, return True if changed"""
+    changed = False
+    wanted = tracking_attrs()
+
+    existing = soup.find('script', src=is_tracking_script)
+    if existing is not None:
+        if any(existing.get(name) != value for name, value in wanted.items()):
+            existing.attrs.update(wanted)
+            existing.attrs['defer'] = ''
+            changed = True
+    else:
+        head = soup.find('head')
+        if head:
+            head.append(parse_fragment(tracking_tag()))
+            changed = True
 
     # Add GTM noscript to <body>
     body = soup.find('body')
-    if body:
-        gtm_body_tag = BeautifulSoup(GTM_BODY, 'html.parser')
-        body.insert(0, gtm_body_tag)
+    if body and not soup.find('iframe', src=lambda src: src and NOSCRIPT_MARKER in src):
+        body.insert(0, parse_fragment(GTM_BODY))
+        changed = True
+
+    return changed
+
+def tracking_rewriter(add_noscript=True):
+    """Streaming equivalent of insert_tracking: hooks on the tracking <script>, </head> and the first <body>"""
+    rewriter = HTMLRewriter()
+    done = set()
+    wanted = tracking_attrs()
 
-    # Add conversion tracking script before </body>
-    if body:
-        tracking_script = BeautifulSoup(CONVERSION_SCRIPT, 'html.parser')
-        body.append(tracking_script)
+    def script_start(tag):
+        if 'script' in done or not is_tracking_script(tag.attrs.get('src')):
+            return
+        done.add('script')
+        if any(tag.attrs.get(name) != value for name, value in wanted.items()):
+            tag.replace(tracking_tag()[:-len('</script>')])
+
+    def head_end(tag):
+        if 'script' not in done:
+            done.add('script')
+            tag.before(tracking_tag())
+
+    def body_start(tag):
+        if add_noscript and 'body' not in done:
+            done.add('body')
+            tag.after(GTM_BODY)
+
+    rewriter.on_start_tag('script', script_start)
+    rewriter.on_end_tag('head', head_end)
+    rewriter.on_start_tag('body', body_start)
+    return rewriter
+
+def add_tracking_text(text):
+    """Page text with the tracking tag added or updated"""
+    text = remove_legacy_snippets(text)
+    return tracking_rewriter(NOSCRIPT_MARKER not in text).rewrite_string(text)
+
+@register_pass('conversion-tracking', kind='text',
+               depends=['sitetools/rewriter.py', 'assets/manifest.json', 'assets/js/tracking.js'],
+               settings=lambda: [gtm_load()])
+def conversion_tracking_pass(doc):
+    """Pipeline pass: streaming insertion on the shared document text"""
+    content = add_tracking_text(doc.text)
+    if content == doc.text:
+        return []
+    doc.text = content
+    return ["Tracking added"]
+
+def add_tracking(filepath, mode='stream'):
+    """Add GTM and conversion tracking to HTML file (also runs in worker processes with --jobs)"""
+    if mode == 'stream' and not any(file_contains(filepath, marker) for marker in LEGACY_MARKERS):
+        return tracking_rewriter(not file_contains(filepath, NOSCRIPT_MARKER)).rewrite_file(filepath)
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        original = f.read()
+
+    if mode == 'stream':
+        content = add_tracking_text(original)
+    else:
+        content = remove_legacy_snippets(original)
+        soup = parse_html(content)
+        if insert_tracking(soup) or content != original:
+            content = str(soup)
+
+    if content == original:
+        return False
 
     # Write back
     with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(str(soup))
+        f.write(content)
 
     return True
 
+def build_tracking_script():
+    """Minify tracking.js and fingerprint it; returns the URL pages should load, None on error"""
+    source = TRACKING_SOURCE.read_text(encoding='utf-8')
+    try:
+        minified = minify_js(source)
+        check_equivalent(source, minified)
+    except (JSSyntaxError, AssertionError) as e:
+        print(f"  ❌ {TRACKING_SOURCE.name}: {e}")
+        return None
+
+    TRACKING_SOURCE.with_suffix('.min.js').write_text(minified, encoding='utf-8')
+    manifest = fingerprint_assets(previous=load_manifest())
+    save_manifest(manifest)
+    return manifest.get(TRACKING_SCRIPT, TRACKING_SCRIPT)
+
 def main():
+    global _tracking_src
+
+    parser = argparse.ArgumentParser(description="Add GTM and conversion tracking to every page")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    parser.add_argument('--mode', choices=['stream', 'soup'], default='stream',
+                        help="stream: insert without re-serializing (default); soup: full BeautifulSoup round-trip")
+    parser.add_argument('--gtm-load', choices=GTM_LOAD_MODES,
+                        help=f"When to load GTM: right after parsing, on first interaction or when idle "
+                             f"(default: {GTM_LOAD}; with interaction/idle, phone and WhatsApp clicks that "
+                             f"leave the page before GTM has loaded are not counted)")
+    add_parser_argument(parser)
+    args = parser.parse_args()
+
+    if args.parser:
+        set_backend(args.parser)
+    if args.gtm_load:
+        os.environ[GTM_LOAD_ENV] = args.gtm_load
+
     print("🚀 Adding conversion tracking...")
     print()
     print("⚠️  IMPORTANT: Replace 'GTM-XXXXX' with your actual Google Tag Manager ID")
@@ -110,17 +239,29 @@ def main():
         print("❌ Aborted. Please update GTM ID first.")
         return
 
-    html_files = list(ROOT_DIR.rglob("*.html"))
+    print("📄 Building the tracking script...")
+    _tracking_src = build_tracking_script()
+    if _tracking_src is None:
+        return
+    print(f"  ✅ {_tracking_src} (GTM loaded: {gtm_load()}), manifest saved to {MANIFEST_PATH}")
+    print()
+
+    html_files = select_pages()
     processed = 0
 
-    for filepath in html_files:
-        if 'backup-original' in str(filepath):
-            continue
+    cache = BuildCache()
+    version = PASSES['conversion-tracking'].version
+    if not args.force:
+        html_files = cache.stale('conversion-tracking', version, html_files)
 
-        if add_tracking(filepath):
+    for filepath, added in map_files(partial(add_tracking, mode=args.mode), html_files, args.jobs):
+        cache.record('conversion-tracking', version, filepath)
+        if added:
             processed += 1
             print(f"✅ {filepath}")
 
+    cache.save()
+
     print()
     print(f"✅ Done! Added tracking to {processed} files")
     print()
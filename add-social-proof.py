@@ -5,13 +5,24 @@ Data from Studio 4e:
 - 50+ progetti in Sicilia
 - Attivo dal 2002 (20+ anni)
 - Rating 4.5-5.0 stelle su Houzz/Google
+
+Usage: python3 add-social-proof.py [--jobs N] [--force] [--parser lxml]
 """
 
+import argparse
 import os
 from pathlib import Path
-from bs4 import BeautifulSoup
 import re
 
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.classify import PAGE_CATEGORY_RULES, Classifier
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.cta import CTA_STYLESHEET, write_cta_css
+from sitetools.parsing import add_parser_argument, parse_html, set_backend, template_fragment
+from sitetools.pipeline import PASSES, register_pass
+from sitetools.site import is_homepage
+
 ROOT_DIR = Path(".")
 
 # Social proof data
@@ -24,75 +35,68 @@ SOCIAL_PROOF = {
     'citta': 'Palermo'
 }
 
-# CTA templates by page category
+# CTA templates by page category (styled by the classes in sitetools/cta.py)
 CTA_TEMPLATES = {
     'sanatoria': """<div class="notice cta-urgent">
 <strong>🚨 Rogito bloccato o immobile irregolare?</strong>
 <p>Studio 4e segue pratiche in sanatoria da oltre 20 anni. <strong>Prima consulenza telefonica gratuita</strong> per valutare il tuo caso.</p>
-<p style="margin-top:12px">
-<a class="btn" href="tel:+393299736697" style="font-size:16px">📞 Chiama ora: +39 329 973 6697</a>
-<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20ho%20un%20problema%20di%20regolarit%C3%A0%20urbanistica.%20Posso%20raccontarti%20il%20caso%3F" style="margin-left:10px">WhatsApp</a>
+<p class="cta-actions">
+<a class="btn cta-call" href="tel:+393299736697">📞 Chiama ora: +39 329 973 6697</a>
+<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20ho%20un%20problema%20di%20regolarit%C3%A0%20urbanistica.%20Posso%20raccontarti%20il%20caso%3F">WhatsApp</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • 50+ progetti seguiti in Sicilia</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • 50+ progetti seguiti in Sicilia</p>
 </div>""",
 
     'ristrutturazione': """<div class="notice cta-standard">
 <strong>Stai pianificando una ristrutturazione?</strong>
 <p>Studio 4e a Palermo dal 2002. <strong>Preventivo e primo confronto gratuiti</strong>. Sopralluogo, progetto, pratiche e direzione lavori.</p>
-<p style="margin-top:12px">
+<p class="cta-actions">
 <a class="btn" href="tel:+393299736697">📞 Chiama: +39 329 973 6697</a>
-<a class="btn secondary" href="/inizia-da-qui/" style="margin-left:10px">Inizia da qui</a>
+<a class="btn secondary" href="/inizia-da-qui/">Inizia da qui</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • 20+ anni di esperienza</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • 20+ anni di esperienza</p>
 </div>""",
 
     'pratiche': """<div class="notice cta-standard">
 <strong>Serve chiarezza sulle pratiche edilizie?</strong>
 <p>CILA, SCIA, permessi, varianti. Studio 4e verifica lo stato legittimo e segue l'iter completo. <strong>Prima valutazione telefonica gratuita</strong>.</p>
-<p style="margin-top:12px">
+<p class="cta-actions">
 <a class="btn" href="tel:+393299736697">📞 Chiama: +39 329 973 6697</a>
-<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20devo%20capire%20che%20pratica%20edilizia%20serve%20per%20il%20mio%20progetto." style="margin-left:10px">WhatsApp</a>
+<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20devo%20capire%20che%20pratica%20edilizia%20serve%20per%20il%20mio%20progetto.">WhatsApp</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • Studio a Palermo dal 2002</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • Studio a Palermo dal 2002</p>
 </div>""",
 
     'default': """<div class="notice cta-standard">
 <strong>Hai bisogno di supporto tecnico?</strong>
 <p>Studio 4e a Palermo dal 2002. Progettazione, pratiche edilizie, direzione lavori. <strong>Prima consulenza telefonica gratuita</strong> per inquadrare il tuo caso.</p>
-<p style="margin-top:12px">
+<p class="cta-actions">
 <a class="btn" href="tel:+393299736697">📞 Chiama: +39 329 973 6697</a>
-<a class="btn secondary" href="/inizia-da-qui/" style="margin-left:10px">Inizia da qui</a>
+<a class="btn secondary" href="/inizia-da-qui/">Inizia da qui</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • 50+ progetti in Sicilia • 20+ anni di esperienza</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • 50+ progetti in Sicilia • 20+ anni di esperienza</p>
 </div>"""
 }
 
 # Homepage hero social proof
-HOMEPAGE_SOCIAL_PROOF = """<div class="social-proof-badges" style="display:flex; gap:12px; flex-wrap:wrap; margin-top:12px">
-<span class="badge" style="font-weight:600">⭐ 4.8/5 su Houzz</span>
-<span class="badge" style="font-weight:600">50+ progetti</span>
-<span class="badge" style="font-weight:600">Dal 2002 a Palermo</span>
+HOMEPAGE_SOCIAL_PROOF = """<div class="social-proof-badges">
+<span class="badge">⭐ 4.8/5 su Houzz</span>
+<span class="badge">50+ progetti</span>
+<span class="badge">Dal 2002 a Palermo</span>
 </div>"""
 
-def detect_page_category(filepath, soup):
-    """Detect page category based on URL and content"""
-    path_str = str(filepath).lower()
-    title = soup.find('title')
-    title_text = title.get_text().lower() if title else ""
-
-    # Check for urgent keywords (sanatoria, regolarità, rogito)
-    if any(word in path_str or word in title_text for word in ['sanatoria', 'regolarit', 'rogito', 'vincoli', 'verifica-stato-legittimo']):
-        return 'sanatoria'
-
-    # Check for renovation keywords
-    if any(word in path_str or word in title_text for word in ['ristrutturazione', 'appartamento', 'villa', 'interni']):
-        return 'ristrutturazione'
+# Phone box under the H1 of guide pages
+PHONE_CTA = """<div class="phone-cta">
+<p>📞 Hai un caso urgente? <a href="tel:+393299736697">Chiama ora: +39 329 973 6697</a></p>
+</div>"""
 
-    # Check for permits/practices
-    if any(word in path_str or word in title_text for word in ['cila', 'scia', 'permess', 'pratica', 'autorizzazioni']):
-        return 'pratiche'
+PAGE_CATEGORIES = Classifier(PAGE_CATEGORY_RULES, fields=('path', 'title'))
 
-    return 'default'
+def detect_page_category(filepath, soup):
+    """Detect page category based on URL and title"""
+    title = soup.find('title')
+    title_text = title.get_text() if title else ""
+    return PAGE_CATEGORIES.classify(default='default', path=str(filepath), title=title_text)
 
 def add_social_proof_to_homepage(soup):
     """Add social proof badges to homepage hero"""
@@ -109,8 +113,7 @@ def add_social_proof_to_homepage(soup):
     # Find badges section and insert after it
     badges = hero.find('div', class_='badges')
     if badges:
-        social_proof = BeautifulSoup(HOMEPAGE_SOCIAL_PROOF, 'html.parser')
-        badges.insert_after(social_proof)
+        badges.insert_after(template_fragment(HOMEPAGE_SOCIAL_PROOF))
         return True
 
     return False
@@ -125,8 +128,7 @@ def replace_cta_box(soup, category):
         strong = notice.find('strong')
         if strong and 'Contatta' in strong.get_text():
             # Replace with new CTA
-            new_cta = BeautifulSoup(CTA_TEMPLATES[category], 'html.parser')
-            notice.replace_with(new_cta)
+            notice.replace_with(template_fragment(CTA_TEMPLATES[category]))
             replaced = True
             break  # Only replace first occurrence
 
@@ -149,26 +151,16 @@ def add_phone_to_article_top(soup):
         return False
 
     # Add phone CTA after H1
-    phone_cta = """<div class="phone-cta" style="margin:14px 0; padding:12px; background:rgba(122,29,82,0.08); border-left:4px solid #7a1d52; border-radius:12px">
-<p style="margin:0; font-size:14px; font-weight:600">📞 Hai un caso urgente? <a href="tel:+393299736697" style="color:#7a1d52; font-weight:700">Chiama ora: +39 329 973 6697</a></p>
-</div>"""
-
-    phone_tag = BeautifulSoup(phone_cta, 'html.parser')
-    h1.insert_after(phone_tag)
+    h1.insert_after(template_fragment(PHONE_CTA))
 
     return True
 
-def process_file(filepath):
-    """Process single HTML file"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
-
+def apply_social_proof(filepath, soup):
+    """Apply social proof and CTA changes to a parsed page, return list of changes"""
     changes = []
 
     # Check if homepage
-    is_homepage = 'index.html' in str(filepath) and str(filepath).count('/') <= 1
-
-    if is_homepage:
+    if is_homepage(filepath, ROOT_DIR):
         if add_social_proof_to_homepage(soup):
             changes.append("Homepage social proof added")
 
@@ -185,6 +177,20 @@ def process_file(filepath):
         if add_phone_to_article_top(soup):
             changes.append("Phone CTA added")
 
+    return changes
+
+@register_pass('social-proof', kind='soup', depends=['sitetools/classify.py', 'sitetools/cta.py'])
+def social_proof_pass(doc):
+    """Pipeline pass: same changes as process_file on a shared document"""
+    return apply_social_proof(doc.path, doc.soup)
+
+def process_file(filepath):
+    """Process single HTML file (also runs in worker processes with --jobs)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        soup = parse_html(f.read())
+
+    changes = apply_social_proof(filepath, soup)
+
     # Write back if changes made
     if changes:
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -194,6 +200,15 @@ def process_file(filepath):
     return False, []
 
 def main():
+    parser = argparse.ArgumentParser(description="Add social proof and category CTAs")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    add_parser_argument(parser)
+    args = parser.parse_args()
+
+    if args.parser:
+        set_backend(args.parser)
+
     print("🚀 Adding social proof and optimizing CTAs...")
     print()
     print("Data being added:")
@@ -202,15 +217,21 @@ def main():
     print(f"  • Dal 2002 a Palermo (20+ anni)")
     print()
 
-    html_files = list(ROOT_DIR.rglob("*.html"))
+    if write_cta_css():
+        print(f"🎨 CTA rules written to {CTA_STYLESHEET}: run minify-assets.py")
+        print()
+
+    html_files = select_pages()
     processed = 0
     total_changes = {}
 
-    for filepath in html_files:
-        if 'backup-original' in str(filepath):
-            continue
+    cache = BuildCache()
+    version = PASSES['social-proof'].version
+    if not args.force:
+        html_files = cache.stale('social-proof', version, html_files)
 
-        changed, changes = process_file(filepath)
+    for filepath, (changed, changes) in map_files(process_file, html_files, args.jobs):
+        cache.record('social-proof', version, filepath)
         if changed:
             processed += 1
             print(f"✅ {filepath.relative_to(ROOT_DIR)}")
@@ -221,6 +242,8 @@ def main():
             for change in changes:
                 total_changes[change] = total_changes.get(change, 0) + 1
 
+    cache.save()
+
     print()
     print(f"✅ Done! Modified {processed} files")
     print()
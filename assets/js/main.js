@@ -15,14 +15,17 @@
   const results = byId('site-search-results');
   const closeBtn = byId('site-search-close');
 
-  const searchState = { loaded:false, items:[] };
+  // Prebuilt index (build-guide-data.py): index.json, then only the
+  // shards of the terms typed and the documents of the results shown
+  const SEARCH_INDEX = '/assets/search/index.json';
+  const searchState = { index:null, files:{}, query:'' };
 
   function openSearch(){
     if(!modal) return;
     modal.classList.add('open');
     modal.setAttribute('aria-hidden','false');
     setTimeout(()=>{ if(input) input.focus(); }, 10);
-    if(!searchState.loaded) loadSearchIndex();
+    loadSearchIndex();
   }
   function closeSearch(){
     if(!modal) return;
@@ -32,52 +35,113 @@
 
   function normalize(str){ return (str||'').toLowerCase().trim(); }
 
+  // Same terms as sitetools/search.py: no accents, lowercase, letters and digits
+  function fold(str){
+    return (str||'').normalize('NFKD').replace(/[\u0300-\u036f]/g,'').toLowerCase();
+  }
+  function queryTerms(q, prefix){
+    return Array.from(new Set(fold(q).match(/[a-z0-9]+/g) || [])).filter(t=>t.length>=prefix);
+  }
+
   function escapeHtml(s){
     return (s||'').replace(/[&<>"]/g, (c)=>({ '&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;' }[c]));
   }
 
-  function renderResults(q){
-    if(!results) return;
-    const qq = normalize(q);
-    if(!qq){
-      results.innerHTML = '';
-      return;
-    }
-    const hits = searchState.items.filter(it=>{
-      const t = normalize(it.title);
-      const e = normalize(it.excerpt);
-      const p = normalize(it.province||'');
-      const c = normalize(it.categoryLabel||it.category||'');
-      return t.includes(qq) || e.includes(qq) || p.includes(qq) || c.includes(qq);
-    }).slice(0, 24);
-
-    results.innerHTML = hits.map(it=>{
-      const area = it.province ? it.province : (it.lang==='en' ? 'Sicily' : 'Sicilia');
-      const topic = it.categoryLabel || it.category || '';
-      const badge = it.lang==='en' ? '<span class="site-search-badge">EN</span>' : '<span class="site-search-badge">IT</span>';
-      return `
-        <a class="site-search-item" href="${it.url}">
-          <div class="k">${escapeHtml(area)} • ${escapeHtml(topic)} ${badge}</div>
-          <h4>${escapeHtml(it.title)}</h4>
-          <p>${escapeHtml(it.excerpt||'')}</p>
-        </a>
-      `;
-    }).join('') || `<div class="notice">Nessun risultato.</div>`;
+  function loadJson(url, options){
+    return fetch(url, options)
+      .then(r=>r.ok ? r.json() : null)
+      .catch(()=>null);
   }
 
-  function loadJson(url, lang){
-    return fetch(url, {cache:'no-cache'})
-      .then(r=>r.ok ? r.json() : [])
-      .then(arr => (Array.isArray(arr) ? arr.map(x=>({ ...x, lang })) : []))
-      .catch(()=>[]);
+  // Shards and document files have hashed names: fetched once, kept for the page's life
+  function loadFile(url){
+    if(!searchState.files[url]){
+      searchState.files[url] = loadJson(url).then(data=>{
+        if(!data) delete searchState.files[url];
+        return data;
+      });
+    }
+    return searchState.files[url];
   }
 
   function loadSearchIndex(){
-    Promise.all([loadJson('/guides_it.json','it'), loadJson('/guides_en.json','en')])
-      .then(([it,en])=>{
-        searchState.items = [...it, ...en].filter(x=>x && x.title && x.url);
-        searchState.loaded = true;
+    if(!searchState.index){
+      searchState.index = loadJson(SEARCH_INDEX, {cache:'no-cache'}).then(index=>{
+        if(!index) searchState.index = null;
+        return index;
+      });
+    }
+    return searchState.index;
+  }
+
+  // Ids of the documents matching every term (as a prefix), best first:
+  // a term scores 2 in the title, 1 elsewhere (posting = id*2 + in title)
+  function lookup(terms, shards){
+    let scores = null;
+    terms.forEach((term, i)=>{
+      const shard = shards[i] || {};
+      const termScores = new Map();
+      Object.keys(shard).forEach(key=>{
+        if(!key.startsWith(term)) return;
+        shard[key].forEach(p=>{
+          const id = p >> 1, score = (p & 1) ? 2 : 1;
+          if((termScores.get(id)||0) < score) termScores.set(id, score);
+        });
       });
+      if(scores){
+        const both = new Map();
+        termScores.forEach((score, id)=>{ if(scores.has(id)) both.set(id, scores.get(id) + score); });
+        scores = both;
+      } else {
+        scores = termScores;
+      }
+    });
+    return Array.from(scores.keys()).sort((a,b)=>(scores.get(b) - scores.get(a)) || (a - b));
+  }
+
+  function searchDocs(index, q, limit){
+    const terms = queryTerms(q, index.prefix);
+    if(!terms.length) return Promise.resolve(null);
+    const shards = terms.map(t=>{
+      const url = index.shards[t.slice(0, index.prefix)];
+      return url ? loadFile(url) : null;
+    });
+    return Promise.all(shards).then(loaded=>{
+      const ids = lookup(terms, loaded).slice(0, limit);
+      return Promise.all(ids.map(id=>loadFile(index.docs[Math.floor(id / index.chunk)])
+        .then(docs=>docs && docs[id % index.chunk])));
+    }).then(docs=>docs.filter(Boolean).map(([url, title, excerpt, area, topic, lang])=>({
+      url, title, excerpt, area:index.areas[area], topic:index.topics[topic], lang:index.langs[lang]
+    })));
+  }
+
+  // Hits for q, best first ({url, title, excerpt, area, topic, lang}),
+  // or null when q has no searchable term; search.html uses it too
+  function siteSearch(q, limit){
+    return loadSearchIndex().then(index=>index ? searchDocs(index, q, limit) : []);
+  }
+  window.siteSearch = siteSearch;
+
+  function renderResults(q){
+    if(!results) return;
+    searchState.query = q;
+    siteSearch(q, 24).then(hits=>{
+      if(searchState.query !== q) return;
+      if(!hits){
+        results.innerHTML = '';
+        return;
+      }
+      results.innerHTML = hits.map(it=>{
+        const badge = it.lang==='en' ? '<span class="site-search-badge">EN</span>' : '<span class="site-search-badge">IT</span>';
+        return `
+          <a class="site-search-item" href="${it.url}">
+            <div class="k">${escapeHtml(it.area)} • ${escapeHtml(it.topic)} ${badge}</div>
+            <h4>${escapeHtml(it.title)}</h4>
+            <p>${escapeHtml(it.excerpt||'')}</p>
+          </a>
+        `;
+      }).join('') || `<div class="notice">Nessun risultato.</div>`;
+    });
   }
 
   if(searchBtn) searchBtn.addEventListener('click', openSearch);
@@ -100,27 +164,83 @@
   if(!mount) return;
 
   const lang = mount.dataset.lang || 'it';
-  const dataUrl = mount.dataset.json || (lang==='en' ? '/guides_en.json' : '/guides_it.json');
+  // Columnar shards per province and per topic (build-guide-data.py)
+  const dataUrl = mount.dataset.json || '/assets/guides/index.json';
+
+  const state = { q:'', province:'', category:'', page:1, perPage:12, data:null, shards:{}, renders:0 };
+
+  // Shard -> [{url, title, excerpt, province, topic}]
+  function shardItems(shard){
+    const s = shard.strings;
+    return Array.from({length: shard.count}, (_, i)=>({
+      url:s[shard.url[i]], title:s[shard.title[i]], excerpt:s[shard.excerpt[i]], province:s[shard.province[i]], topic:s[shard.topic[i]]
+    }));
+  }
+  function loadShard(url){
+    if(!state.shards[url]){
+      state.shards[url] = fetch(url).then(r=>r.json()).then(shardItems);
+      state.shards[url].catch(()=>{ delete state.shards[url]; });
+    }
+    return state.shards[url];
+  }
 
-  const state = { q:'', province:'', category:'', page:1, perPage:12, items:[] };
+  // Shards holding every guide the filters can show (the smaller one if both are set)
+  function scope(){
+    const find = (list, name)=>list.find(x=>normalize(x.name)===normalize(name));
+    const prov = state.province && find(state.data.provinces, state.province);
+    const cat = state.category && find(state.data.topics, state.category);
+    if(prov && cat) return [prov.count <= cat.count ? prov : cat];
+    if(prov || cat) return [prov || cat];
+    if(state.province || state.category) return [];
+    return state.data.provinces;
+  }
 
   function render(){
     const q = normalize(state.q);
     const prov = normalize(state.province);
     const cat = normalize(state.category);
+    const renderId = ++state.renders;
+    let shards = scope();
+
+    // Nothing filtered: the listing is the province shards in order, so a page needs only the shards it overlaps
+    let skipped = 0;
+    if(!q && !prov && !cat){
+      const start = (state.page-1)*state.perPage, end = start+state.perPage;
+      let offset = 0;
+      shards = shards.filter(x=>{
+        const hit = offset < end && offset + x.count > start;
+        if(!hit && offset < start) skipped += x.count;
+        offset += x.count;
+        return hit;
+      });
+    }
 
-    let items = state.items.filter(it=>{
-      const hitQ = !q || normalize(it.title).includes(q) || normalize(it.excerpt).includes(q);
-      const hitP = !prov || normalize(it.province||'') === prov;
-      const hitC = !cat || normalize(it.categoryLabel||it.category||'') === cat;
-      return hitQ && hitP && hitC;
+    Promise.all(shards.map(x=>loadShard(x.url))).then(lists=>{
+      if(renderId !== state.renders) return;
+      const items = [].concat(...lists).filter(it=>{
+        const hitQ = !q || normalize(it.title).includes(q) || normalize(it.excerpt).includes(q);
+        const hitP = !prov || normalize(it.province) === prov;
+        const hitC = !cat || normalize(it.topic) === cat;
+        return hitQ && hitP && hitC;
+      });
+      const total = (!q && !prov && !cat) ? state.data.count : items.length;
+      draw(items, total, skipped);
+    }).catch(err=>{
+      mount.innerHTML = `<div class="notice">Errore nel caricamento. Riprova più tardi.</div>`;
+      console.error(err);
     });
+  }
 
-    const total = items.length;
+  // items: the guides loaded for this page, the first being guide number skipped+1 of total
+  function draw(items, total, skipped){
     const pages = Math.max(1, Math.ceil(total/state.perPage));
-    state.page = Math.min(state.page, pages);
+    if(state.page > pages){
+      state.page = pages;
+      render();
+      return;
+    }
 
-    const start = (state.page-1)*state.perPage;
+    const start = (state.page-1)*state.perPage - skipped;
     const slice = items.slice(start, start+state.perPage);
 
     byId('ge-count').textContent = total.toLocaleString('it-IT') + (lang==='en' ? ' articles' : ' articoli');
@@ -128,7 +248,7 @@
     grid.innerHTML = slice.map(it=>{
       return `
         <a class="card" href="${it.url}">
-          <div class="kicker">${it.province ? it.province : (lang==='en'?'Sicily':'Sicilia')} • ${it.categoryLabel || it.category}</div>
+          <div class="kicker">${it.province ? it.province : (lang==='en'?'Sicily':'Sicilia')} • ${it.topic}</div>
           <h3>${it.title}</h3>
           <p>${linkifyStudio4e(it.excerpt)}</p>
         </a>
@@ -154,11 +274,11 @@
     sel.innerHTML = `<option value="">${placeholder}</option>` + values.map(v=>`<option value="${v}">${v}</option>`).join('');
   }
 
-  fetch(dataUrl).then(r=>r.json()).then(data=>{
-    state.items = Array.isArray(data) ? data : [];
+  fetch(dataUrl).then(r=>r.json()).then(index=>{
+    state.data = index[lang] || { count:0, provinces:[], topics:[] };
 
-    const provinces = Array.from(new Set(state.items.map(x=>x.province).filter(Boolean))).sort((a,b)=>a.localeCompare(b));
-    const categories = Array.from(new Set(state.items.map(x=>(x.categoryLabel||x.category)).filter(Boolean))).sort((a,b)=>a.localeCompare(b));
+    const provinces = state.data.provinces.map(x=>x.name).filter(Boolean).sort((a,b)=>a.localeCompare(b));
+    const categories = state.data.topics.map(x=>x.name).filter(Boolean).sort((a,b)=>a.localeCompare(b));
 
     fillSelect('ge-province', provinces, lang==='en'?'All areas':'Tutte le province');
     fillSelect('ge-category', categories, lang==='en'?'All topics':'Tutti i temi');
@@ -1 +1,19 @@
-(function(){const byId=(id)=>document.getElementById(id);function escapeHtml(s){return String(s).replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;').replace(/"/g,'&quot;').replace(/'/g,'&#39;');}function linkifyStudio4e(s){return escapeHtml(String(s)).replace(/\bStudio\s*4\s*[eE]\b/g,`<a class="studio4e-inline-link" href="${STUDIO_URL}">Studio 4e</a>`);}const searchBtn=byId('site-search-btn');const modal=byId('site-search-modal');const input=byId('site-search-input');const results=byId('site-search-results');const closeBtn=byId('site-search-close');const searchState={loaded:false,items:[]};function openSearch(){if(!modal)return;modal.classList.add('open');modal.setAttribute('aria-hidden','false');setTimeout(()=>{if(input)input.focus();},10);if(!searchState.loaded)loadSearchIndex();}function closeSearch(){if(!modal)return;modal.classList.remove('open');modal.setAttribute('aria-hidden','true');}function normalize(str){return(str||'').toLowerCase().trim();}function escapeHtml(s){return(s||'').replace(/[&<>"]/g,(c)=>({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[c]));}function renderResults(q){if(!results)return;const qq=normalize(q);if(!qq){results.innerHTML='';return;}const hits=searchState.items.filter(it=>{const t=normalize(it.title);const e=normalize(it.excerpt);const p=normalize(it.province||'');const c=normalize(it.categoryLabel||it.category||'');return t.includes(qq)|| e.includes(qq)|| p.includes(qq)|| c.includes(qq);}).slice(0,24);results.innerHTML=hits.map(it=>{const area=it.province ? it.province:(it.lang==='en' ? 'Sicily':'Sicilia');const topic=it.categoryLabel || it.category || '';const badge=it.lang==='en' ? '<span class="site-search-badge">EN</span>':'<span class="site-search-badge">IT</span>';return `<a class="site-search-item" href="${it.url}"><div class="k">${escapeHtml(area)}• ${escapeHtml(topic)}${badge}</div><h4>${escapeHtml(it.title)}</h4><p>${escapeHtml(it.excerpt||'')}</p></a>`;}).join('')|| `<div class="notice">Nessun risultato.</div>`;}function loadJson(url,lang){return fetch(url,{cache:'no-cache'}).then(r=>r.ok ? r.json():[]).then(arr=>(Array.isArray(arr)? arr.map(x=>({...x,lang})):[])).catch(()=>[]);}function loadSearchIndex(){Promise.all([loadJson('/guides_it.json','it'),loadJson('/guides_en.json','en')]).then(([it,en])=>{searchState.items=[...it,...en].filter(x=>x && x.title && x.url);searchState.loaded=true;});}if(searchBtn)searchBtn.addEventListener('click',openSearch);if(closeBtn)closeBtn.addEventListener('click',closeSearch);if(modal){modal.addEventListener('click',(e)=>{const t=e.target;if(t && t.dataset && t.dataset.close)closeSearch();});document.addEventListener('keydown',(e)=>{if(e.key==='Escape' && modal.classList.contains('open'))closeSearch();});}if(input){input.addEventListener('input',(e)=>renderResults(e.target.value));}const mount=byId('guide-explorer');if(!mount)return;const lang=mount.dataset.lang || 'it';const dataUrl=mount.dataset.json ||(lang==='en' ? '/guides_en.json':'/guides_it.json');const state={q:'',province:'',category:'',page:1,perPage:12,items:[]};function render(){const q=normalize(state.q);const prov=normalize(state.province);const cat=normalize(state.category);let items=state.items.filter(it=>{const hitQ=!q || normalize(it.title).includes(q)|| normalize(it.excerpt).includes(q);const hitP=!prov || normalize(it.province||'')===prov;const hitC=!cat || normalize(it.categoryLabel||it.category||'')===cat;return hitQ && hitP && hitC;});const total=items.length;const pages=Math.max(1,Math.ceil(total/state.perPage));state.page=Math.min(state.page,pages);const start=(state.page-1)*state.perPage;const slice=items.slice(start,start+state.perPage);byId('ge-count').textContent=total.toLocaleString('it-IT')+(lang==='en' ? ' articles':' articoli');const grid=byId('ge-grid');grid.innerHTML=slice.map(it=>{return `<a class="card" href="${it.url}"><div class="kicker">${it.province ? it.province:(lang==='en'?'Sicily':'Sicilia')}• ${it.categoryLabel || it.category}</div><h3>${it.title}</h3><p>${linkifyStudio4e(it.excerpt)}</p></a>`;}).join('');const pager=byId('ge-pager');pager.innerHTML=`<div class="links"><button class="btn secondary" ${state.page<=1?'disabled':''}id="ge-prev">${lang==='en'?'Previous':'Indietro'}</button><span class="pill">${lang==='en'?'Page':'Pagina'}${state.page}/${pages}</span><button class="btn secondary" ${state.page>=pages?'disabled':''}id="ge-next">${lang==='en'?'Next':'Avanti'}</button></div>`;const prev=byId('ge-prev'),next=byId('ge-next');if(prev)prev.onclick=()=>{state.page=Math.max(1,state.page-1);render();window.scrollTo({top:mount.offsetTop-10,behavior:'smooth'});};if(next)next.onclick=()=>{state.page=Math.min(pages,state.page+1);render();window.scrollTo({top:mount.offsetTop-10,behavior:'smooth'});};}function fillSelect(id,values,placeholder){const sel=byId(id);if(!sel)return;sel.innerHTML=`<option value="">${placeholder}</option>`+values.map(v=>`<option value="${v}">${v}</option>`).join('');}fetch(dataUrl).then(r=>r.json()).then(data=>{state.items=Array.isArray(data)? data:[];const provinces=Array.from(new Set(state.items.map(x=>x.province).filter(Boolean))).sort((a,b)=>a.localeCompare(b));const categories=Array.from(new Set(state.items.map(x=>(x.categoryLabel||x.category)).filter(Boolean))).sort((a,b)=>a.localeCompare(b));fillSelect('ge-province',provinces,lang==='en'?'All areas':'Tutte le province');fillSelect('ge-category',categories,lang==='en'?'All topics':'Tutti i temi');const qEl=byId('ge-q');if(qEl)qEl.addEventListener('input',e=>{state.q=e.target.value;state.page=1;render();});const pEl=byId('ge-province');if(pEl)pEl.addEventListener('change',e=>{state.province=e.target.value;state.page=1;render();});const cEl=byId('ge-category');if(cEl)cEl.addEventListener('change',e=>{state.category=e.target.value;state.page=1;render();});render();}).catch(err=>{mount.innerHTML=`<div class="notice">Errore nel caricamento. Riprova più tardi.</div>`;console.error(err);});function setupNavToggle(){const navInner=document.querySelector('.nav .nav-inner');const menu=document.querySelector('.nav .menu');if(!navInner || !menu)return;if(navInner.querySelector('.nav-toggle'))return;const btn=document.createElement('button');btn.type='button';btn.className='nav-toggle';btn.setAttribute('aria-label','Apri menu');btn.setAttribute('aria-expanded','false');btn.innerHTML='<span class="bars" aria-hidden="true"><span></span><span></span><span></span></span><span>Menu</span>';navInner.insertBefore(btn,menu);function close(){document.body.classList.remove('nav-open');btn.setAttribute('aria-expanded','false');}function toggle(){const open=document.body.classList.toggle('nav-open');btn.setAttribute('aria-expanded',open ? 'true':'false');}btn.addEventListener('click',toggle);menu.addEventListener('click',(e)=>{const a=e.target && e.target.closest && e.target.closest('a');if(a)close();});document.addEventListener('keydown',(e)=>{if(e.key==='Escape')close();});window.addEventListener('resize',()=>{if(window.innerWidth>900)close();},{passive:true});}function setupNavScrollState(){const nav=document.querySelector('.nav');if(!nav)return;const onScroll=()=>{if(window.scrollY>8)nav.classList.add('scrolled');else nav.classList.remove('scrolled');};onScroll();window.addEventListener('scroll',onScroll,{passive:true});}function setupRevealOnScroll(){if(window.matchMedia && window.matchMedia('(prefers-reduced-motion:reduce)').matches)return;const weights={hero:4,section:3,list:2,subtle:1};const bucket=new Map();function addAll(selector,variant){document.querySelectorAll(selector).forEach(el=>{if(!el || el.classList.contains('reveal'))return;const current=bucket.get(el);if(!current || weights[variant]>weights[current])bucket.set(el,variant);});}addAll('main .hero','hero');addAll('main h1','hero');addAll('main .hero .hero-card','hero');addAll('main .hero-media','hero');addAll('main h2','section');addAll('main section','section');addAll('main .grid>*','section');addAll('main .card','section');addAll('main .panel','section');addAll('main .tile','section');addAll('main .kpi','section');addAll('main .chips a','section');addAll('main .cta','section');addAll('main .article img','section');addAll('main .article figure','section');addAll('main .article .breadcrumb','subtle');addAll('main .article .lede','subtle');addAll('main .article p','subtle');addAll('main .article ul','subtle');addAll('main .article ol','subtle');addAll('main .article blockquote','subtle');addAll('main .article .notice','subtle');addAll('main .article .phone-cta','subtle');addAll('footer .container','subtle');addAll('main .links>*','list');addAll('main .links a','list');let i=0;bucket.forEach((variant,el)=>{el.classList.add('reveal',`reveal--${variant}`);const d=i % 4;if(d===1)el.classList.add('delay-1');if(d===2)el.classList.add('delay-2');if(d===3)el.classList.add('delay-3');i++;});const io=new IntersectionObserver((entries)=>{entries.forEach(entry=>{if(entry.isIntersecting){entry.target.classList.add('is-visible');io.unobserve(entry.target);}});},{root:null,threshold:0.12,rootMargin:'0px 0px-8% 0px'});bucket.forEach((_,el)=>io.observe(el));}function setupMediaParallax(){if(window.matchMedia && window.matchMedia('(prefers-reduced-motion:reduce)').matches)return;if(!window.matchMedia || !window.matchMedia('(min-width:920px)').matches)return;const path=window.location.pathname || '/';const allow=path==='/' || path==='/index.html' || path.startsWith('/servizi');if(!allow)return;const imgs=Array.from(document.querySelectorAll('.media-strip .media-tile img'));if(!imgs.length)return;const strengths=imgs.map((_,i)=>{const phase=(i % 4)-1.5;return phase*0.6;});let ticking=false;function update(){ticking=false;const vh=window.innerHeight || 800;imgs.forEach((img,i)=>{const rect=img.getBoundingClientRect();const mid=rect.top+rect.height*0.5;const offset=(mid-vh*0.5)/vh;const y=Math.max(-8,Math.min(8,offset*strengths[i]*10));img.style.setProperty('--parallax-y',y.toFixed(2)+'px');});}function onScroll(){if(!ticking){ticking=true;window.requestAnimationFrame(update);}}update();window.addEventListener('scroll',onScroll,{passive:true});window.addEventListener('resize',onScroll,{passive:true});}function improveImages(){document.querySelectorAll('img').forEach((img)=>{if(!img.getAttribute('loading'))img.setAttribute('loading','lazy');if(!img.getAttribute('decoding'))img.setAttribute('decoding','async');});}document.addEventListener('DOMContentLoaded',()=>{if(!(window.matchMedia && window.matchMedia('(prefers-reduced-motion:reduce)').matches)){document.documentElement.classList.add('motion-ready');}setupNavToggle();setupNavScrollState();setupRevealOnScroll();setupMediaParallax();improveImages();});const startForm=byId('start-form');if(startForm){const emailBtn=startForm.querySelector('.email-submit');if(emailBtn){emailBtn.addEventListener('click',()=>{const get=(name)=>(startForm.querySelector(`[name="${name}"]`)?.value || '').trim();const payload={obiettivo:get('obiettivo'),luogo:get('luogo'),immobile:get('immobile'),tempi:get('tempi'),documenti:get('documenti'),note:get('note')};const subject=encodeURIComponent('Richiesta contatto — Architetti Sicilia');const lines=[ 'Obiettivo:'+(payload.obiettivo || '-'),'Luogo:'+(payload.luogo || '-'),'Immobile:'+(payload.immobile || '-'),'Tempi:'+(payload.tempi || '-'),'Documenti:'+(payload.documenti || '-'),'','Note:',payload.note || '-' ];const body=encodeURIComponent(lines.join('\n'));window.location.href=`mailto:info@studio4e.it?subject=${subject}&body=${body}`;});}}(function(){const fab=document.getElementById('contactFab');if(!fab)return;document.addEventListener('click',(e)=>{if(!fab.hasAttribute('open'))return;if(fab.contains(e.target))return;fab.removeAttribute('open');},true);document.addEventListener('keydown',(e)=>{if(e.key==='Escape' && fab.hasAttribute('open')){fab.removeAttribute('open');}});})();})();(function(){function qs(sel,root){return(root || document).querySelector(sel);}function safeVal(el){return el ? String(el.value || '').trim():'';}function buildContactMessage(form){var fields=[ ['Nome',safeVal(qs('[name="nome"]',form))],['Telefono',safeVal(qs('[name="telefono"]',form))],['Email',safeVal(qs('[name="email"]',form))],['Città/Provincia',safeVal(qs('[name="citta"]',form))],['Tipologia immobile',safeVal(qs('[name="tipologia"]',form))],['Intervento richiesto',safeVal(qs('[name="intervento"]',form))],['Tempistiche',safeVal(qs('[name="tempistiche"]',form))],['Budget indicativo',safeVal(qs('[name="budget"]',form))],['Documenti disponibili',safeVal(qs('[name="documenti"]',form))],['Note',safeVal(qs('[name="note"]',form))] ];var lines=['Richiesta dal sito Architetti Sicilia(Inizia da qui)'];for(var i=0;i<fields.length;i++){if(fields[i][1])lines.push(fields[i][0]+':'+fields[i][1]);}return lines.join('\n');}document.addEventListener('DOMContentLoaded',function(){var waBtn=document.getElementById('send-whatsapp');if(!waBtn)return;var form=waBtn.closest('form')|| document.querySelector('form');var phone='393299736697';waBtn.addEventListener('click',function(e){try{var msg=form ? buildContactMessage(form):'Richiesta dal sito Architetti Sicilia';var url='https:var win=window.open(url,'_blank','noopener,noreferrer');if(!win)window.location.href=url;}catch(err){window.location.href='https:}});var emailBtn=document.getElementById('send-email');if(emailBtn && form){emailBtn.addEventListener('click',function(){try{var msg=buildContactMessage(form);var base='mailto:info@studio4e.it';var subject='Richiesta dal sito Architetti Sicilia';var href=base+'?subject='+encodeURIComponent(subject)+'&body='+encodeURIComponent(msg);emailBtn.setAttribute('href',href);}catch(e){}});}});})();(()=>{const els=Array.from(document.querySelectorAll('.reveal'));if(!els.length)return;const show=(el)=>el.classList.add('is-visible');if('IntersectionObserver' in window){const io=new IntersectionObserver((entries)=>{for(const e of entries){if(e.isIntersecting){show(e.target);io.unobserve(e.target);}}},{threshold:0.12,rootMargin:'80px 0px'});els.forEach(el=>io.observe(el));}else{els.forEach(show);}})();
\ No newline at end of file
+(function(){const b=(a)=>document.getElementById(a);function i(a){return String(a).replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;').replace(/"/g,'&quot;').replace(/'/g,'&#39;');}function u(a){return i(String(a)).replace(/\bStudio\s*4\s*[eE]\b/g,`<a class="studio4e-inline-link" href="${STUDIO_URL}">Studio 4e</a>`);}const n=b('site-search-btn');const d=b('site-search-modal');const j=b('site-search-input');const k=b('site-search-results');const o=b('site-search-close');const v='/assets/search/index.json';const c={index:null,files:{},query:''};function w(){if(!d)return;d.classList.add('open');d.setAttribute('aria-hidden','false');setTimeout(()=>{if(j)j.focus();},10);r();}function l(){if(!d)return;d.classList.remove('open');d.setAttribute('aria-hidden','true');}function e(a){return(a||'').toLowerCase().trim();}function x(a){return(a||'').normalize('NFKD').replace(/[\u0300-\u036f]/g,'').toLowerCase();}function y(a,b){return Array.from(new Set(x(a).match(/[a-z0-9]+/g)||[])).filter(a=>a.length>=b);}function i(a){return(a||'').replace(/[&<>"]/g,(a)=>({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[a]));}function p(a,b){return fetch(a,b).then(a=>a.ok?a.json():null).catch(()=>null);}function q(a){if(!c.files[a]){c.files[a]=p(a).then(b=>{if(!b)delete c.files[a];return b;});}return c.files[a];}function r(){if(!c.index){c.index=p(v,{cache:'no-cache'}).then(a=>{if(!a)c.index=null;return a;});}return c.index;}function z(b,c){let a=null;b.forEach((e,f)=>{const d=c[f]||{};const b=new Map();Object.keys(d).forEach(a=>{if(!a.startsWith(e))return;d[a].forEach(a=>{const c=a>>1,d=(a&1)?2:1;if((b.get(c)||0)<d)b.set(c,d);});});if(a){const c=new Map();b.forEach((d,b)=>{if(a.has(b))c.set(b,a.get(b)+d);});a=c;}else{a=b;}});return Array.from(a.keys()).sort((b,c)=>(a.get(c)-a.get(b))||(b-c));}function A(a,c,d){const b=y(c,a.prefix);if(!b.length)return Promise.resolve(null);const e=b.map(c=>{const b=a.shards[c.slice(0,a.prefix)];return b?q(b):null;});return Promise.all(e).then(c=>{const e=z(b,c).slice(0,d);return Promise.all(e.map(b=>q(a.docs[Math.floor(b/a.chunk)]).then(c=>c&&c[b%a.chunk])));}).then(b=>b.filter(Boolean).map(([b,c,d,e,f,g])=>({url:b,title:c,excerpt:d,area:a.areas[e],topic:a.topics[f],lang:a.langs[g]})));}function s(a,b){return r().then(c=>c?A(c,a,b):[]);}window.siteSearch=s;function B(a){if(!k)return;c.query=a;s(a,24).then(b=>{if(c.query!==a)return;if(!b){k.innerHTML='';return;}k.innerHTML=b.map(a=>{const b=a.lang==='en'?'<span class="site-search-badge">EN</span>':'<span class="site-search-badge">IT</span>';return`
+          <a class="site-search-item" href="${a.url}">
+            <div class="k">${i(a.area)} • ${i(a.topic)} ${b}</div>
+            <h4>${i(a.title)}</h4>
+            <p>${i(a.excerpt||'')}</p>
+          </a>
+        `;}).join('')||`<div class="notice">Nessun risultato.</div>`;});}if(n)n.addEventListener('click',w);if(o)o.addEventListener('click',l);if(d){d.addEventListener('click',(b)=>{const a=b.target;if(a&&a.dataset&&a.dataset.close)l();});document.addEventListener('keydown',(a)=>{if(a.key==='Escape'&&d.classList.contains('open'))l();});}if(j){j.addEventListener('input',(a)=>B(a.target.value));}const g=b('guide-explorer');if(!g)return;const f=g.dataset.lang||'it';const C=g.dataset.json||'/assets/guides/index.json';const a={q:'',province:'',category:'',page:1,perPage:12,data:null,shards:{},renders:0};function D(a){const b=a.strings;return Array.from({length:a.count},(d,c)=>({url:b[a.url[c]],title:b[a.title[c]],excerpt:b[a.excerpt[c]],province:b[a.province[c]],topic:b[a.topic[c]]}));}function E(b){if(!a.shards[b]){a.shards[b]=fetch(b).then(a=>a.json()).then(D);a.shards[b].catch(()=>{delete a.shards[b];});}return a.shards[b];}function F(){const d=(a,b)=>a.find(a=>e(a.name)===e(b));const b=a.province&&d(a.data.provinces,a.province);const c=a.category&&d(a.data.topics,a.category);if(b&&c)return[b.count<=c.count?b:c];if(b||c)return[b||c];if(a.province||a.category)return[];return a.data.provinces;}function h(){const b=e(a.q);const c=e(a.province);const d=e(a.category);const i=++a.renders;let f=F();let h=0;if(!b&&!c&&!d){const c=(a.page-1)*a.perPage,d=c+a.perPage;let b=0;f=f.filter(a=>{const e=b<d&&b+a.count>c;if(!e&&b<c)h+=a.count;b+=a.count;return e;});}Promise.all(f.map(a=>E(a.url))).then(g=>{if(i!==a.renders)return;const f=[].concat(...g).filter(a=>{const f=!b||e(a.title).includes(b)||e(a.excerpt).includes(b);const g=!c||e(a.province)===c;const h=!d||e(a.topic)===d;return f&&g&&h;});const j=(!b&&!c&&!d)?a.data.count:f.length;G(f,j,h);}).catch(a=>{g.innerHTML=`<div class="notice">Errore nel caricamento. Riprova più tardi.</div>`;console.error(a);});}function G(k,d,l){const c=Math.max(1,Math.ceil(d/a.perPage));if(a.page>c){a.page=c;h();return;}const e=(a.page-1)*a.perPage-l;const m=k.slice(e,e+a.perPage);b('ge-count').textContent=d.toLocaleString('it-IT')+(f==='en'?' articles':' articoli');const n=b('ge-grid');n.innerHTML=m.map(a=>{return`
+        <a class="card" href="${a.url}">
+          <div class="kicker">${a.province?a.province:(f==='en'?'Sicily':'Sicilia')} • ${a.topic}</div>
+          <h3>${a.title}</h3>
+          <p>${u(a.excerpt)}</p>
+        </a>
+      `;}).join('');const o=b('ge-pager');o.innerHTML=`
+      <div class="links">
+        <button class="btn secondary" ${a.page<=1?'disabled':''} id="ge-prev">${f==='en'?'Previous':'Indietro'}</button>
+        <span class="pill">${f==='en'?'Page':'Pagina'} ${a.page} / ${c}</span>
+        <button class="btn secondary" ${a.page>=c?'disabled':''} id="ge-next">${f==='en'?'Next':'Avanti'}</button>
+      </div>
+    `;const i=b('ge-prev'),j=b('ge-next');if(i)i.onclick=()=>{a.page=Math.max(1,a.page-1);h();window.scrollTo({top:g.offsetTop-10,behavior:'smooth'});};if(j)j.onclick=()=>{a.page=Math.min(c,a.page+1);h();window.scrollTo({top:g.offsetTop-10,behavior:'smooth'});};}function t(c,d,e){const a=b(c);if(!a)return;a.innerHTML=`<option value="">${e}</option>`+d.map(a=>`<option value="${a}">${a}</option>`).join('');}fetch(C).then(a=>a.json()).then(g=>{a.data=g[f]||{count:0,provinces:[],topics:[]};const i=a.data.provinces.map(a=>a.name).filter(Boolean).sort((a,b)=>a.localeCompare(b));const j=a.data.topics.map(a=>a.name).filter(Boolean).sort((a,b)=>a.localeCompare(b));t('ge-province',i,f==='en'?'All areas':'Tutte le province');t('ge-category',j,f==='en'?'All topics':'Tutti i temi');const c=b('ge-q');if(c)c.addEventListener('input',b=>{a.q=b.target.value;a.page=1;h();});const d=b('ge-province');if(d)d.addEventListener('change',b=>{a.province=b.target.value;a.page=1;h();});const e=b('ge-category');if(e)e.addEventListener('change',b=>{a.category=b.target.value;a.page=1;h();});h();}).catch(a=>{g.innerHTML=`<div class="notice">Errore nel caricamento. Riprova più tardi.</div>`;console.error(a);});function H(){const b=document.querySelector('.nav .nav-inner');const c=document.querySelector('.nav .menu');if(!b||!c)return;if(b.querySelector('.nav-toggle'))return;const a=document.createElement('button');a.type='button';a.className='nav-toggle';a.setAttribute('aria-label','Apri menu');a.setAttribute('aria-expanded','false');a.innerHTML='<span class="bars" aria-hidden="true"><span></span><span></span><span></span></span><span>Menu</span>';b.insertBefore(a,c);function d(){document.body.classList.remove('nav-open');a.setAttribute('aria-expanded','false');}function e(){const b=document.body.classList.toggle('nav-open');a.setAttribute('aria-expanded',b?'true':'false');}a.addEventListener('click',e);c.addEventListener('click',(a)=>{const b=a.target&&a.target.closest&&a.target.closest('a');if(b)d();});document.addEventListener('keydown',(a)=>{if(a.key==='Escape')d();});window.addEventListener('resize',()=>{if(window.innerWidth>900)d();},{passive:true});}function I(){const a=document.querySelector('.nav');if(!a)return;const b=()=>{if(window.scrollY>8)a.classList.add('scrolled');else a.classList.remove('scrolled');};b();window.addEventListener('scroll',b,{passive:true});}function J(){if(window.matchMedia&&window.matchMedia('(prefers-reduced-motion: reduce)').matches)return;const c={hero:4,section:3,list:2,subtle:1};const b=new Map();function a(d,a){document.querySelectorAll(d).forEach(d=>{if(!d||d.classList.contains('reveal'))return;const e=b.get(d);if(!e||c[a]>c[e])b.set(d,a);});}a('main .hero','hero');a('main h1','hero');a('main .hero .hero-card','hero');a('main .hero-media','hero');a('main h2','section');a('main section','section');a('main .grid > *','section');a('main .card','section');a('main .panel','section');a('main .tile','section');a('main .kpi','section');a('main .chips a','section');a('main .cta','section');a('main .article img','section');a('main .article figure','section');a('main .article .breadcrumb','subtle');a('main .article .lede','subtle');a('main .article p','subtle');a('main .article ul','subtle');a('main .article ol','subtle');a('main .article blockquote','subtle');a('main .article .notice','subtle');a('main .article .phone-cta','subtle');a('footer .container','subtle');a('main .links > *','list');a('main .links a','list');let d=0;b.forEach((c,a)=>{a.classList.add('reveal',`reveal--${c}`);const b=d%4;if(b===1)a.classList.add('delay-1');if(b===2)a.classList.add('delay-2');if(b===3)a.classList.add('delay-3');d++;});const e=new IntersectionObserver((a)=>{a.forEach(a=>{if(a.isIntersecting){a.target.classList.add('is-visible');e.unobserve(a.target);}});},{root:null,threshold:0.12,rootMargin:'0px 0px -8% 0px'});b.forEach((b,a)=>e.observe(a));}function K(){if(window.matchMedia&&window.matchMedia('(prefers-reduced-motion: reduce)').matches)return;if(!window.matchMedia||!window.matchMedia('(min-width: 920px)').matches)return;const a=window.location.pathname||'/';const f=a==='/'||a==='/index.html'||a.startsWith('/servizi');if(!f)return;const b=Array.from(document.querySelectorAll('.media-strip .media-tile img'));if(!b.length)return;const g=b.map((c,a)=>{const b=(a%4)-1.5;return b*0.6;});let c=false;function d(){c=false;const a=window.innerHeight||800;b.forEach((b,d)=>{const c=b.getBoundingClientRect();const e=c.top+c.height*0.5;const f=(e-a*0.5)/a;const h=Math.max(-8,Math.min(8,f*g[d]*10));b.style.setProperty('--parallax-y',h.toFixed(2)+'px');});}function e(){if(!c){c=true;window.requestAnimationFrame(d);}}d();window.addEventListener('scroll',e,{passive:true});window.addEventListener('resize',e,{passive:true});}function L(){document.querySelectorAll('img').forEach((a)=>{if(!a.getAttribute('loading'))a.setAttribute('loading','lazy');if(!a.getAttribute('decoding'))a.setAttribute('decoding','async');});}document.addEventListener('DOMContentLoaded',()=>{if(!(window.matchMedia&&window.matchMedia('(prefers-reduced-motion: reduce)').matches)){document.documentElement.classList.add('motion-ready');}H();I();J();K();L();});const m=b('start-form');if(m){const a=m.querySelector('.email-submit');if(a){a.addEventListener('click',()=>{const a=(a)=>(m.querySelector(`[name="${a}"]`)?.value||'').trim();const b={obiettivo:a('obiettivo'),luogo:a('luogo'),immobile:a('immobile'),tempi:a('tempi'),documenti:a('documenti'),note:a('note')};const c=encodeURIComponent('Richiesta contatto — Architetti Sicilia');const d=['Obiettivo: '+(b.obiettivo||'-'),'Luogo: '+(b.luogo||'-'),'Immobile: '+(b.immobile||'-'),'Tempi: '+(b.tempi||'-'),'Documenti: '+(b.documenti||'-'),'','Note:',b.note||'-'];const e=encodeURIComponent(d.join('\n'));window.location.href=`mailto:info@studio4e.it?subject=${c}&body=${e}`;});}}(function(){const a=document.getElementById('contactFab');if(!a)return;document.addEventListener('click',(b)=>{if(!a.hasAttribute('open'))return;if(a.contains(b.target))return;a.removeAttribute('open');},true);document.addEventListener('keydown',(b)=>{if(b.key==='Escape'&&a.hasAttribute('open')){a.removeAttribute('open');}});})();})();(function(){function a(a,b){return(b||document).querySelector(a);}function b(a){return a?String(a.value||'').trim():'';}function c(c){var e=[['Nome',b(a('[name="nome"]',c))],['Telefono',b(a('[name="telefono"]',c))],['Email',b(a('[name="email"]',c))],['Città/Provincia',b(a('[name="citta"]',c))],['Tipologia immobile',b(a('[name="tipologia"]',c))],['Intervento richiesto',b(a('[name="intervento"]',c))],['Tempistiche',b(a('[name="tempistiche"]',c))],['Budget indicativo',b(a('[name="budget"]',c))],['Documenti disponibili',b(a('[name="documenti"]',c))],['Note',b(a('[name="note"]',c))]];var f=['Richiesta dal sito Architetti Sicilia (Inizia da qui)'];for(var d=0;d<e.length;d++){if(e[d][1])f.push(e[d][0]+': '+e[d][1]);}return f.join('\n');}document.addEventListener('DOMContentLoaded',function(){var b=document.getElementById('send-whatsapp');if(!b)return;var a=b.closest('form')||document.querySelector('form');var e='393299736697';b.addEventListener('click',function(g){try{var d=a?c(a):'Richiesta dal sito Architetti Sicilia';var b='https://wa.me/'+e+'?text='+encodeURIComponent(d);var f=window.open(b,'_blank','noopener,noreferrer');if(!f)window.location.href=b;}catch(a){window.location.href='https://wa.me/'+e;}});var d=document.getElementById('send-email');if(d&&a){d.addEventListener('click',function(){try{var b=c(a);var e='mailto:info@studio4e.it';var f='Richiesta dal sito Architetti Sicilia';var g=e+'?subject='+encodeURIComponent(f)+'&body='+encodeURIComponent(b);d.setAttribute('href',g);}catch(a){}});}});})();(()=>{const a=Array.from(document.querySelectorAll('.reveal'));if(!a.length)return;const b=(a)=>a.classList.add('is-visible');if('IntersectionObserver'in window){const c=new IntersectionObserver((a)=>{for(const d of a){if(d.isIntersecting){b(d.target);c.unobserve(d.target);}}},{threshold:0.12,rootMargin:'80px 0px'});a.forEach(a=>c.observe(a));}else{a.forEach(b);}})();
\ No newline at end of file
@@ -0,0 +1,72 @@
+// Conversion tracking events and Google Tag Manager loader.
+// add-conversion-tracking.py puts it in every page as
+//   <script defer src="/assets/js/tracking.min.js" data-gtm-id="GTM-XXXXX" data-gtm-load="eager"></script>
+// data-gtm-load: eager (as soon as the page is parsed), interaction (first
+// click, key press, scroll or touch) or idle (when the browser is idle).
+// Events pushed before GTM loads wait in dataLayer and are sent once it does,
+// unless the page is left first: with interaction/idle, a tel: or wa.me click
+// that navigates away before gtm.js has arrived is not counted.
+(function(){
+  const script = document.currentScript;
+  const gtmId = script ? script.getAttribute('data-gtm-id') : null;
+  const gtmLoad = (script && script.getAttribute('data-gtm-load')) || 'eager';
+  const dataLayer = window.dataLayer = window.dataLayer || [];
+
+  // Google Tag Manager (same bootstrap as the official snippet)
+  let gtmStarted = false;
+  function loadGtm(){
+    if(gtmStarted || !gtmId) return;
+    gtmStarted = true;
+    dataLayer.push({'gtm.start': Date.now(), event:'gtm.js'});
+    const gtm = document.createElement('script');
+    gtm.async = true;
+    gtm.src = 'https://www.googletagmanager.com/gtm.js?id=' + encodeURIComponent(gtmId);
+    document.head.appendChild(gtm);
+  }
+
+  if(gtmLoad === 'interaction'){
+    ['pointerdown','keydown','scroll','touchstart'].forEach((type)=>{
+      window.addEventListener(type, loadGtm, { once:true, passive:true });
+    });
+  } else if(gtmLoad === 'idle'){
+    if(window.requestIdleCallback) window.requestIdleCallback(loadGtm, { timeout:5000 });
+    else setTimeout(loadGtm, 2000);
+  } else {
+    loadGtm();
+  }
+
+  // Track phone clicks
+  document.addEventListener('click', function(e) {
+    const phoneLink = e.target.closest('a[href^="tel:"]');
+    if (phoneLink) {
+      dataLayer.push({
+        'event': 'click_phone',
+        'phone_number': phoneLink.getAttribute('href'),
+        'page_path': window.location.pathname,
+        'page_title': document.title
+      });
+    }
+
+    // Track WhatsApp clicks
+    const waLink = e.target.closest('a[href*="wa.me"]');
+    if (waLink) {
+      dataLayer.push({
+        'event': 'click_whatsapp',
+        'page_path': window.location.pathname,
+        'page_title': document.title
+      });
+    }
+  });
+
+  // Track form submissions
+  const forms = document.querySelectorAll('form');
+  forms.forEach(form => {
+    form.addEventListener('submit', function(e) {
+      dataLayer.push({
+        'event': 'form_submit',
+        'form_id': this.id || 'unknown',
+        'page_path': window.location.pathname
+      });
+    });
+  });
+})();
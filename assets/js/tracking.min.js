@@ -0,0 +1 @@
+(function(){const a=document.currentScript;const d=a?a.getAttribute('data-gtm-id'):null;const e=(a&&a.getAttribute('data-gtm-load'))||'eager';const b=window.dataLayer=window.dataLayer||[];let f=false;function c(){if(f||!d)return;f=true;b.push({'gtm.start':Date.now(),event:'gtm.js'});const a=document.createElement('script');a.async=true;a.src='https://www.googletagmanager.com/gtm.js?id='+encodeURIComponent(d);document.head.appendChild(a);}if(e==='interaction'){['pointerdown','keydown','scroll','touchstart'].forEach((a)=>{window.addEventListener(a,c,{once:true,passive:true});});}else if(e==='idle'){if(window.requestIdleCallback)window.requestIdleCallback(c,{timeout:5000});else setTimeout(c,2000);}else{c();}document.addEventListener('click',function(a){const c=a.target.closest('a[href^="tel:"]');if(c){b.push({'event':'click_phone','phone_number':c.getAttribute('href'),'page_path':window.location.pathname,'page_title':document.title});}const d=a.target.closest('a[href*="wa.me"]');if(d){b.push({'event':'click_whatsapp','page_path':window.location.pathname,'page_title':document.title});}});const g=document.querySelectorAll('form');g.forEach(a=>{a.addEventListener('submit',function(a){b.push({'event':'form_submit','form_id':this.id||'unknown','page_path':window.location.pathname});});});})();
\ No newline at end of file
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Build guides_it.json, guides_en.json and the data the browser reads from them
+
+First the guide records (sitetools/guides.py) are extracted from the
+live guide pages of the catalogue (guide/, sicilia/, en/): title, lede,
+breadcrumb and JSON-LD. Only pages changed since the last run are read
+again (cache in .build-cache/, --force to read them all); the records
+of the others are copied from the current JSON, entries of deleted
+pages are dropped. The files are written one record at a time, and a
+file whose bytes would not change is left alone. --no-extract keeps
+the JSON as it is (records edited by hand).
+
+Then, from the records:
+
+- assets/guides/ (sitetools/explorer.py): the guide explorer data, one
+  columnar shard per province and per topic plus index.json with the
+  counts, so a page of the explorer needs a single shard
+- assets/search/ (sitetools/search.py): the inverted index of the site
+  search, one shard of postings per two-letter term prefix and the
+  document table in chunks of 32 guides, plus a small index.json. The
+  search modal in main.js and search.html download only the shards of
+  the terms typed and the documents of the results shown
+
+Shards are named after a hash of their content: an unchanged build
+rewrites nothing, and the files of an earlier build that are no longer
+used are deleted.
+
+Run it after the scripts that change titles or ledes
+(fix-structured-data.py, fix-unnatural-lede.py, run-pipeline.py, ...),
+then precompress-assets.py and generate-headers.py.
+
+Usage:
+  python3 build-guide-data.py
+  python3 build-guide-data.py --jobs 4
+  python3 build-guide-data.py --no-extract
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from sitetools.cache import BuildCache, add_cache_arguments, fingerprint
+from sitetools.catalogue import Catalogue
+from sitetools.explorer import EXPLORER_DIR, write_explorer_data
+from sitetools.guides import FIELDS, GUIDE_FILES, extract_guide, guide_pages, keep_fields, load_guides, write_guides
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.search import SEARCH_DIR, write_index
+
+ROOT_DIR = Path(".")
+CACHE_KEY = 'guide-records'
+
+def kb(paths):
+    return sum(Path(path).stat().st_size for path in paths if Path(path).is_file()) / 1024
+
+def files(directory, urls):
+    return [directory / url.rsplit('/', 1)[1] for url in urls]
+
+def extract_records(catalogue, cache, jobs):
+    """Bring guides_<lang>.json in line with the pages; returns {lang: (pages read, records, file changed)}"""
+    # Editing the extractor re-reads every page
+    version = fingerprint(Path(__file__), ROOT_DIR / "sitetools" / "guides.py")
+    results = {}
+    for lang, name in GUIDE_FILES.items():
+        previous = {record['url']: record for record in load_guides(lang)}
+        pages = guide_pages(catalogue, lang)
+
+        def url(filepath):
+            return '/' + filepath.relative_to(ROOT_DIR).as_posix()
+
+        todo = pages if cache is None else cache.stale(CACHE_KEY, version, pages)
+        todo = set(todo) | {p for p in pages if url(p) not in previous}
+        extracted = dict(map_files(extract_guide, [p for p in pages if p in todo], jobs))
+
+        def records():
+            for filepath in pages:
+                if filepath in extracted:
+                    yield keep_fields(extracted[filepath], previous.get(url(filepath)))
+                else:
+                    yield {field: previous[url(filepath)].get(field, '') for field in FIELDS}
+
+        changed = write_guides(ROOT_DIR / name, records())
+        if cache is not None:
+            for filepath in extracted:
+                cache.record(CACHE_KEY, version, filepath)
+        results[lang] = (len(extracted), len(pages), changed)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract guides_*.json from the pages, then build the guide explorer "
+                                                 "shards and the search index")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    parser.add_argument('--no-extract', action='store_true',
+                        help="Use guides_*.json as they are instead of extracting them from the pages")
+    args = parser.parse_args()
+
+    print("📚 Building guide data...")
+    print()
+
+    if not args.no_extract:
+        cache = None if args.force else BuildCache()
+        with Catalogue() as catalogue:
+            catalogue.refresh()
+            results = extract_records(catalogue, cache, args.jobs)
+        if cache is not None:
+            cache.save()
+        for lang, (read, count, changed) in results.items():
+            state = "written" if changed else "unchanged"
+            print(f"📝 {GUIDE_FILES[lang]}: {count} guides, {read} pages read, {state}")
+        print()
+
+    guides = {lang: load_guides(lang) for lang in GUIDE_FILES}
+    if not any(guides.values()):
+        print(f"❌ No records in {' / '.join(GUIDE_FILES.values())}")
+        return
+
+    source_kb = kb(GUIDE_FILES.values())
+    print(f"📄 {sum(len(records) for records in guides.values())} guides ({source_kb:.1f} KB of JSON)")
+    print()
+
+    index_path, written, stale = write_explorer_data(guides)
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    print(f"🗂️  Guide explorer: {written} files in {EXPLORER_DIR}")
+    print(f"  {index_path}: {kb([index_path]):.1f} KB")
+    for lang, data in index.items():
+        provinces = files(EXPLORER_DIR, [entry['url'] for entry in data['provinces']])
+        topics = files(EXPLORER_DIR, [entry['url'] for entry in data['topics']])
+        print(f"  {lang}: {data['count']} guides, {len(provinces)} province shards ({kb(provinces):.1f} KB), "
+              f"{len(topics)} topic shards ({kb(topics):.1f} KB)")
+    if stale:
+        print(f"  🧹 Removed {len(stale)} files of an earlier build")
+    print()
+
+    index_path, written, stale = write_index([record for records in guides.values() for record in records])
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    shard_sizes = [kb([path]) for path in files(SEARCH_DIR, index['shards'].values())]
+    print(f"🔎 Search index: {written} files in {SEARCH_DIR}")
+    print(f"  {index_path}: {kb([index_path]):.1f} KB")
+    print(f"  {len(shard_sizes)} shards: {sum(shard_sizes):.1f} KB, largest {max(shard_sizes):.1f} KB")
+    print(f"  {len(index['docs'])} document files: {kb(files(SEARCH_DIR, index['docs'])):.1f} KB")
+    if stale:
+        print(f"  🧹 Removed {len(stale)} files of an earlier build")
+
+    print()
+    print("✅ Done!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Check that the tools writing pages keep their file mode
+
+Pages are written through a temporary file (tempfile.mkstemp(), always
+0600) and os.replace(); a page that came out 0600 would get 403s from a
+web server running as another user. In a scratch directory, a page with
+a known mode is written by:
+  - HTMLRewriter.rewrite_file() in place (add-conversion-tracking.py)
+  - HTMLRewriter.rewrite_file() to a new file (mode of the source)
+  - BackupStore.restore() over the page (restore-backup.py)
+  - BackupStore.restore() into an empty directory (PAGE_MODE minus the
+    umask)
+
+and its mode is compared with the expected one.
+
+Usage:
+  python3 check-file-modes.py
+"""
+
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.rewriter import HTMLRewriter
+from sitetools.site import PAGE_MODE
+
+PAGE = "<!DOCTYPE html>\n<html><head><title>t</title></head><body><p>x</p></body></html>\n"
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+def rewriter():
+    rw = HTMLRewriter()
+    rw.on_end_tag('body', lambda tag: tag.before('<script src="/x.js"></script>'))
+    return rw
+
+def default_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return PAGE_MODE & ~umask
+
+def run_checks(tmp):
+    """[(description, expected mode, actual mode)]"""
+    results = []
+    for expected in (0o644, 0o664, 0o600):
+        page = tmp / f"rewrite-{expected:o}.html"
+        page.write_text(PAGE, encoding='utf-8')
+        os.chmod(page, expected)
+        rewriter().rewrite_file(page)
+        results.append((f"rewrite_file in place ({expected:o})", expected, mode(page)))
+
+    src = tmp / "source.html"
+    src.write_text(PAGE, encoding='utf-8')
+    os.chmod(src, 0o640)
+    dst = tmp / "copy.html"
+    rewriter().rewrite_file(src, dst)
+    results.append(("rewrite_file to a new file (mode of the source)", 0o640, mode(dst)))
+
+    site = tmp / "site"
+    site.mkdir()
+    page = site / "page.html"
+    page.write_text(PAGE, encoding='utf-8')
+    os.chmod(page, 0o664)
+    store = BackupStore(tmp / "backups")
+    run = BackupRun(store, 'check')
+    run.add(page, root=site)
+    run_id = run.save()
+    page.write_text(PAGE.replace('x', 'y'), encoding='utf-8')
+    store.restore(run_id, target=site)
+    results.append(("restore over the page", 0o664, mode(page)))
+
+    export = tmp / "export"
+    store.restore(run_id, target=export)
+    results.append(("restore into an empty directory", default_mode(), mode(export / "page.html")))
+    return results
+
+def main():
+    print("🔐 Checking file modes of rewritten pages...")
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run_checks(Path(tmp))
+
+    failures = 0
+    for description, expected, actual in results:
+        if expected == actual:
+            print(f"  ✅ {description}: {actual:o}")
+        else:
+            failures += 1
+            print(f"  ❌ {description}: {actual:o}, expected {expected:o}")
+
+    print()
+    print("✅ Done!" if not failures else f"❌ {failures} files with the wrong mode")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Check that the minified JavaScript behaves like the source
+
+For each script in assets/js (or the files given):
+  1. minify it with sitetools/jsmin.py and parse both versions again:
+     the token streams must match, with every name resolving to the same
+     binding (check_equivalent)
+  2. if node is installed, run both versions against a stub DOM, fire
+     every event listener they register (with fetch() served from the
+     site tree, else assets/data), and compare the traces of DOM writes
+     and calls
+
+Usage:
+  python3 check-js-minify.py
+  python3 check-js-minify.py assets/js/main.js --no-mangle
+  python3 check-js-minify.py --write        # also write the checked .min.js files
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from sitetools.jsmin import JSSyntaxError, check_equivalent, minify_js
+from sitetools.site import ROOT_DIR
+
+JS_DIR = ROOT_DIR / "assets" / "js"
+DATA_DIR = ROOT_DIR / "assets" / "data"
+
+# Runs one script in a sandbox and prints the trace as JSON. Every DOM
+# object is a recording Proxy; listeners are fired in registration order,
+# once with 'palermo' as the event target's value and once with ''.
+HARNESS = r"""
+const fs = require('fs'), path = require('path'), vm = require('vm');
+const [scriptPath, dataDir, rootDir] = process.argv.slice(2);
+const trace = [], listeners = [], timers = [];
+const show = (v) => {
+  if (typeof v === 'function') return v.__id || '<fn>';
+  if (v && typeof v === 'object') {
+    if (v.__id) return v.__id;
+    try { return JSON.parse(JSON.stringify(v, (k, x) => typeof x === 'function' ? '<fn>' : (x && x.__id) || x)); }
+    catch (e) { return '<object>'; }
+  }
+  return v;
+};
+const log = (...args) => trace.push(args.map(show));
+
+function node(id) {
+  const props = {};
+  const target = function () {};
+  return new Proxy(target, {
+    get(t, key) {
+      if (key === '__id') return id;
+      if (key === Symbol.toPrimitive || key === 'toString') return () => id;
+      if (typeof key === 'symbol' || key === 'then') return undefined;
+      if (key in props) return props[key];
+      if (key === 'addEventListener') return (type, fn) => { log('listen', id, type); listeners.push([id, type, fn]); };
+      if (key === 'querySelectorAll' || key === 'getElementsByTagName' || key === 'getElementsByClassName')
+        return (sel) => { log(key, id, sel); return [0, 1].map((i) => node(`${id}>${sel}[${i}]`)); };
+      if (key === 'matches' || key === 'contains' || key === 'length') return false;
+      if (key === 'dataset' || key === 'style') return props[key] = node(`${id}.${key}`);
+      return props[key] = node(`${id}.${key}`);
+    },
+    set(t, key, value) { log('set', id, key, value); props[key] = value; return true; },
+    apply(t, self, args) { log('call', id, ...args); return node(`${id}(${args.map((a) => typeof a === 'string' ? a : typeof a).join(',')})`); },
+    construct(t, args) { log('new', id, ...args); return node(`new ${id}`); },
+  });
+}
+
+const sandbox = node('window');
+const globals = {
+  console: { log: (...a) => log('console.log', ...a), warn: (...a) => log('console.warn', ...a), error: (...a) => log('console.error', ...a) },
+  setTimeout: (fn, ms) => { timers.push(fn); return timers.length; },
+  clearTimeout: () => {},
+  requestAnimationFrame: (fn) => { timers.push(fn); return timers.length; },
+  matchMedia: (q) => ({ matches: false, media: q }),
+  fetch: (url) => {
+    log('fetch', String(url));
+    const urlPath = String(url).split('?')[0];
+    const file = [path.join(rootDir, urlPath), path.join(dataDir, path.basename(urlPath))]
+      .find((f) => fs.existsSync(f) && fs.statSync(f).isFile());
+    const body = file ? fs.readFileSync(file, 'utf8') : null;
+    return Promise.resolve({ ok: body !== null, status: body === null ? 404 : 200,
+                             json: () => Promise.resolve(JSON.parse(body)), text: () => Promise.resolve(body) });
+  },
+  IntersectionObserver: function (cb) {
+    return { observe: (el) => { log('observe', show(el)); cb([{ isIntersecting: true, target: el }], this); },
+             unobserve: (el) => log('unobserve', show(el)), disconnect: () => log('disconnect') };
+  },
+  innerWidth: 1200, innerHeight: 800, scrollY: 20,
+  location: { pathname: '/guide/palermo/', href: 'https://architettisicilia.it/guide/palermo/', search: '' },
+  encodeURIComponent, decodeURIComponent, JSON, Math, String, Number, Array, Object, Promise, Set, Map, RegExp, Date,
+  parseInt, parseFloat, isNaN, Intl,
+};
+const context = {};
+for (const [k, v] of Object.entries(globals)) context[k] = v;
+context.window = new Proxy(context, { get: (t, k) => k in t ? t[k] : sandbox[k], set: (t, k, v) => { log('set', 'window', k, v); t[k] = v; return true; } });
+context.document = node('document');
+context.self = context.window;
+vm.createContext(context);
+Math.random = () => 0.5;
+Date.now = () => 0;
+
+const settle = async () => { for (let i = 0; i < 20; i++) { await new Promise((r) => setImmediate(r)); while (timers.length) { try { timers.shift()(); } catch (e) { log('throw', e.constructor.name); } } } };
+const event = (type, value) => ({ type, key: 'Escape', target: { value, closest: () => null }, currentTarget: null,
+                           preventDefault: () => log('preventDefault'), stopPropagation: () => log('stopPropagation') });
+
+(async () => {
+  try { vm.runInContext(fs.readFileSync(scriptPath, 'utf8'), context, { filename: 'script.js' }); }
+  catch (e) { log('throw', e.constructor.name); }
+  await settle();
+  // Second round with an empty value: the "nothing typed" branches
+  for (const value of ['palermo', '']) {
+    for (let i = 0; i < listeners.length && i < 500; i++) {
+      const [id, type, fn] = listeners[i];
+      log('fire', id, type, value);
+      try { await fn(event(type, value)); } catch (e) { log('throw', e.constructor.name); }
+      await settle();
+    }
+  }
+  process.stdout.write(JSON.stringify(trace));
+})();
+"""
+
+
+def run_in_node(node, harness, script):
+    result = subprocess.run([node, str(harness), str(script), str(DATA_DIR), str(ROOT_DIR)],
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"node exited with {result.returncode}")
+    return json.loads(result.stdout)
+
+
+def compare_traces(a, b):
+    """Index and entries of the first difference, or None"""
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i, x, y
+    if len(a) != len(b):
+        i = min(len(a), len(b))
+        return i, a[i] if i < len(a) else None, b[i] if i < len(b) else None
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check minified JavaScript against its source")
+    parser.add_argument('files', nargs='*', type=Path, help="Scripts to check (default: assets/js/*.js)")
+    parser.add_argument('--no-mangle', action='store_true', help="Check whitespace-only minification")
+    parser.add_argument('--write', action='store_true', help="Write the .min.js of every script that passes")
+    args = parser.parse_args()
+
+    files = args.files or sorted(p for p in JS_DIR.glob("*.js") if not p.name.endswith('.min.js'))
+    node = shutil.which('node')
+    if not node:
+        print("⚠️  node not found: only the structural check will run")
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        harness = Path(tmp) / "harness.js"
+        harness.write_text(HARNESS, encoding='utf-8')
+
+        for js_file in files:
+            source = js_file.read_text(encoding='utf-8')
+            try:
+                minified = minify_js(source, mangle=not args.no_mangle)
+                check_equivalent(source, minified)
+            except (JSSyntaxError, AssertionError) as e:
+                print(f"  ❌ {js_file.name}: {e}")
+                failures += 1
+                continue
+
+            status = "structure identical"
+            if node:
+                min_path = Path(tmp) / js_file.name
+                min_path.write_text(minified, encoding='utf-8')
+                try:
+                    before = run_in_node(node, harness, js_file)
+                    after = run_in_node(node, harness, min_path)
+                except (RuntimeError, subprocess.TimeoutExpired, ValueError) as e:
+                    print(f"  ❌ {js_file.name}: node run failed: {e}")
+                    failures += 1
+                    continue
+                difference = compare_traces(before, after)
+                if difference:
+                    index, x, y = difference
+                    print(f"  ❌ {js_file.name}: behaviour differs at trace entry {index}:")
+                    print(f"       source:   {json.dumps(x, ensure_ascii=False)[:300]}")
+                    print(f"       minified: {json.dumps(y, ensure_ascii=False)[:300]}")
+                    failures += 1
+                    continue
+                status += f", {len(before)} traced DOM operations identical"
+
+            print(f"  ✅ {js_file.name}: {len(source):,} → {len(minified):,} bytes, {status}")
+            if args.write:
+                js_file.with_suffix('.min.js').write_text(minified, encoding='utf-8')
+
+    print()
+    if failures:
+        print(f"❌ {failures} script(s) failed the check")
+        return 1
+    print(f"✅ {len(files)} script(s) checked")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
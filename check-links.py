@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Check every reference of the live pages against the tree and _redirects
+
+Builds the link graph (sitetools/linkgraph.py): the a[href],
+link[href], script[src] and img/source[src|srcset] URLs of every page,
+resolved against the files of the site and the rules of _redirects.
+Only pages changed since the last run are read again (--force to read
+them all); the graph stays in .build-cache/linkgraph.sqlite for the
+other build stages to query.
+
+Reported:
+  ❌ broken     nothing is served at the URL (a 404 round trip for the
+               visitor); when a file with the same name exists elsewhere
+               under assets/ (assets/img vs assets/images, ...) it is
+               suggested
+  ↪️  redirect   the URL costs a redirect (compile-redirects.py points
+               internal links at the final URL)
+
+The full list goes to reports/broken-references.csv. The script exits
+with 1 when a reference is broken.
+
+Usage:
+  python3 check-links.py
+  python3 check-links.py --jobs 4
+  python3 check-links.py --force
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from sitetools.catalogue import Catalogue
+from sitetools.linkgraph import LinkGraph
+from sitetools.parallel import add_jobs_argument
+from sitetools.site import EXCLUDED_DIRS
+
+ROOT_DIR = Path(".")
+ASSETS_DIR = ROOT_DIR / "assets"
+REPORT_PATH = ROOT_DIR / "reports" / "broken-references.csv"
+
+# Broken targets listed on screen (the CSV has them all)
+SHOWN = 15
+
+def asset_names():
+    """{file name: [site paths]} of every file under assets/"""
+    names = defaultdict(list)
+    for dirpath, dirnames, filenames in os.walk(ASSETS_DIR):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+        for name in sorted(filenames):
+            names[name].append('/' + (Path(dirpath) / name).relative_to(ROOT_DIR).as_posix())
+    return names
+
+def write_report(references, suggestions):
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(REPORT_PATH, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['page', 'tag', 'attribute', 'reference', 'target', 'status', 'final', 'suggestion'])
+        for ref in references:
+            writer.writerow([ref.page, ref.tag, ref.attr, ref.url, ref.target, ref.status, ref.final or '',
+                             ' '.join(suggestions.get(ref.target, []))])
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the links and asset references of every page")
+    add_jobs_argument(parser)
+    parser.add_argument('--force', action='store_true', help="Read every page again, not only the changed ones")
+    args = parser.parse_args()
+
+    print("🔗 Checking links and asset references...")
+    print()
+
+    with Catalogue() as catalogue, LinkGraph() as graph:
+        catalogue.refresh()
+        read, removed = graph.update(catalogue, jobs=args.jobs, force=args.force)
+        graph.resolve()
+        counts = graph.counts()
+        broken = graph.refs('broken')
+        redirected = graph.refs('redirect')
+        pages = len(catalogue.query())
+
+    print(f"📄 {pages} pages, {read} read" + (f", {removed} removed from the graph" if removed else ""))
+    print(f"  ✅ {counts.get('ok', 0):,} references to existing pages and files")
+    print(f"  🌐 {counts.get('external', 0):,} references to other sites (not checked)")
+    print(f"  ↪️  {len(redirected):,} references through a redirect")
+    print(f"  ❌ {len(broken):,} broken references")
+    print()
+
+    names = asset_names()
+    suggestions = {}
+    for ref in broken:
+        found = [path for path in names.get(ref.target.rstrip('/').rsplit('/', 1)[-1], []) if path != ref.target]
+        if found:
+            suggestions[ref.target] = found
+
+    by_target = defaultdict(set)
+    for ref in broken:
+        by_target[ref.target].add(ref.page)
+    for target, referrers in sorted(by_target.items(), key=lambda item: (-len(item[1]), item[0]))[:SHOWN]:
+        example = sorted(referrers)[0]
+        more = f" and {len(referrers) - 1} more" if len(referrers) > 1 else ""
+        print(f"  ❌ {target}  ({example}{more})")
+        if target in suggestions:
+            print(f"      → exists as {', '.join(suggestions[target])}")
+    if len(by_target) > SHOWN:
+        print(f"  ... {len(by_target) - SHOWN} more broken targets")
+
+    targets = defaultdict(set)
+    for ref in redirected:
+        targets[(ref.target, ref.final)].add(ref.page)
+    for (target, final), referrers in sorted(targets.items())[:SHOWN]:
+        print(f"  ↪️  {target} → {final}  ({len(referrers)} pages)")
+
+    write_report(broken + redirected, suggestions)
+    print()
+    print(f"📝 Report: {REPORT_PATH} ({len(broken) + len(redirected)} rows)")
+
+    print()
+    print("✅ Done!" if not broken else f"⚠️  Done, {len(by_target)} broken targets")
+    return 1 if broken else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Check that every HTML parser backend gives the same output on our pages
+
+For each page, every backend parses it, the soup-based fixers run on the
+result, and the serialized output is compared with html.parser's:
+  ✅ identical      byte-for-byte the same
+  📝 documented     same after the normalizations in DOCUMENTED_DIFFERENCES
+  ❌ different      anything else (a diff excerpt is printed)
+
+Usage:
+  python3 check-parser-parity.py                      # all live pages
+  python3 check-parser-parity.py --limit 50
+  python3 restore-backup.py --run first --to /tmp/originals
+  python3 check-parser-parity.py /tmp/originals       # pre-fix pages: fixers do more work
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from sitetools.parsing import (DEFAULT_BACKEND, DOCUMENTED_DIFFERENCES, available_backends,
+                               normalize_for_parity, parse_html)
+from sitetools.pipeline import load_script
+from sitetools.site import ROOT_DIR, iter_html_files
+
+
+def run_fixers(relpath, soup):
+    """Apply the soup-based fixers in pipeline order, without touching disk"""
+    load_script('fix-structured-data.py').optimize_soup(soup)
+    load_script('add-social-proof.py').apply_social_proof(relpath, soup)
+    load_script('add-conversion-tracking.py').insert_tracking(soup)
+    return str(soup)
+
+
+def first_difference(a, b, context=60):
+    """Return a short excerpt around the first differing character"""
+    i = 0
+    limit = min(len(a), len(b))
+    while i < limit and a[i] == b[i]:
+        i += 1
+    start = max(0, i - context)
+    return a[start:i + context], b[start:i + context]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serialized output across HTML parser backends")
+    parser.add_argument('paths', nargs='*', type=Path,
+                        help="Directories or files to check (default: every live page)")
+    parser.add_argument('--backends', default=None,
+                        help="Comma-separated backends to compare with html.parser (default: all installed)")
+    parser.add_argument('--limit', type=int, default=0, help="Check at most N pages")
+    parser.add_argument('--raw', action='store_true', help="Compare plain parse/serialize only, skip the fixers")
+    args = parser.parse_args()
+
+    if args.backends:
+        backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    else:
+        backends = [b for b in available_backends() if b != DEFAULT_BACKEND]
+
+    missing = [b for b in backends if b not in available_backends()]
+    if missing:
+        print(f"❌ Not installed: {', '.join(missing)}")
+        return 1
+    if not backends:
+        print("⚠️  No alternative backend installed. Run: pip install lxml html5lib")
+        return 1
+
+    # (root, file) pairs so fixers see paths relative to the site root they came from
+    targets = []
+    for path in args.paths or [ROOT_DIR]:
+        if path.is_file():
+            targets.append((ROOT_DIR, path))
+        else:
+            targets.extend((path, f) for f in iter_html_files(path))
+    if args.limit:
+        targets = targets[:args.limit]
+
+    print("🔬 Parser parity check")
+    print(f"   Baseline: {DEFAULT_BACKEND}   Compared: {', '.join(backends)}")
+    print(f"   Mode: {'parse + serialize' if args.raw else 'parse + fixers + serialize'}")
+    print(f"   Pages: {len(targets)}")
+    print()
+
+    results = {b: {'identical': 0, 'documented': 0, 'different': 0} for b in backends}
+    timings = {b: 0.0 for b in [DEFAULT_BACKEND] + backends}
+    failures = 0
+
+    for root, filepath in targets:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        relpath = filepath.relative_to(root)
+
+        outputs = {}
+        for backend in [DEFAULT_BACKEND] + backends:
+            start = time.perf_counter()
+            soup = parse_html(content, backend)
+            timings[backend] += time.perf_counter() - start
+            outputs[backend] = str(soup) if args.raw else run_fixers(relpath, soup)
+
+        baseline = outputs[DEFAULT_BACKEND]
+        for backend in backends:
+            output = outputs[backend]
+            if output == baseline:
+                results[backend]['identical'] += 1
+                continue
+
+            expected = normalize_for_parity(baseline, backend)
+            got = normalize_for_parity(output, backend)
+            if got == expected:
+                results[backend]['documented'] += 1
+            else:
+                results[backend]['different'] += 1
+                failures += 1
+                if failures <= 10:
+                    expected, got = first_difference(expected, got)
+                    print(f"❌ {filepath} ({backend})")
+                    print(f"   {DEFAULT_BACKEND}: {expected!r}")
+                    print(f"   {backend}: {got!r}")
+
+    print()
+    print("Results:")
+    for backend in backends:
+        r = results[backend]
+        print(f"  • {backend}: ✅ {r['identical']} identical, 📝 {r['documented']} documented, ❌ {r['different']} different")
+
+    print()
+    print("Parse time:")
+    for backend, seconds in timings.items():
+        print(f"  • {backend}: {seconds:.2f}s")
+
+    print()
+    print("Documented differences:")
+    for diff_backends, description, _normalize in DOCUMENTED_DIFFERENCES:
+        applicable = [b for b in backends if b in diff_backends]
+        if applicable:
+            print(f"  • {', '.join(applicable)}: {description}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Compile _redirects: collapse chains, check targets, fix internal links
+
+_redirects is parsed into a graph of rules (sitetools/redirects.py):
+- a rule whose target is redirected again costs the visitor one extra
+  round trip per hop: its target is rewritten to the final URL, with
+  the query string and fragment picked up along the way
+- a permanent (301/308) rule whose chain goes through a temporary
+  redirect (302/303/307) is reported and left as it is: collapsing it
+  would make browsers cache the temporary hop for good
+- loops and targets with no page or file behind them are reported (and
+  make the script exit with 1); a rule in a loop is left as it is
+- unforced rules that never fire because their source page exists are
+  listed
+
+Only the target of the rules concerned changes; comments, the
+EN_REDIRECTS_START/END markers and the order of the rules stay as they
+are.
+
+Then every page is scanned for links (href, root-relative or on
+https://architettisicilia.it) to a redirected URL: they are pointed at
+the final URL, query string and fragment kept, so following an internal
+link never costs a redirect. This is the redirect-links pass of
+run-pipeline.py; pages already scanned against the same rules are
+skipped through the build cache.
+
+Usage:
+  python3 compile-redirects.py
+  python3 compile-redirects.py --jobs 4
+  python3 compile-redirects.py --check        # report only, write nothing
+"""
+
+import argparse
+import re
+import sys
+
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.parallel import add_jobs_argument
+from sitetools.pipeline import PASSES, register_pass, run_pipeline
+from sitetools.redirects import REDIRECTS_PATH, RedirectMap, compile_rules, load_redirects, rewrite_targets
+from sitetools.site import SITE_URL
+from sitetools.spans import EditList
+
+# href value: group 2 is the path, group 3 the query string and fragment
+HREF_RE = re.compile(r'''\bhref\s*=\s*(["']?)(?:%s)?(/(?!/)[^"'\s>?#]*)([^"'\s>]*)\1''' % re.escape(SITE_URL),
+                     re.IGNORECASE)
+
+# Built on first use in each process (worker processes with --jobs included)
+_REDIRECTS = None
+
+def redirect_map():
+    global _REDIRECTS
+    if _REDIRECTS is None:
+        _REDIRECTS = RedirectMap(load_redirects())
+    return _REDIRECTS
+
+def link_target(path, rest):
+    """Final URL for a link to path + rest, or None if the link is not redirected"""
+    final = redirect_map().final(path)
+    if final is None:
+        return None
+    # A query string or fragment set along the chain wins over the link's
+    return final if re.search(r'[?#]', final) else final + rest
+
+@register_pass('redirect-links', depends=['_redirects', 'sitetools/redirects.py'])
+def redirect_links_pass(doc):
+    """Pipeline pass: point links to redirected URLs at their final URL"""
+    text = doc.text
+    if 'href' not in text:
+        return []
+
+    edits = EditList(text)
+    changed = []
+    for match in HREF_RE.finditer(text):
+        final = link_target(match.group(2), match.group(3))
+        if final is None:
+            continue
+        # Path onwards only: an absolute link keeps https://architettisicilia.it
+        edits.replace(match.start(2), match.end(3) - match.start(2), final, source='redirect-links')
+        changed.append(f"{match.group(2)} → {final}")
+
+    if not edits:
+        return []
+    warnings = doc.apply_edits(edits)
+    return [f"Link redirected: {change}" for change in dict.fromkeys(changed)] + warnings
+
+def main():
+    parser = argparse.ArgumentParser(description="Collapse redirect chains in _redirects, check targets "
+                                                 "and point internal links at final URLs")
+    parser.add_argument('--check', action='store_true',
+                        help="Report chains, loops, missing targets and redirected links without writing")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    print("↪️  Compiling redirects...")
+    print()
+
+    with open(REDIRECTS_PATH, 'r', encoding='utf-8') as f:
+        text = f.read()
+    rules = load_redirects()
+    compiled = compile_rules(rules)
+    print(f"📄 {REDIRECTS_PATH.name}: {len(rules)} rules")
+
+    for rule, final, hops in compiled.chains:
+        print(f"  🔗 line {rule.line}: {rule.source} → {final} ({hops + 1} hops → 1)")
+    for rule, final, through in compiled.temporary:
+        print(f"  ⏳ line {rule.line}: {rule.source} → {final} goes through a {through.status} "
+              f"(line {through.line}), left as it is")
+    for rule, loop in compiled.loops:
+        print(f"  🔁 line {rule.line}: loop {' → '.join(loop)}")
+    for rule, final in compiled.missing:
+        print(f"  ❌ line {rule.line}: {rule.source} → {final}: no such page or file")
+    for rule in compiled.shadowed:
+        print(f"  💤 line {rule.line}: {rule.source} exists, the rule never fires (add ! to force it)")
+    if not (compiled.chains or compiled.temporary or compiled.loops or compiled.missing or compiled.shadowed):
+        print("  ✅ Every rule is a single hop to an existing page")
+
+    if compiled.targets and not args.check:
+        with open(REDIRECTS_PATH, 'w', encoding='utf-8') as f:
+            f.write(rewrite_targets(text, compiled.targets))
+        print(f"  📝 {len(compiled.targets)} targets rewritten")
+    print()
+
+    pages = select_pages()
+    cache = None if args.force or args.check else BuildCache()
+    backup = None if args.check else BackupRun(BackupStore(), 'redirect-links')
+
+    fixed = 0
+    links = 0
+    for filepath, changes in run_pipeline([PASSES['redirect-links']], files=pages, write=not args.check,
+                                          jobs=args.jobs, cache=cache, backup=backup):
+        redirected = [change for _, change in changes if change.startswith("Link redirected")]
+        if redirected:
+            fixed += 1
+            links += len(redirected)
+            if fixed <= 10:
+                print(f"  ✓ {filepath}: {len(redirected)} links")
+                for change in redirected[:3]:
+                    print(f"      {change}")
+
+    if cache is not None:
+        cache.save()
+    run_id = backup.save() if backup is not None else None
+
+    verb = "to redirect" if args.check else "pointed at their final URL"
+    print(f"🔗 {links} links on {fixed} of {len(pages)} pages {verb}")
+    if run_id:
+        print(f"   Undo with: python3 restore-backup.py --run {run_id}")
+
+    print()
+    print("✅ Done!")
+    return 1 if compiled.loops or compiled.missing else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,75 +4,70 @@ Improved CTA replacement script
 Works with both formatted and minified HTML
 """
 
+import argparse
 import re
 from pathlib import Path
 from bs4 import BeautifulSoup
 
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.classify import PAGE_CATEGORY_RULES, Classifier
+from sitetools.cta import CTA_STYLESHEET, write_cta_css
+from sitetools.pipeline import PASSES, register_pass
+from sitetools.site import GUIDE_SECTIONS
+
 ROOT_DIR = Path(".")
 
-# CTA templates
+# CTA templates (styled by the classes in sitetools/cta.py)
 CTA_SANATORIA = '''<div class="notice cta-urgent">
 <strong>🚨 Rogito bloccato o immobile irregolare?</strong>
 <p>Studio 4e segue pratiche in sanatoria da oltre 20 anni. <strong>Prima consulenza telefonica gratuita</strong> per valutare il tuo caso.</p>
-<p style="margin-top:12px">
-<a class="btn" href="tel:+393299736697" style="font-size:16px">📞 Chiama ora: +39 329 973 6697</a>
-<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20ho%20un%20problema%20di%20regolarit%C3%A0%20urbanistica.%20Posso%20raccontarti%20il%20caso%3F" style="margin-left:10px">WhatsApp</a>
+<p class="cta-actions">
+<a class="btn cta-call" href="tel:+393299736697">📞 Chiama ora: +39 329 973 6697</a>
+<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20ho%20un%20problema%20di%20regolarit%C3%A0%20urbanistica.%20Posso%20raccontarti%20il%20caso%3F">WhatsApp</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • 50+ progetti seguiti in Sicilia • 20+ anni esperienza</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • 50+ progetti seguiti in Sicilia • 20+ anni esperienza</p>
 </div>'''
 
 CTA_RISTRUTTURAZIONE = '''<div class="notice cta-standard">
 <strong>Stai pianificando una ristrutturazione?</strong>
 <p>Studio 4e a Palermo dal 2002. <strong>Preventivo e primo confronto gratuiti</strong>. Sopralluogo, progetto, pratiche e direzione lavori.</p>
-<p style="margin-top:12px">
+<p class="cta-actions">
 <a class="btn" href="tel:+393299736697">📞 Chiama: +39 329 973 6697</a>
-<a class="btn secondary" href="/inizia-da-qui/" style="margin-left:10px">Inizia da qui</a>
+<a class="btn secondary" href="/inizia-da-qui/">Inizia da qui</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • 20+ anni di esperienza • 50+ progetti in Sicilia</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • 20+ anni di esperienza • 50+ progetti in Sicilia</p>
 </div>'''
 
 CTA_PRATICHE = '''<div class="notice cta-standard">
 <strong>Serve chiarezza sulle pratiche edilizie?</strong>
 <p>CILA, SCIA, permessi, varianti. Studio 4e verifica lo stato legittimo e segue l'iter completo. <strong>Prima valutazione telefonica gratuita</strong>.</p>
-<p style="margin-top:12px">
+<p class="cta-actions">
 <a class="btn" href="tel:+393299736697">📞 Chiama: +39 329 973 6697</a>
-<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20devo%20capire%20che%20pratica%20edilizia%20serve%20per%20il%20mio%20progetto." style="margin-left:10px">WhatsApp</a>
+<a class="btn secondary" href="https://wa.me/393299736697?text=Ciao%2C%20devo%20capire%20che%20pratica%20edilizia%20serve%20per%20il%20mio%20progetto.">WhatsApp</a>
 </p>
-<p style="font-size:13px; opacity:0.8; margin-top:8px">⭐ 4.8/5 su Houzz • Studio a Palermo dal 2002</p>
+<p class="cta-proof">⭐ 4.8/5 su Houzz • Studio a Palermo dal 2002</p>
 </div>'''
 
-PHONE_CTA = '''<div class="phone-cta" style="margin:14px 0; padding:12px; background:rgba(122,29,82,0.08); border-left:4px solid #7a1d52; border-radius:12px">
-<p style="margin:0; font-size:14px; font-weight:600">📞 Hai un caso urgente? <a href="tel:+393299736697" style="color:#7a1d52; font-weight:700">Chiama ora: +39 329 973 6697</a></p>
+PHONE_CTA = '''<div class="phone-cta">
+<p>📞 Hai un caso urgente? <a href="tel:+393299736697">Chiama ora: +39 329 973 6697</a></p>
 </div>'''
 
-def detect_category(filepath, content):
-    """Detect page category"""
-    path_str = str(filepath).lower()
-    content_lower = content.lower()
-
-    if any(word in path_str or word in content_lower for word in ['sanatoria', 'regolarit', 'rogito', 'vincoli', 'verifica-stato-legittimo']):
-        return 'sanatoria'
-
-    if any(word in path_str or word in content_lower for word in ['ristrutturazione', 'appartamento', 'villa', 'interni']):
-        return 'ristrutturazione'
+PAGE_CATEGORIES = Classifier(PAGE_CATEGORY_RULES, fields=('path', 'body'))
 
-    if any(word in path_str or word in content_lower for word in ['cila', 'scia', 'permess', 'pratica', 'autorizzazioni']):
-        return 'pratiche'
-
-    return 'default'
-
-def process_file(filepath):
-    """Process single file"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+def detect_category(filepath, content):
+    """Detect page category from its path and full content"""
+    return PAGE_CATEGORIES.classify(default='default', path=str(filepath), body=content)
 
+def apply_ctas(filepath, content):
+    """Add phone CTA and category CTA to page content, return (content, changes)"""
     # Skip if already has our CTA
     if 'cta-urgent' in content or 'cta-standard' in content:
-        return False, []
+        return content, []
 
     # Skip if no article
     if '<article class="article">' not in content:
-        return False, []
+        return content, []
 
     changes = []
 
@@ -101,6 +96,23 @@ def process_file(filepath):
 
         changes.append(f'CTA replaced ({category})')
 
+    return content, changes
+
+@register_pass('cta-improved', sections=GUIDE_SECTIONS, depends=['sitetools/classify.py', 'sitetools/cta.py'])
+def cta_pass(doc):
+    """Pipeline pass: same replacements as process_file on a shared document"""
+    content, changes = apply_ctas(doc.path, doc.text)
+    if changes:
+        doc.text = content
+    return changes
+
+def process_file(filepath):
+    """Process single file"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    content, changes = apply_ctas(filepath, content)
+
     # Write back if changes
     if changes:
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -110,20 +122,33 @@ def process_file(filepath):
     return False, []
 
 def main():
+    parser = argparse.ArgumentParser(description="Add phone CTAs and category CTAs to guide pages")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
     print("🚀 Adding optimized CTAs and phone links...")
     print()
 
+    if write_cta_css():
+        print(f"🎨 CTA rules written to {CTA_STYLESHEET}: run minify-assets.py")
+        print()
+
     # Process guide pages
-    guide_pages = list(ROOT_DIR.glob("guide/**/*.html")) + list(ROOT_DIR.glob("sicilia/**/*.html"))
+    guide_pages = select_pages(GUIDE_SECTIONS)
 
     processed = 0
     stats = {'sanatoria': 0, 'ristrutturazione': 0, 'pratiche': 0, 'default': 0}
 
-    for filepath in guide_pages:
-        if 'backup-original' in str(filepath):
-            continue
+    # Skip pages already processed by this version of the script
+    cache = BuildCache()
+    version = PASSES['cta-improved'].version
+    if not args.force:
+        guide_pages = cache.stale('cta-improved', version, guide_pages)
 
+    for filepath in guide_pages:
         changed, changes = process_file(filepath)
+        cache.record('cta-improved', version, filepath)
+
         if changed:
             processed += 1
 
@@ -143,6 +168,8 @@ def main():
                 for change in changes:
                     print(f"   → {change}")
 
+    cache.save()
+
     print()
     print(f"✅ Done! Modified {processed} files")
     print()
@@ -2,110 +2,68 @@
 """
 Remove keyword stuffing from lede paragraphs
 Pattern: "A Città, keyword a città diventa..."
+Rules: lede-rules.json, rulesets "keyword-stuffing" and "keyword-stuffing-page"
 """
 
-import re
+import argparse
 from pathlib import Path
 
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.pipeline import PASSES, register_pass
+from sitetools.rules import RuleStats, get_ruleset, merge_stats, print_report
+from sitetools.site import GUIDE_SECTIONS, LEDE_RE
+from sitetools.spans import EditList
+
 ROOT_DIR = Path(".")
 
-def fix_lede(content):
-    """Remove keyword stuffing from lede paragraphs"""
+def fix_lede(content, stats=None):
+    """Record keyword stuffing removals across the page as span edits
+
+    All patterns run as one combined matcher over the page, so matches
+    never overlap: the leftmost wins, ties go to the rule listed first.
+    """
+    edits = EditList(content)
 
     # Pattern 1: "A Città, keyword a città diventa un problema quando"
-    # Replace with: "Quando si lavora su [context], keyword diventa critico quando"
-
-    patterns = [
-        # Generic pattern: A [Città], [keyword] a [città] diventa
-        (
-            r'A ([A-Z][a-zà-ù]+), ([a-zà-ù\s]+) a \1 diventa un problema quando',
-            lambda m: f'Quando si lavora su {get_context(m.group(2))}, {m.group(2)} diventa critico quando'
-        ),
-        # Pattern 2: duplicate city name anywhere
-        (
-            r'([A-Z][a-zà-ù]+),\s*([a-zà-ù\s]+)\s+a\s+\1',
-            lambda m: f'{m.group(1)}, {m.group(2)}'
-        ),
-    ]
-
-    for pattern, replacement in patterns:
-        content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
-
-    return content
-
-def get_context(keyword):
-    """Get natural context for keyword"""
-    contexts = {
-        'architetto': 'progetti residenziali e commerciali',
-        'sanatoria': 'immobili con difformità urbanistiche',
-        'ristrutturazione': 'interventi edilizi complessi',
-        'cila': 'manutenzione straordinaria e piccoli interventi',
-        'scia': 'opere che modificano prospetti o volumi',
-        'pratiche': 'iter amministrativi e autorizzazioni',
-        'direzione lavori': 'cantieri con più specialità',
-        'computo metrico': 'preventivi e gare d\'appalto',
-        'capitolato': 'specifiche tecniche e qualità',
-        'verifica': 'due diligence e acquisti immobiliari',
-        'regolarità': 'compravendite e rogiti',
-        'vincoli': 'aree soggette a tutela',
-        'cambio destinazione': 'trasformazioni funzionali',
-        'frazionamento': 'divisioni catastali',
-        'accorpamento': 'unioni immobiliari',
-    }
-
-    keyword_lower = keyword.lower().strip()
-    for key, context in contexts.items():
-        if key in keyword_lower:
-            return context
-
-    return 'interventi edilizi'
-
-def fix_lede_simple(content):
-    """Simpler approach: just remove duplicate city mentions in lede"""
+    # -> "Quando si lavora su [context], keyword diventa critico quando"
+    # Pattern 2: duplicate city name anywhere
+    for rule, match in get_ruleset('keyword-stuffing-page').finditer(content, stats):
+        edits.replace_match(match, rule.expand(match), source=f'keyword-stuffing {rule.name}')
+
+    return edits
+
+def fix_lede_simple(content, stats=None):
+    """Simpler approach: just remove duplicate city mentions in lede (as a span edit)"""
+    edits = EditList(content)
 
     # Find lede paragraph
-    lede_match = re.search(r'<p class="lede">([^<]+)</p>', content, re.DOTALL)
+    lede_match = LEDE_RE.search(content)
     if not lede_match:
-        return content
-
-    original_lede = lede_match.group(1)
-
-    # Remove pattern: "A Città, keyword a città"
-    # Replace with: "A Città, keyword"
-    fixed_lede = re.sub(
-        r'A ([A-Z][a-zà-ù]+),\s*([^,]+?)\s+a\s+\1',
-        r'A \1, \2',
-        original_lede,
-        flags=re.IGNORECASE
-    )
-
-    # If no change, try another pattern
-    if fixed_lede == original_lede:
-        # Pattern: mentions city twice in first sentence
-        cities = ['Palermo', 'Catania', 'Messina', 'Siracusa', 'Trapani',
-                  'Ragusa', 'Agrigento', 'Caltanissetta', 'Enna']
-
-        for city in cities:
-            # Count occurrences in first 150 chars
-            first_part = fixed_lede[:150]
-            count = first_part.lower().count(city.lower())
-
-            if count >= 2:
-                # Remove second mention
-                fixed_lede = re.sub(
-                    rf'\b{city}\b',
-                    lambda m, c=[0]: m.group(0) if (c.__setitem__(0, c[0] + 1), c[0] == 1)[1] else '',
-                    fixed_lede,
-                    count=1,
-                    flags=re.IGNORECASE
-                )
-                # Clean up double spaces
-                fixed_lede = re.sub(r'\s+', ' ', fixed_lede)
-
-    # Replace in content
-    content = content.replace(original_lede, fixed_lede)
-
-    return content
+        return edits
+
+    # "A Città, keyword a città" -> "A Città, keyword"
+    fixed_lede = get_ruleset('keyword-stuffing').apply(lede_match.group(1), stats)
+
+    # Replace the lede only, not identical text elsewhere on the page
+    edits.replace_match(lede_match, fixed_lede, group=1, source='keyword-stuffing')
+
+    return edits
+
+@register_pass('keyword-stuffing', sections=GUIDE_SECTIONS, finalize=merge_stats,
+               depends=['lede-rules.json', 'sitetools/rules.py'])
+def keyword_stuffing_pass(doc):
+    """Pipeline pass: same lede fix as process_file on a shared document"""
+    if '<p class="lede">' not in doc.text:
+        return []
+
+    stats = RuleStats()
+    edits = fix_lede_simple(doc.text, stats)
+    doc.outputs['keyword-stuffing'] = stats.data
+    if not edits:
+        return []
+
+    return ["Keyword stuffing removed"] + doc.apply_edits(edits)
 
 def process_file(filepath):
     """Process single file"""
@@ -117,34 +75,48 @@ def process_file(filepath):
     if '<p class="lede">' not in content:
         return False
 
-    original_content = content
-    content = fix_lede_simple(content)
+    edits = fix_lede_simple(content)
+    if not edits:
+        return False
 
-    if content != original_content:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return True
+    content = edits.apply()
+    for line in edits.describe_conflicts():
+        print(f"⚠️  {filepath}: {line}")
 
-    return False
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Remove keyword stuffing from lede paragraphs")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
     print("🚀 Removing keyword stuffing from lede paragraphs...")
     print()
 
     # Find all HTML guide pages
-    guide_files = list(ROOT_DIR.glob("guide/**/*.html")) + list(ROOT_DIR.glob("sicilia/**/*.html"))
+    guide_files = select_pages(GUIDE_SECTIONS)
 
     processed = 0
 
+    # Skip pages already processed by this version of the script
+    cache = BuildCache()
+    version = PASSES['keyword-stuffing'].version
+    if not args.force:
+        guide_files = cache.stale('keyword-stuffing', version, guide_files)
+
     for filepath in guide_files:
-        if 'backup-original' in str(filepath):
-            continue
+        changed = process_file(filepath)
+        cache.record('keyword-stuffing', version, filepath)
 
-        if process_file(filepath):
+        if changed:
             processed += 1
             if processed <= 20:
                 print(f"✅ {filepath.relative_to(ROOT_DIR)}")
 
+    cache.save()
+
     print()
     print(f"✅ Done! Fixed {processed} files")
     print()
@@ -154,6 +126,7 @@ def main():
     print()
     print("  ❌ BEFORE: 'A Catania, sanatoria edilizia a Catania quando'")
     print("  ✅ AFTER:  'A Catania, sanatoria edilizia quando'")
+    print_report()
 
 if __name__ == "__main__":
     main()
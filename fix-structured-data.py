@@ -5,31 +5,31 @@ Fix critical SEO issues across all HTML files:
 2. Fix title tags (remove <span> and <a> tags)
 3. Add lazy loading to images
 4. Extract inline CSS to external file
+
+Usage: python3 fix-structured-data.py [--jobs N] [--force] [--parser lxml]
 """
 
+import argparse
 import os
 import re
 import json
+from functools import partial
 from pathlib import Path
-from bs4 import BeautifulSoup
 import html
 
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.parsing import add_parser_argument, parse_fragment, parse_html, set_backend
+from sitetools.pipeline import PASSES, register_pass
+
 # Configuration
 ROOT_DIR = Path(".")
-BACKUP_DIR = Path("./backup-original")
 CSS_OUTPUT = Path("./assets/css/inline-fixes.css")
 
-def backup_file(filepath):
-    """Create backup of original file"""
-    backup_path = BACKUP_DIR / filepath.relative_to(ROOT_DIR)
-    backup_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if not backup_path.exists():
-        import shutil
-        shutil.copy2(filepath, backup_path)
-
-def clean_json_ld(script_tag):
-    """Remove HTML from JSON-LD content"""
+def clean_json_ld(script_tag, warnings):
+    """Remove HTML from JSON-LD content (problems are appended to warnings)"""
     try:
         content = script_tag.string
         if not content:
@@ -51,11 +51,11 @@ def clean_json_ld(script_tag):
             script_tag.string = content
             return True
         except json.JSONDecodeError:
-            print(f"  ⚠️  Invalid JSON after cleaning, skipping")
+            warnings.append("Invalid JSON after cleaning, skipping")
             return False
 
     except Exception as e:
-        print(f"  ⚠️  Error cleaning JSON-LD: {e}")
+        warnings.append(f"Error cleaning JSON-LD: {e}")
         return False
 
 def fix_title_tag(soup):
@@ -64,6 +64,9 @@ def fix_title_tag(soup):
     if title:
         # Get text content only, strip all HTML
         clean_text = title.get_text(strip=True)
+        if '<' in clean_text:
+            # lxml and html5lib keep tags inside <title> as literal text
+            clean_text = parse_fragment(clean_text).get_text(strip=True)
         title.clear()
         title.string = clean_text
         return True
@@ -91,48 +94,45 @@ def add_lazy_loading(soup):
 
     return count
 
-def extract_inline_css(soup, css_file_path):
-    """Extract global-fixes-style to external file"""
+def extract_inline_css(soup):
+    """Replace global-fixes-style with a link to the external file
+
+    Returns the extracted CSS (or None). Writing the file is left to
+    save_extracted_css() so that parallel workers never race on it.
+    """
     style_tag = soup.find('style', id='global-fixes-style')
 
     if style_tag and style_tag.string:
-        css_content = style_tag.string
-
-        # Write to external CSS file (append mode, check if already exists)
-        if not css_file_path.exists():
-            css_file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(css_file_path, 'w', encoding='utf-8') as f:
-                f.write(css_content)
-            print(f"✅ Extracted inline CSS to {css_file_path}")
+        css_content = str(style_tag.string)
 
         # Replace inline style with link to external CSS
         link_tag = soup.new_tag('link', rel='stylesheet', href='/assets/css/inline-fixes.css')
         style_tag.replace_with(link_tag)
 
-        return True
+        return css_content
 
-    return False
+    return None
 
-def process_html_file(filepath):
-    """Process single HTML file"""
-    print(f"Processing: {filepath}")
+def save_extracted_css(css_content, css_file_path):
+    """Write extracted CSS to external file (first page wins), return True if written"""
+    if not css_content or css_file_path.exists():
+        return False
 
-    # Backup original
-    backup_file(filepath)
+    css_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(css_file_path, 'w', encoding='utf-8') as f:
+        f.write(css_content)
 
-    # Read file
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Parse with BeautifulSoup
-    soup = BeautifulSoup(content, 'html.parser')
+    return True
 
+def optimize_soup(soup):
+    """Apply all fixes to a parsed page, return (changes, warnings, extracted CSS)"""
     changes = []
+    warnings = []
 
     # 1. Fix JSON-LD structured data
     json_ld_scripts = soup.find_all('script', type='application/ld+json')
     for script in json_ld_scripts:
-        if clean_json_ld(script):
+        if clean_json_ld(script, warnings):
             changes.append("JSON-LD cleaned")
 
     # 2. Fix title tag
@@ -144,46 +144,117 @@ def process_html_file(filepath):
     if img_count > 0:
         changes.append(f"{img_count} images lazy-loaded")
 
-    # 4. Extract inline CSS (only once, first file)
-    if extract_inline_css(soup, CSS_OUTPUT):
+    # 4. Extract inline CSS (file is written once, from the first page)
+    css_content = extract_inline_css(soup)
+    if css_content:
         changes.append("CSS extracted")
 
-    # Write back
+    return changes, warnings, css_content
+
+def report_extracted_css(filepath, css_content):
+    """Save extracted CSS from the first page that has it (runs in file order)"""
+    if save_extracted_css(css_content, CSS_OUTPUT):
+        print(f"✅ Extracted inline CSS to {CSS_OUTPUT}")
+
+@register_pass('structured-data', kind='soup', finalize=report_extracted_css)
+def structured_data_pass(doc):
+    """Pipeline pass: same fixes as process_html_file on a shared document (the pipeline backs pages up)"""
+    changes, warnings, css_content = optimize_soup(doc.soup)
+    doc.outputs['structured-data'] = css_content
+    return changes + [f"⚠️  {warning}" for warning in warnings]
+
+def process_html_file(filepath, store=None):
+    """Process single HTML file, return (changes, warnings, extracted CSS, backup hash)
+
+    Runs in worker processes with --jobs, so it only returns results;
+    main() does all the printing and records the backups.
+    """
+    # Read file
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # Parse with BeautifulSoup (backend from --parser)
+    soup = parse_html(content)
+
+    changes, warnings, css_content = optimize_soup(soup)
+
+    # Back up the current content, then write back
+    backup_hash = None
     if changes:
+        output = str(soup)
+        if store is not None and output != content:
+            backup_hash = store.put_file(filepath)
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(str(soup))
+            f.write(output)
 
-        print(f"  ✅ {', '.join(changes)}")
-        return True
-    else:
-        print(f"  ⏭️  No changes needed")
-        return False
+    return changes, warnings, css_content, backup_hash
 
 def main():
     """Process all HTML files"""
+    parser = argparse.ArgumentParser(description="Fix structured data, titles, lazy loading and inline CSS")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    add_parser_argument(parser)
+    args = parser.parse_args()
+
+    if args.parser:
+        set_backend(args.parser)
+
+    backup = BackupRun(BackupStore(), 'structured-data')
+
     print("🚀 Starting HTML optimization...")
     print(f"📁 Root directory: {ROOT_DIR.absolute()}")
-    print(f"💾 Backups will be saved to: {BACKUP_DIR.absolute()}")
+    print(f"💾 Backups will be saved to: {backup.store.path}")
     print()
 
-    # Find all HTML files
-    html_files = list(ROOT_DIR.rglob("*.html"))
+    # Find all HTML files (backups live outside the site)
+    html_files = select_pages()
     print(f"Found {len(html_files)} HTML files")
     print()
 
+    live_files = html_files
+
+    # Skip pages already processed by this version of the script
+    cache = BuildCache()
+    version = PASSES['structured-data'].version
+    if not args.force:
+        cached = len(live_files)
+        live_files = cache.stale('structured-data', version, live_files)
+        cached -= len(live_files)
+        if cached:
+            print(f"⏭️  {cached} files unchanged since last run (build cache)")
+            print()
+
     # Process files
     processed = 0
-    for filepath in html_files:
-        # Skip backup directory
-        if BACKUP_DIR in filepath.parents:
-            continue
+    worker = partial(process_html_file, store=backup.store)
+    for filepath, (changes, warnings, css_content, backup_hash) in map_files(worker, live_files, args.jobs):
+        print(f"Processing: {filepath}")
+
+        if backup_hash is not None:
+            backup.record(filepath, backup_hash)
+
+        for warning in warnings:
+            print(f"  ⚠️  {warning}")
 
-        if process_html_file(filepath):
+        report_extracted_css(filepath, css_content)
+
+        if changes:
+            print(f"  ✅ {', '.join(changes)}")
             processed += 1
+        else:
+            print(f"  ⏭️  No changes needed")
+
+        cache.record('structured-data', version, filepath)
+
+    cache.save()
+    run_id = backup.save()
 
     print()
     print(f"✅ Done! Processed {processed}/{len(html_files)} files")
-    print(f"📁 Backups saved to: {BACKUP_DIR}")
+    if run_id:
+        print(f"📁 Backup run {run_id} saved to: {backup.store.path}")
+        print(f"   Undo with: python3 restore-backup.py --run {run_id}")
     print(f"📄 Inline CSS extracted to: {CSS_OUTPUT}")
 
 if __name__ == "__main__":
@@ -1,110 +1,90 @@
 #!/usr/bin/env python3
 """
 Rewrite unnatural lede paragraphs with human-sounding text
+Rules: lede-rules.json, ruleset "unnatural-lede" and table "natural_ledes"
 """
 
+import argparse
 import re
 from pathlib import Path
 
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.classify import Classifier
+from sitetools.pipeline import PASSES, register_pass
+from sitetools.rules import RuleStats, get_ruleset, get_table, load_rules, merge_stats, print_report
+from sitetools.site import GUIDE_SECTIONS, LEDE_RE
+from sitetools.spans import EditList
+
 ROOT_DIR = Path(".")
 
 # Natural replacements by keyword/topic
-NATURAL_LEDES = {
-    'architetto': 'Scegliere un architetto richiede attenzione a competenze tecniche e approccio al progetto.',
-    'sanatoria': 'Le sanatorie edilizie richiedono verifiche puntuali su conformità e tempistiche.',
-    'ristrutturazione appartamento': 'Una ristrutturazione ben pianificata parte da un rilievo accurato e un capitolato chiaro.',
-    'ristrutturazione villa': 'Ristrutturare una villa richiede coordinamento tra impianti, strutture e finiture.',
-    'cila': 'La CILA copre interventi di manutenzione straordinaria che non modificano volumi o destinazioni.',
-    'scia': 'La SCIA serve per opere che modificano prospetti, volumi o strutture portanti.',
-    'permesso': 'Il permesso di costruire è obbligatorio per nuove costruzioni e ampliamenti significativi.',
-    'computo metrico': 'Un computo metrico preciso evita varianti in corso d\'opera e contenziosi con l\'impresa.',
-    'capitolato': 'Il capitolato definisce materiali, lavorazioni e tolleranze: è la base del contratto.',
-    'direzione lavori': 'La direzione lavori controlla qualità, tempi e rispetto del progetto autorizzato.',
-    'verifica stato legittimo': 'Lo stato legittimo confronta lo stato di fatto con i titoli edilizi: ogni difformità va sanata.',
-    'regolarità urbanistica': 'La regolarità urbanistica si verifica confrontando planimetrie catastali e titoli edilizi.',
-    'vincoli': 'I vincoli paesaggistici e storici condizionano materiali, colori e modifiche volumetriche.',
-    'cambio destinazione': 'Il cambio di destinazione d\'uso richiede verifica urbanistica e spesso opere strutturali.',
-    'frazionamento': 'Il frazionamento separa un\'unità in due o più unità autonome con accessi indipendenti.',
-    'accorpamento': 'L\'accorpamento unisce più unità immobiliari in una sola, con un iter catastale e urbanistico.',
-    'isolamento': 'L\'isolamento termico e acustico richiede scelta di materiali e dettagli di posa certificati.',
-    'serramenti': 'I serramenti influenzano prestazioni energetiche, tenuta all\'aria e comfort acustico.',
-    'impianti': 'Gli impianti vanno progettati e coordinati prima di chiudere tracce e controsoffitti.',
-    'rilievo': 'Il rilievo accurato è la base per progetto e computo: errori di misura costano tempo e denaro.',
-    'pratica': 'Ogni pratica edilizia richiede documenti specifici e verifica dello stato legittimo.',
-    'progetto': 'Un progetto completo prevede elaborati grafici, relazioni tecniche e computo estimativo.',
-    'cronoprogramma': 'Il cronoprogramma definisce sequenze di lavoro e milestone per tenere sotto controllo i tempi.',
-    'varianti': 'Le varianti in cantiere vanno autorizzate se modificano quanto approvato nel titolo edilizio.',
-    'interior design': 'L\'interior design unisce estetica e funzionalità: layout, materiali e illuminazione contano.',
-    'bagno': 'Il progetto del bagno richiede pendenze, impermeabilizzazioni e ventilazione adeguate.',
-    'cucina': 'La cucina richiede ergonomia degli spazi, ventilazione forzata e impianti dedicati.',
-    'scala': 'Le scale interne devono rispettare alzate, pedate e larghezze minime per sicurezza e comfort.',
-    'tetto': 'Tetti e coperture richiedono impermeabilizzazioni, ventilazione e manutenzione programmata.',
-    'facciata': 'Il rifacimento di facciate richiede autorizzazioni e scelta di materiali durevoli.',
-    'efficienza energetica': 'L\'efficienza energetica dipende da isolamento, serramenti, impianti e ponti termici.',
-    'cappotto': 'Il cappotto termico riduce dispersioni ma richiede dettagli corretti per evitare condense.',
-    'acustica': 'L\'acustica interna si migliora con materiali fonoisolanti e masse appropriate su pareti e solai.',
-    'accessibilità': 'L\'accessibilità richiede rampe, ascensori e bagni conformi alle norme vigenti.',
-    'b&b': 'I B&B richiedono conformità urbanistica, sicurezza antincendio e requisiti igienico-sanitari.',
-    'locale commerciale': 'I locali commerciali richiedono layout funzionale, sicurezza e conformità alle normative.',
-    'ufficio': 'Gli uffici richiedono illuminazione naturale, aerazione e rispetto dei requisiti di sicurezza.',
-}
+NATURAL_LEDES = get_table('natural_ledes')
+FALLBACK_LEDE = load_rules()['fallback_lede']
+
+# First matching keyword wins, in NATURAL_LEDES order
+LEDE_TOPICS = Classifier([(keyword, [keyword]) for keyword in NATURAL_LEDES], fields=('path', 'lede'))
 
 def get_natural_lede(filepath, original_lede):
     """Generate natural lede based on file path and content"""
 
-    path_str = str(filepath).lower()
-    lede_lower = original_lede.lower()
-
     # Extract city if present
     city_match = re.search(r'A ([A-Z][a-zà-ù]+),', original_lede)
     city = city_match.group(1) if city_match else None
 
     # Find matching keyword
-    for keyword, natural_text in NATURAL_LEDES.items():
-        if keyword in path_str or keyword in lede_lower:
-            if city:
-                return f'A {city}, {natural_text}'
-            else:
-                return natural_text
+    keyword = LEDE_TOPICS.classify(path=str(filepath), lede=original_lede)
+    if keyword:
+        natural_text = NATURAL_LEDES[keyword]
+        if city:
+            return f'A {city}, {natural_text}'
+        else:
+            return natural_text
 
     # Fallback: generic professional text
     if city:
-        return f'A {city}, ogni intervento edilizio richiede verifiche tecniche e amministrative accurate.'
+        return FALLBACK_LEDE['with_city'].format(city=city)
     else:
-        return 'Ogni intervento edilizio richiede verifiche tecniche e amministrative accurate.'
+        return FALLBACK_LEDE['without_city']
 
-def fix_lede(filepath, content):
-    """Fix unnatural lede paragraph"""
+def fix_lede(filepath, content, stats=None):
+    """Record the rewrite of an unnatural lede paragraph as a span edit"""
+    edits = EditList(content)
 
     # Find lede
-    lede_match = re.search(r'<p class="lede">([^<]+)</p>', content, re.DOTALL)
+    lede_match = LEDE_RE.search(content)
     if not lede_match:
-        return content
+        return edits
 
     original_lede = lede_match.group(1).strip()
 
     # Check if unnatural
-    unnatural_patterns = [
-        r'[a-zà-ù\s]+ diventa (?:un problema|critico) quando',
-        r'ogni dettaglio conta\.',
-        r'A \w+, [a-zà-ù\s]+ diventa',
-    ]
-
-    is_unnatural = any(re.search(p, original_lede, re.IGNORECASE) for p in unnatural_patterns)
-
-    if not is_unnatural:
-        return content
+    if get_ruleset('unnatural-lede').search(original_lede, stats) is None:
+        return edits
 
     # Generate natural replacement
     natural_lede = get_natural_lede(filepath, original_lede)
 
-    # Replace
-    content = content.replace(
-        f'<p class="lede">{original_lede}</p>',
-        f'<p class="lede">{natural_lede}</p>'
-    )
+    # Replace the lede text only (surrounding whitespace kept), not identical text elsewhere on the page
+    offset = lede_match.start(1) + lede_match.group(1).find(original_lede)
+    edits.replace(offset, len(original_lede), natural_lede, source='unnatural-lede')
+
+    return edits
 
-    return content
+@register_pass('unnatural-lede', sections=GUIDE_SECTIONS, finalize=merge_stats,
+               depends=['sitetools/classify.py', 'lede-rules.json', 'sitetools/rules.py'])
+def unnatural_lede_pass(doc):
+    """Pipeline pass: same rewrite as process_file on a shared document"""
+    if '<p class="lede">' not in doc.text:
+        return []
+
+    stats = RuleStats()
+    edits = fix_lede(doc.path, doc.text, stats)
+    doc.outputs['unnatural-lede'] = stats.data
+    if not edits:
+        return []
+
+    return ["Lede rewritten"] + doc.apply_edits(edits)
 
 def process_file(filepath):
     """Process single file"""
@@ -115,33 +95,47 @@ def process_file(filepath):
     if '<p class="lede">' not in content:
         return False
 
-    original = content
-    content = fix_lede(filepath, content)
+    edits = fix_lede(filepath, content)
+    if not edits:
+        return False
 
-    if content != original:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return True
+    content = edits.apply()
+    for line in edits.describe_conflicts():
+        print(f"⚠️  {filepath}: {line}")
 
-    return False
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Rewrite unnatural lede paragraphs")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
     print("🚀 Rewriting unnatural lede paragraphs...")
     print()
 
-    guide_files = list(ROOT_DIR.glob("guide/**/*.html")) + list(ROOT_DIR.glob("sicilia/**/*.html"))
+    guide_files = select_pages(GUIDE_SECTIONS)
 
     processed = 0
 
+    # Skip pages already processed by this version of the script
+    cache = BuildCache()
+    version = PASSES['unnatural-lede'].version
+    if not args.force:
+        guide_files = cache.stale('unnatural-lede', version, guide_files)
+
     for filepath in guide_files:
-        if 'backup-original' in str(filepath):
-            continue
+        changed = process_file(filepath)
+        cache.record('unnatural-lede', version, filepath)
 
-        if process_file(filepath):
+        if changed:
             processed += 1
             if processed <= 15:
                 print(f"✅ {filepath.relative_to(ROOT_DIR)}")
 
+    cache.save()
+
     print()
     if processed > 15:
         print(f"... and {processed - 15} more files")
@@ -149,6 +143,7 @@ def main():
     print(f"✅ Done! Rewrote {processed} unnatural ledes")
     print()
     print("All ledes now sound human-written.")
+    print_report()
 
 if __name__ == "__main__":
     main()
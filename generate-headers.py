@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Generate the Netlify _headers file
+
+Rules written, one block per path (no wildcards, so two rules never set
+the same header on one URL):
+- fingerprinted assets (assets/manifest.json, see minify-assets.py):
+  cached for a year as immutable, never revalidated
+- the same assets under their stable names: short cache with revalidation
+- the guide data (assets/guides and assets/search, see
+  build-guide-data.py): the content-hashed shards as immutable, the two
+  index.json files with revalidation
+- every page in the catalogue: short cache with revalidation, plus
+  Link: rel=preload hints for the stylesheets the page loads and for
+  its LCP image (the fetchpriority=high one, else the first image of
+  its first screen)
+
+Run it after minify-assets.py and inline-critical-css.py.
+
+Usage:
+  python3 generate-headers.py
+  python3 generate-headers.py --jobs 4
+"""
+
+import argparse
+from pathlib import Path
+
+from sitetools.assets import MANIFEST_PATH, load_manifest, logical_url
+from sitetools.catalogue import select_pages
+from sitetools.critical import fold_elements, local_stylesheets
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.parsing import add_parser_argument, parse_html, set_backend
+from sitetools.explorer import EXPLORER_INDEX_URL, explorer_files, load_explorer_index
+from sitetools.search import INDEX_URL, index_files, load_index
+
+ROOT_DIR = Path(".")
+HEADERS_PATH = ROOT_DIR / "_headers"
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Stable asset names and pages: short enough for a deploy to show up quickly
+ASSET_CACHE = 'public, max-age=3600, must-revalidate'
+HTML_CACHE = 'public, max-age=120, must-revalidate'
+
+HEADER_NOTE = "# Generated by generate-headers.py from the page catalogue and assets/manifest.json: do not edit\n"
+
+def page_paths(filepath):
+    """URL paths a page is served at (index.html also at its directory)"""
+    path = '/' + Path(filepath).relative_to(ROOT_DIR).as_posix()
+    if path.endswith('/index.html'):
+        return [path[:-len('index.html')], path]
+    return [path]
+
+def page_hints(filepath):
+    """(stylesheet hrefs, first-screen image src or None) of a page (runs in worker processes with --jobs)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        soup = parse_html(f.read())
+
+    # The image the page marks as high priority, else the first one on screen
+    images = [el for el in fold_elements(soup)
+              if el.name == 'img' and (el.get('src') or '').startswith('/') and not el['src'].startswith('//')]
+    images.sort(key=lambda img: img.get('fetchpriority') != 'high')
+    image = images[0]['src'] if images else None
+    return local_stylesheets(soup), image
+
+def preload_links(stylesheets, image, manifest):
+    """Link header values, pointing at the fingerprinted names when there are some"""
+    def current(url):
+        return manifest.get(logical_url(url), url)
+
+    links = [f"<{current(href)}>; rel=preload; as=style" for href in dict.fromkeys(stylesheets)]
+    if image:
+        links.append(f"<{current(image)}>; rel=preload; as=image")
+    return links
+
+def build_rules(pages, manifest, jobs=1, explorer_index=None, search_index=None):
+    """[(path, [(header, value), ...])] for the assets in manifest, the guide data and the given pages"""
+    rules = []
+    for logical, hashed in sorted(manifest.items()):
+        rules.append((hashed, [('Cache-Control', IMMUTABLE_CACHE)]))
+        rules.append((logical, [('Cache-Control', ASSET_CACHE)]))
+
+    for index_url, shards in ((EXPLORER_INDEX_URL, explorer_files(explorer_index or {})),
+                              (INDEX_URL, index_files(search_index or {}))):
+        if shards:
+            rules.append((index_url, [('Cache-Control', ASSET_CACHE)]))
+            rules.extend((url, [('Cache-Control', IMMUTABLE_CACHE)]) for url in sorted(set(shards)))
+
+    for filepath, (stylesheets, image) in map_files(page_hints, pages, jobs):
+        headers = [('Cache-Control', HTML_CACHE)]
+        headers += [('Link', link) for link in preload_links(stylesheets, image, manifest)]
+        for path in page_paths(filepath):
+            rules.append((path, headers))
+    return rules
+
+def render_headers(rules):
+    lines = [HEADER_NOTE]
+    for path, headers in rules:
+        lines.append(path + '\n')
+        lines.extend(f"  {name}: {value}\n" for name, value in headers)
+    return ''.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the Netlify _headers file")
+    add_jobs_argument(parser)
+    add_parser_argument(parser)
+    args = parser.parse_args()
+
+    if args.parser:
+        set_backend(args.parser)
+
+    print("🚀 Generating _headers...")
+    print()
+
+    manifest = load_manifest()
+    if not manifest:
+        print(f"⚠️  {MANIFEST_PATH} not found: run minify-assets.py first to get immutable asset caching")
+        print()
+
+    explorer_index = load_explorer_index()
+    search_index = load_index()
+    pages = select_pages()
+    rules = build_rules(pages, manifest, args.jobs, explorer_index, search_index)
+    with open(HEADERS_PATH, 'w', encoding='utf-8') as f:
+        f.write(render_headers(rules))
+
+    preloads = sum(1 for _, headers in rules for name, _ in headers if name == 'Link')
+    print(f"  ✅ {len(manifest)} fingerprinted assets cached as immutable")
+    shards = len(set(explorer_files(explorer_index))) + len(index_files(search_index))
+    if shards:
+        print(f"  ✅ {shards} guide explorer and search index files cached as immutable")
+    print(f"  ✅ {len(pages)} pages, {preloads} preload hints")
+    print()
+    print(f"✅ Done! Written to {HEADERS_PATH}")
+
+if __name__ == "__main__":
+    main()
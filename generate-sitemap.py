@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Generate sitemap.xml from the live pages
+
+sitemap.xml becomes a sitemap index pointing at one gzipped sitemap
+per section (sitetools/sitemap.py): sitemap-guide.xml.gz,
+sitemap-sicilia.xml.gz, sitemap-en.xml.gz, sitemap-province.xml.gz,
+sitemap-servizi.xml.gz and sitemap-pages.xml.gz for the rest.
+
+Pages come from the catalogue; URLs that _redirects sends elsewhere
+(sitetools/redirects.py) are left out. Each URL gets a <lastmod>: the
+date its title or main text last changed, tracked in
+sitemap-lastmod.json (commit it with the sitemaps). Only pages whose
+file changed since the last run are read again; --force re-reads them
+all, keeping the dates of pages whose content is the same.
+
+Run it after the scripts that change pages (and after updating
+_redirects), then precompress-assets.py.
+
+Usage:
+  python3 generate-sitemap.py
+  python3 generate-sitemap.py --jobs 4
+"""
+
+import argparse
+from datetime import date
+from pathlib import Path
+
+from sitetools.catalogue import Catalogue
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.redirects import REDIRECTS_PATH, load_redirects, redirected
+from sitetools.sitemap import (LASTMOD_PATH, SITEMAP_PATH, SITEMAP_SECTIONS, chunk_of, content_hash, load_lastmod,
+                               page_url, save_lastmod, write_sitemaps)
+
+ROOT_DIR = Path(".")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the sitemap index and the gzipped section sitemaps")
+    add_jobs_argument(parser)
+    parser.add_argument('--force', action='store_true',
+                        help="Hash the content of every page, not only of the changed ones")
+    args = parser.parse_args()
+
+    print("🗺️  Generating sitemaps...")
+    print()
+
+    today = date.today().isoformat()
+    previous = load_lastmod()
+    rules = load_redirects()
+
+    with Catalogue() as catalogue:
+        catalogue.refresh()
+        pages = catalogue.query()
+
+    excluded = [page for page in pages if redirected(page_url(page.path), rules)]
+    pages = [page for page in pages if page not in excluded]
+
+    # A page whose file is byte-identical keeps its entry without being read
+    def unchanged(page):
+        entry = previous.get(page_url(page.path))
+        return entry is not None and entry[0] == page.hash[:16] and not args.force
+
+    todo = [ROOT_DIR / page.path for page in pages if not unchanged(page)]
+    hashes = {path.relative_to(ROOT_DIR).as_posix(): digest for path, digest in map_files(content_hash, todo, args.jobs)}
+
+    state = {}
+    dated = 0
+    for page in pages:
+        url = page_url(page.path)
+        entry = previous.get(url)
+        if page.path not in hashes:
+            state[url] = entry
+            continue
+        digest = hashes[page.path]
+        if entry is not None and entry[1] == digest:
+            lastmod = entry[2]
+        else:
+            lastmod = today
+            dated += 1
+        state[url] = [page.hash[:16], digest, lastmod]
+
+    chunks = {chunk: [] for chunk in SITEMAP_SECTIONS + (chunk_of(''),)}
+    for page in pages:
+        url = page_url(page.path)
+        chunks[chunk_of(page.section)].append((url, state[url][2]))
+    chunks = {chunk: entries for chunk, entries in chunks.items() if entries}
+
+    written, changed, removed = write_sitemaps(chunks)
+    state_changed = save_lastmod(state)
+
+    print(f"📄 {len(pages)} pages, {len(todo)} read, {dated} with a new lastmod ({today})")
+    if excluded:
+        print(f"↪️  {len(excluded)} pages left out: redirected by {REDIRECTS_PATH.name}")
+        for page in excluded[:10]:
+            print(f"  /{page.path}")
+    dropped = len(set(previous) - set(state))
+    if dropped:
+        print(f"🧹 {dropped} URLs no longer published dropped from {LASTMOD_PATH.name}")
+    print()
+    print(f"🗂️  {SITEMAP_PATH.name}: index of {len(written)} sitemaps")
+    for name, count in written:
+        print(f"  {name}: {count} URLs")
+    if removed:
+        print(f"  🧹 Removed {len(removed)} sitemaps of an earlier build: {', '.join(removed)}")
+    print(f"  {changed} sitemap files written" if changed else "  Sitemaps unchanged")
+    if state_changed:
+        print(f"  📝 {LASTMOD_PATH.name} updated")
+
+    print()
+    print("✅ Done!")
+
+if __name__ == "__main__":
+    main()
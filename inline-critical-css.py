@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Inline the above-the-fold CSS of each page template and defer the stylesheets
+
+1. For a sample of pages of every template (home, guide, province,
+   servizi, studio-4e, page) work out which rules of the linked local
+   stylesheets style the first screen (sitetools/critical.py) and save
+   them to critical-css.json
+2. In every page, put those rules in <style id="critical-css"> before
+   the first local stylesheet and turn each stylesheet link into a
+   non-blocking preload (with a <noscript> fallback)
+
+The link elements keep their place in <head>, so the cascade is the
+same once the full stylesheets have loaded. Running the script again
+replaces the inlined rules. Run it after minify-assets.py: the critical
+rules are taken from the minified files the pages link.
+
+Usage:
+  python3 inline-critical-css.py
+  python3 inline-critical-css.py --sample 30 --jobs 4
+  python3 inline-critical-css.py --no-extract     # reuse critical-css.json
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+from sitetools.assets import logical_url
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.critical import SAMPLE_SIZE, compute_critical_css
+from sitetools.parallel import add_jobs_argument
+from sitetools.pipeline import PASSES, register_pass, run_pipeline
+from sitetools.rewriter import HTMLRewriter
+from sitetools.site import page_template
+
+ROOT_DIR = Path(".")
+CRITICAL_CSS_PATH = ROOT_DIR / "critical-css.json"
+
+# Quotes optional: minify-html.py drops them
+CRITICAL_STYLE_RE = re.compile(r'<style id=("?)critical-css\1>.*?</style>', re.S)
+
+DEFERRED_LINK = ('<link as="style" href="{href}" onload="this.onload=null;this.rel=\'stylesheet\'" rel="preload"/>'
+                 '<noscript><link href="{href}" rel="stylesheet"/></noscript>')
+
+_critical_css = None
+
+def load_critical_css():
+    """{template: {href: css}} saved by the extraction step ({} if it never ran)"""
+    global _critical_css
+    if _critical_css is None:
+        try:
+            with open(CRITICAL_CSS_PATH, 'r', encoding='utf-8') as f:
+                _critical_css = json.load(f)
+        except FileNotFoundError:
+            _critical_css = {}
+    return _critical_css
+
+def head_rewriter(on_link):
+    """HTMLRewriter calling on_link(tag, deferred) for the local stylesheet links in <head>
+
+    deferred is True for a link that is already a preload. Links inside
+    <noscript> (the fallbacks) are skipped.
+    """
+    rewriter = HTMLRewriter()
+    state = {'noscript': 0, 'body': False}
+
+    def link(tag):
+        if state['noscript'] or state['body'] or not (tag.attrs.get('href') or '').startswith('/assets/css/'):
+            return
+        rel = (tag.attrs.get('rel') or '').lower().split()
+        if 'stylesheet' in rel:
+            on_link(tag, False)
+        elif 'preload' in rel and tag.attrs.get('as') == 'style':
+            on_link(tag, True)
+
+    def noscript(delta):
+        def handler(tag):
+            state['noscript'] = max(0, state['noscript'] + delta)
+        return handler
+
+    rewriter.on_start_tag('link', link)
+    rewriter.on_start_tag('noscript', noscript(1))
+    rewriter.on_end_tag('noscript', noscript(-1))
+    rewriter.on_start_tag('body', lambda tag: state.update(body=True))
+    return rewriter
+
+def inline_critical_css(text, template_css):
+    """Return text with the critical rules inlined and the stylesheets they cover deferred
+
+    template_css maps logical stylesheet URLs to their critical rules;
+    links to other stylesheets are left render-blocking.
+    """
+    text = CRITICAL_STYLE_RE.sub('', text)
+
+    hrefs = []
+    head_rewriter(lambda tag, deferred: hrefs.append(logical_url(tag.attrs['href']))).rewrite_string(text)
+    covered = [href for href in hrefs if href in template_css]
+    if not covered:
+        return text
+
+    css = ''.join(template_css[href] for href in dict.fromkeys(covered)).replace('</', '<\\/')
+    style = [f'<style id="critical-css">{css}</style>']
+
+    def on_link(tag, deferred):
+        # The inlined rules go right before the first local stylesheet
+        if style:
+            tag.before(style.pop())
+        if not deferred and logical_url(tag.attrs['href']) in template_css:
+            tag.replace(DEFERRED_LINK.format(href=tag.attrs['href']))
+
+    return head_rewriter(on_link).rewrite_string(text)
+
+@register_pass('critical-css', kind='text', depends=['critical-css.json', 'sitetools/critical.py', 'sitetools/cssmin.py',
+                                                     'sitetools/rewriter.py', 'sitetools/assets.py'])
+def critical_css_pass(doc):
+    """Pipeline pass: inline the template's critical CSS and defer its stylesheets"""
+    template_css = load_critical_css().get(page_template(doc.path))
+    if not template_css:
+        return []
+
+    content = inline_critical_css(doc.text, template_css)
+    if content == doc.text:
+        return []
+
+    doc.text = content
+    return ["Critical CSS inlined"]
+
+def extract_critical_css(sample=SAMPLE_SIZE):
+    """Recompute critical-css.json from the live pages; returns it"""
+    global _critical_css
+    _critical_css = compute_critical_css(select_pages(), sample=sample)
+    with open(CRITICAL_CSS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(_critical_css, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+    return _critical_css
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline per-template critical CSS and defer the full stylesheets")
+    parser.add_argument('--sample', type=int, default=SAMPLE_SIZE,
+                        help=f"Pages per template analysed for the first screen (default: {SAMPLE_SIZE})")
+    parser.add_argument('--no-extract', action='store_true',
+                        help="Reuse the existing critical-css.json")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚀 Inlining critical CSS...")
+    print()
+
+    if not args.no_extract:
+        print(f"🔎 Working out above-the-fold rules ({args.sample} pages per template)...")
+        critical = extract_critical_css(args.sample)
+        for template, sheets in sorted(critical.items()):
+            sizes = ', '.join(f"{Path(href).name} {len(css):,} B" for href, css in sheets.items())
+            print(f"  ✅ {template}: {sizes}")
+        print(f"  💾 Saved to {CRITICAL_CSS_PATH}")
+        print()
+
+    cache = None if args.force else BuildCache()
+    backup = BackupRun(BackupStore(), 'critical-css')
+
+    updated = 0
+    for filepath, changes in run_pipeline([PASSES['critical-css']], jobs=args.jobs, cache=cache, backup=backup):
+        if changes:
+            updated += 1
+            if updated <= 15:
+                print(f"✅ {filepath}")
+
+    if cache is not None:
+        cache.save()
+    run_id = backup.save()
+
+    print()
+    if updated > 15:
+        print(f"... and {updated - 15} more files")
+    print(f"✅ Done! Critical CSS inlined in {updated} pages")
+    if run_id:
+        print(f"   Undo with: python3 restore-backup.py --run {run_id}")
+
+if __name__ == "__main__":
+    main()
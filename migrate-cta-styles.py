@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Move the inline styles of injected CTA blocks to the shared stylesheet
+
+Pages processed by earlier versions of add-social-proof.py and
+fix-cta-improved.py carry the CTA look in style="" attributes (phone box,
+button row, rating line, homepage badges), repeated on every page. This
+script writes the equivalent rules into assets/css/inline-fixes.css and
+replaces those attributes with classes (sitetools/cta.py); text and
+every other byte of the page stay as they are.
+
+Run minify-assets.py afterwards so the minified stylesheet and its
+fingerprint pick up the rules, then inline-critical-css.py.
+
+Usage:
+  python3 migrate-cta-styles.py
+  python3 migrate-cta-styles.py --jobs 4
+"""
+
+import argparse
+
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.cta import CTA_STYLESHEET, migrate_inline_styles, write_cta_css
+from sitetools.parallel import add_jobs_argument
+from sitetools.pipeline import PASSES, register_pass, run_pipeline
+
+@register_pass('cta-classes', depends=['sitetools/cta.py', 'sitetools/rewriter.py'])
+def cta_classes_pass(doc):
+    """Pipeline pass: replace the inline styles of old CTA markup with classes"""
+    content, migrated = migrate_inline_styles(doc.text)
+    if not migrated:
+        return []
+
+    doc.text = content
+    return [f"CTA inline styles moved to classes ({migrated} blocks)"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Replace inline CTA styles with shared CSS classes")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚀 Migrating CTA inline styles...")
+    print()
+
+    if write_cta_css():
+        print(f"🎨 CTA rules written to {CTA_STYLESHEET}")
+    else:
+        print(f"🎨 CTA rules already up to date in {CTA_STYLESHEET}")
+    print()
+
+    cache = None if args.force else BuildCache()
+    backup = BackupRun(BackupStore(), 'cta-classes')
+
+    updated = 0
+    for filepath, changes in run_pipeline([PASSES['cta-classes']], jobs=args.jobs, cache=cache, backup=backup):
+        if changes:
+            updated += 1
+            if updated <= 15:
+                print(f"✅ {filepath}")
+
+    if cache is not None:
+        cache.save()
+    run_id = backup.save()
+
+    print()
+    if updated > 15:
+        print(f"... and {updated - 15} more files")
+    print(f"✅ Done! CTA styles migrated in {updated} pages")
+    if run_id:
+        print(f"   Undo with: python3 restore-backup.py --run {run_id}")
+    if updated:
+        print()
+        print("Next: python3 minify-assets.py && python3 inline-critical-css.py")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,71 @@
 #!/usr/bin/env python3
 """
-Minify CSS and JavaScript files
-Requires: csscompressor (pip install csscompressor)
+Minify CSS and JavaScript files (no dependencies)
+
+CSS rules that nothing on the site can match are purged: the class, id
+and tag usage of every live page, of the JS sources and of the markup
+templates in the fixer scripts is collected first, and PURGE_SAFELIST
+protects classes that only exist at runtime.
+
+Every asset (CSS, JS, images, guides JSON) then gets a copy named after
+a hash of its content (styles.<hash>.min.css, ...) and the pages point
+at those copies; assets/manifest.json maps logical to hashed names
+(sitetools/assets.py).
+
+Usage:
+  python3 minify-assets.py
+  python3 minify-assets.py --no-purge      # CSS: keep every rule
+  python3 minify-assets.py --no-mangle     # JS: keep local variable names
 """
 
+import argparse
 import os
 from pathlib import Path
 
-try:
-    import csscompressor
-    HAS_CSS = True
-except ImportError:
-    HAS_CSS = False
-    print("⚠️  csscompressor not installed. Run: pip install csscompressor")
+from sitetools.assets import MANIFEST_PATH, fingerprint_assets, load_manifest, rewrite_references, save_manifest
+from sitetools.catalogue import select_pages
+from sitetools.cssmin import collect_usage, minify_css, purge_css
+from sitetools.jsmin import JSSyntaxError, check_equivalent, minify_js
+from sitetools.pipeline import register_pass
 
 ROOT_DIR = Path(".")
 CSS_DIR = ROOT_DIR / "assets" / "css"
 JS_DIR = ROOT_DIR / "assets" / "js"
 
-def minify_css_file(filepath):
-    """Minify single CSS file"""
-    if not HAS_CSS:
-        return False
-
+# Classes and ids main.js builds at runtime (fnmatch patterns): never purged
+PURGE_SAFELIST = (
+    'open',
+    'scrolled',
+    'nav-open',
+    'is-visible',
+    'motion-ready',
+    'delay-*',
+    'reveal',
+    'reveal--*',
+    'site-search-*',
+    'ge-*',
+)
+
+def source_files(directory, pattern):
+    """Unminified sources in directory"""
+    return sorted(p for p in directory.glob(pattern) if '.min.' not in p.name)
+
+def collect_site_usage():
+    """Class/id/tag usage of the live pages, the JS sources and the fixers' templates"""
+    return collect_usage(pages=select_pages(),
+                         scripts=source_files(JS_DIR, "*.js"),
+                         templates=sorted(ROOT_DIR.glob("*.py")))
+
+def minify_css_file(filepath, usage=None):
+    """Minify single CSS file, dropping rules unused by the site if usage is given"""
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
 
     # Create .min.css version
-    minified = csscompressor.compress(content)
+    if usage is not None:
+        minified, dropped = purge_css(content, usage, PURGE_SAFELIST)
+    else:
+        minified, dropped = minify_css(content), []
 
     output_path = filepath.with_suffix('.min.css')
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -37,23 +75,23 @@ def minify_css_file(filepath):
     minified_size = len(minified)
     savings = (1 - minified_size / original_size) * 100
 
-    return output_path, original_size, minified_size, savings
+    return output_path, original_size, minified_size, savings, dropped
 
-def minify_js_simple(filepath):
-    """Simple JS minification (remove comments and whitespace)"""
+def minify_js_file(filepath, mangle=True):
+    """Minify single JS file with the tokenizer-aware minifier (sitetools/jsmin.py)
+
+    The result is parsed again and compared with the source before it is
+    written; a script that fails to parse or to compare is left alone.
+    """
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    # Remove single-line comments
-    import re
-    minified = re.sub(r'//.*?$', '', content, flags=re.MULTILINE)
-
-    # Remove multi-line comments
-    minified = re.sub(r'/\*.*?\*/', '', minified, flags=re.DOTALL)
-
-    # Remove extra whitespace
-    minified = re.sub(r'\s+', ' ', minified)
-    minified = re.sub(r'\s*([{};,:])\s*', r'\1', minified)
+    try:
+        minified = minify_js(content, mangle=mangle)
+        check_equivalent(content, minified)
+    except (JSSyntaxError, AssertionError) as e:
+        print(f"  ❌ {filepath.name}: {e}")
+        return False
 
     output_path = filepath.with_suffix('.min.js')
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -65,26 +103,52 @@ def minify_js_simple(filepath):
 
     return output_path, original_size, minified_size, savings
 
-def update_html_references():
-    """Update HTML files to reference .min.css and .min.js"""
-    html_files = list(ROOT_DIR.rglob("*.html"))
+def minified_references():
+    """{source URL: minified URL} for the CSS and JS sources"""
+    references = {}
+    for directory, pattern in ((CSS_DIR, "*.css"), (JS_DIR, "*.js")):
+        for source in source_files(directory, pattern):
+            url = '/' + source.as_posix()
+            references[url] = '/' + source.with_suffix('.min' + source.suffix).as_posix()
+    return references
+
+_manifest = None
+
+def asset_manifest():
+    """Hashed asset names of the last run (loaded once per process)"""
+    global _manifest
+    if _manifest is None:
+        _manifest = load_manifest()
+    return _manifest
+
+def rewrite_asset_references(content, manifest=None):
+    """Point CSS/JS references in page content at the minified files, then every asset at its hashed name"""
+    for source, minified in minified_references().items():
+        content = content.replace(source, minified)
+
+    return rewrite_references(content, asset_manifest() if manifest is None else manifest)
+
+@register_pass('asset-references', depends=['assets/manifest.json', 'sitetools/assets.py'])
+def asset_references_pass(doc):
+    """Pipeline pass: same rewrite as update_html_references on a shared document"""
+    content = rewrite_asset_references(doc.text)
+    if content == doc.text:
+        return []
+
+    doc.text = content
+    return ["Asset references updated"]
+
+def update_html_references(manifest):
+    """Update HTML files to reference the minified, fingerprinted assets"""
+    html_files = select_pages()
     updated = 0
 
     for filepath in html_files:
-        if 'backup-original' in str(filepath):
-            continue
-
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
 
         original = content
-
-        # Replace CSS references
-        content = content.replace('/assets/css/styles.css', '/assets/css/styles.min.css')
-        content = content.replace('/assets/css/inline-fixes.css', '/assets/css/inline-fixes.min.css')
-
-        # Replace JS references
-        content = content.replace('/assets/js/main.js', '/assets/js/main.min.js')
+        content = rewrite_asset_references(content, manifest)
 
         if content != original:
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -94,6 +158,13 @@ def update_html_references():
     return updated
 
 def main():
+    parser = argparse.ArgumentParser(description="Minify CSS and JavaScript files")
+    parser.add_argument('--no-purge', action='store_true',
+                        help="Keep CSS rules even if no page uses their selectors")
+    parser.add_argument('--no-mangle', action='store_true',
+                        help="Only strip whitespace and comments from JS, keep local names")
+    args = parser.parse_args()
+
     print("🚀 Minifying assets...")
     print()
 
@@ -102,29 +173,33 @@ def main():
 
     # Minify CSS
     if CSS_DIR.exists():
-        print("📄 Minifying CSS files...")
-        for css_file in CSS_DIR.glob("*.css"):
-            if '.min.css' in css_file.name:
-                continue
+        usage = None
+        if not args.no_purge:
+            print("🔎 Collecting class/id/tag usage...")
+            usage = collect_site_usage()
+            print(f"  ✅ {len(usage.classes):,} classes, {len(usage.ids):,} ids, {len(usage.tags)} tags")
+            print()
 
-            result = minify_css_file(css_file)
-            if result:
-                output, orig, minified, savings = result
-                print(f"  ✅ {css_file.name} → {output.name}")
-                print(f"     {orig:,} bytes → {minified:,} bytes ({savings:.1f}% smaller)")
-                total_savings += (orig - minified)
-                files_processed += 1
+        print("📄 Minifying CSS files...")
+        for css_file in source_files(CSS_DIR, "*.css"):
+            output, orig, minified, savings, dropped = minify_css_file(css_file, usage)
+            print(f"  ✅ {css_file.name} → {output.name}")
+            print(f"     {orig:,} bytes → {minified:,} bytes ({savings:.1f}% smaller)")
+            if dropped:
+                print(f"     🧹 {len(dropped)} unused selectors dropped "
+                      f"({sum(size for _, size in dropped):,} bytes):")
+                for selector, size in sorted(dropped, key=lambda item: -item[1]):
+                    print(f"        {size:>5,} B  {selector}")
+            total_savings += (orig - minified)
+            files_processed += 1
 
     print()
 
     # Minify JS
     if JS_DIR.exists():
         print("📄 Minifying JavaScript files...")
-        for js_file in JS_DIR.glob("*.js"):
-            if '.min.js' in js_file.name:
-                continue
-
-            result = minify_js_simple(js_file)
+        for js_file in source_files(JS_DIR, "*.js"):
+            result = minify_js_file(js_file, mangle=not args.no_mangle)
             if result:
                 output, orig, minified, savings = result
                 print(f"  ✅ {js_file.name} → {output.name}")
@@ -134,9 +209,17 @@ def main():
 
     print()
 
+    # Fingerprint (after minification: the hashes cover the minified files)
+    print("🔖 Fingerprinting assets...")
+    manifest = fingerprint_assets(previous=load_manifest())
+    save_manifest(manifest)
+    print(f"  ✅ {len(manifest)} assets, manifest saved to {MANIFEST_PATH}")
+
+    print()
+
     # Update HTML references
     print("🔗 Updating HTML file references...")
-    updated = update_html_references()
+    updated = update_html_references(manifest)
     print(f"  ✅ Updated {updated} HTML files")
 
     print()
@@ -144,10 +227,7 @@ def main():
     print(f"💾 Total bandwidth saved: {total_savings:,} bytes ({total_savings/1024:.1f} KB)")
 
     print()
-    print("⚠️  IMPORTANT:")
-    print("For production-grade JS minification, use tools like:")
-    print("  • Terser: npm install -g terser && terser main.js -o main.min.js -c -m")
-    print("  • UglifyJS: npm install -g uglify-js && uglifyjs main.js -o main.min.js -c -m")
+    print("🧪 To also compare the minified JS behaviour in node: python3 check-js-minify.py")
 
 if __name__ == "__main__":
     main()
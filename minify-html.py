@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Minify the HTML of every page
+
+Collapses insignificant whitespace, drops comments (except the Google
+Tag Manager markers), removes the quotes and end tags that are not
+needed and compacts inline JSON-LD (see sitetools/htmlmin.py for the
+exact rules). <pre>, <textarea> and inline scripts are left alone.
+
+Run it last: the other fixers keep working on minified pages, but the
+soup-based ones write them back unminified. It is the final pass of
+run-pipeline.py.
+
+--omit-end-tags also drops optional end tags such as </p> and </li>.
+Pages minified that way are mis-nested by html.parser, so every later
+run of the fixers needs --parser lxml or --parser html5lib.
+
+Usage:
+  python3 minify-html.py
+  python3 minify-html.py --jobs 4
+  python3 minify-html.py --force                      # ignore the build cache
+  python3 minify-html.py --omit-end-tags --force      # see above
+"""
+
+import argparse
+import os
+from collections import defaultdict
+
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.htmlmin import minify_html
+from sitetools.parallel import add_jobs_argument
+from sitetools.pipeline import PASSES, register_pass, run_pipeline
+from sitetools.site import page_section
+
+# Set by --omit-end-tags; an environment variable so worker processes inherit it
+OMIT_END_TAGS_ENV = 'SITE_HTML_OMIT_END_TAGS'
+
+@register_pass('html-minify', depends=['sitetools/htmlmin.py', 'sitetools/cssmin.py'])
+def html_minify_pass(doc):
+    """Pipeline pass: minify the page"""
+    content = minify_html(doc.text, omit_end_tags=bool(os.environ.get(OMIT_END_TAGS_ENV)))
+    if content == doc.text:
+        return []
+
+    saved = len(doc.text.encode('utf-8')) - len(content.encode('utf-8'))
+    doc.text = content
+    return [f"HTML minified ({saved:,} bytes saved)"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Minify the HTML of every page")
+    parser.add_argument('--omit-end-tags', action='store_true',
+                        help="Also drop optional end tags (</p>, </li>, ...); later runs then need --parser lxml")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    if args.omit_end_tags:
+        os.environ[OMIT_END_TAGS_ENV] = '1'
+
+    print("🚀 Minifying HTML...")
+    print()
+
+    # Sizes before the run, to report the savings per section
+    pages = select_pages()
+    sizes = {str(p): os.path.getsize(p) for p in pages}
+
+    cache = None if args.force else BuildCache()
+    backup = BackupRun(BackupStore(), 'html-minify')
+
+    # Per section: [pages, bytes before, bytes after]
+    totals = defaultdict(lambda: [0, 0, 0])
+    for filepath, changes in run_pipeline([PASSES['html-minify']], files=pages, jobs=args.jobs,
+                                          cache=cache, backup=backup):
+        if changes:
+            row = totals[page_section(filepath) or '(root)']
+            row[0] += 1
+            row[1] += sizes[str(filepath)]
+            row[2] += os.path.getsize(filepath)
+
+    if cache is not None:
+        cache.save()
+    run_id = backup.save()
+
+    if totals:
+        print(f"  {'section':<14} {'pages':>6} {'before':>12} {'after':>12} {'saved':>10}")
+        for section, (count, before, after) in sorted(totals.items(), key=lambda item: item[1][2] - item[1][1]):
+            print(f"  {section:<14} {count:>6,} {before:>12,} {after:>12,} {before - after:>10,}  "
+                  f"(-{(1 - after / max(before, 1)) * 100:.1f}%)")
+        before = sum(row[1] for row in totals.values())
+        after = sum(row[2] for row in totals.values())
+        print()
+        print(f"💾 {before / 1024:,.0f} KB → {after / 1024:,.0f} KB ({(1 - after / max(before, 1)) * 100:.1f}% smaller)")
+
+    print()
+    print(f"✅ Done! Minified {sum(row[0] for row in totals.values())} of {len(pages)} pages")
+    if run_id:
+        print(f"   Undo with: python3 restore-backup.py --run {run_id}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Write precompressed .br and .gz siblings for every text asset
+
+Covers the live pages, the text files under assets/ (CSS, JS, JSON, SVG,
+including the fingerprinted copies) and the root files the site serves
+(guides JSON, sitemaps, robots.txt). Each file gets page.html.gz
+(gzip level 9) and page.html.br (Brotli quality 11) next to it, so the
+server can send them as they are instead of compressing on every
+request. A variant that would not be smaller is not written.
+
+Files whose content is unchanged since the last run are skipped (build
+cache); the siblings of files that are gone are deleted.
+
+Brotli needs the brotli package (pip install brotli); without it only
+the .gz files are written.
+
+Usage:
+  python3 precompress-assets.py
+  python3 precompress-assets.py --jobs 4
+  python3 precompress-assets.py --force      # recompress everything (e.g. after deleting siblings)
+"""
+
+import argparse
+import gzip
+import os
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from sitetools.cache import BuildCache, add_cache_arguments, fingerprint
+from sitetools.catalogue import select_pages
+from sitetools.parallel import add_jobs_argument, map_files
+from sitetools.site import EXCLUDED_DIRS
+
+ROOT_DIR = Path(".")
+ASSETS_DIR = ROOT_DIR / "assets"
+
+# Text formats under assets/
+TEXT_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.xml', '.txt', '.map')
+
+# Files served from the site root besides the pages
+ROOT_PATTERNS = ('guides_*.json', 'sitemap*.xml', 'robots.txt')
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+CACHE_KEY = 'precompress'
+
+def text_assets():
+    """Every file to precompress: pages, then assets/, then root files"""
+    files = list(select_pages())
+    for dirpath, dirnames, filenames in os.walk(ASSETS_DIR):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+        files.extend(Path(dirpath) / name for name in sorted(filenames) if name.endswith(TEXT_EXTENSIONS))
+    for pattern in ROOT_PATTERNS:
+        files.extend(sorted(ROOT_DIR.glob(pattern)))
+    return files
+
+def write_variant(path, data, size):
+    """Write data to path if it is smaller than the source, else remove a stale path; returns its size or None"""
+    if len(data) >= size:
+        if path.exists():
+            path.unlink()
+        return None
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+def compress_file(filepath):
+    """(original, gzip, brotli) sizes after writing the siblings (runs in worker processes with --jobs)"""
+    data = Path(filepath).read_bytes()
+    size = len(data)
+    # mtime=0: identical input gives identical .gz bytes
+    gz = write_variant(Path(f"{filepath}.gz"), gzip.compress(data, GZIP_LEVEL, mtime=0), size)
+    br = None
+    if brotli is not None:
+        br = write_variant(Path(f"{filepath}.br"), brotli.compress(data, quality=BROTLI_QUALITY), size)
+    return size, gz, br
+
+def remove_orphans(cache, sources):
+    """Delete the siblings of files compressed by an earlier run that are no longer text assets; returns how many"""
+    sources = {Path(f).as_posix() for f in sources}
+    removed = 0
+    for filepath in cache.recorded(CACHE_KEY):
+        if filepath in sources:
+            continue
+        for suffix in ('.gz', '.br'):
+            sibling = Path(filepath + suffix)
+            if sibling.exists():
+                sibling.unlink()
+                removed += 1
+        cache.forget(CACHE_KEY, filepath)
+    return removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .br and .gz siblings for the site's text assets")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚀 Precompressing text assets...")
+    if brotli is None:
+        print("⚠️  brotli not installed (pip install brotli): writing .gz only")
+    print()
+
+    files = text_assets()
+    cache = BuildCache()
+    removed = remove_orphans(cache, files)
+    version = fingerprint(Path(__file__), GZIP_LEVEL, BROTLI_QUALITY, brotli is not None)
+    todo = files
+    if not args.force:
+        todo = cache.stale(CACHE_KEY, version, files)
+        if len(files) > len(todo):
+            print(f"⏭️  {len(files) - len(todo)} files unchanged since last run (build cache)")
+
+    # Totals per file type: [files, original, gzip, brotli]
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for filepath, (size, gz, br) in map_files(compress_file, todo, args.jobs):
+        cache.record(CACHE_KEY, version, filepath)
+        row = totals[Path(filepath).suffix or Path(filepath).name]
+        row[0] += 1
+        row[1] += size
+        row[2] += gz if gz is not None else size
+        row[3] += br if br is not None else size
+
+    cache.save()
+
+    if totals:
+        print()
+        print(f"  {'type':<8} {'files':>6} {'original':>12} {'gzip':>12} {'brotli':>12}")
+        for kind, (count, size, gz, br) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            size = max(size, 1)
+            print(f"  {kind:<8} {count:>6,} {size:>12,} {gz:>12,} {br:>12,}  "
+                  f"(gz -{(1 - gz / size) * 100:.0f}%, br -{(1 - br / size) * 100:.0f}%)")
+        size = max(sum(row[1] for row in totals.values()), 1)
+        best = sum(row[3] if brotli is not None else row[2] for row in totals.values())
+        print()
+        print(f"💾 {size / 1024:,.0f} KB → {best / 1024:,.0f} KB on the wire ({(1 - best / size) * 100:.0f}% smaller)")
+    if removed:
+        print(f"🧹 {removed} orphaned .br/.gz files removed")
+    print()
+    print(f"✅ Done! Compressed {len(todo)} of {len(files)} files")
+
+if __name__ == "__main__":
+    main()
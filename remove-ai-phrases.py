@@ -1,59 +1,51 @@
 #!/usr/bin/env python3
 """
 Remove AI-generated template phrases from lede paragraphs
+Rules: lede-rules.json, ruleset "remove-ai-phrases"
 """
 
-import re
+import argparse
 from pathlib import Path
 
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.pipeline import PASSES, register_pass
+from sitetools.rules import RuleStats, get_ruleset, merge_stats, print_report
+from sitetools.site import GUIDE_SECTIONS, LEDE_RE
+from sitetools.spans import EditList
+
 ROOT_DIR = Path(".")
 
-def clean_lede(content):
-    """Remove template AI phrases from lede"""
+def clean_lede(content, stats=None):
+    """Record the removal of template AI phrases from the lede as a span edit"""
+    edits = EditList(content)
 
     # Find lede paragraph
-    lede_match = re.search(r'<p class="lede">([^<]+)</p>', content, re.DOTALL)
+    lede_match = LEDE_RE.search(content)
     if not lede_match:
-        return content
-
-    original_lede = lede_match.group(1)
-    cleaned_lede = original_lede
-
-    # Remove: "la differenza la fanno [varie cose] e [altre cose], non le scelte fatte "a cantiere aperto"."
-    cleaned_lede = re.sub(
-        r':\s*la differenza la fanno[^.]+non le scelte fatte[^.]+\.',
-        '.',
-        cleaned_lede,
-        flags=re.IGNORECASE
-    )
-
-    # Remove: "Prima di decidere, serve mettere in fila dati, requisiti e verifiche misurabili."
-    cleaned_lede = re.sub(
-        r'\s*Prima di decidere,\s*serve mettere in fila dati,\s*requisiti e verifiche misurabili\.',
-        '',
-        cleaned_lede,
-        flags=re.IGNORECASE
-    )
-
-    # Clean up double spaces and extra punctuation
-    cleaned_lede = re.sub(r'\s+', ' ', cleaned_lede)
-    cleaned_lede = re.sub(r'\.\s*\.', '.', cleaned_lede)
-    cleaned_lede = re.sub(r':\s*\.', '.', cleaned_lede)
-
-    # If lede becomes too short, add a more natural ending
-    if len(cleaned_lede) < 100:
-        # Add context-appropriate ending
-        if 'diventa un problema quando' in cleaned_lede or 'diventa critico quando' in cleaned_lede:
-            cleaned_lede = re.sub(
-                r'(diventa (?:un problema|critico) quando[^.]+)\.',
-                r'\1: ogni dettaglio conta.',
-                cleaned_lede
-            )
-
-    # Replace in content
-    content = content.replace(original_lede, cleaned_lede.strip())
-
-    return content
+        return edits
+
+    cleaned_lede = get_ruleset('remove-ai-phrases').apply(lede_match.group(1), stats)
+
+    # Replace the lede only, not identical text elsewhere on the page
+    edits.replace_match(lede_match, cleaned_lede.strip(), group=1, source='remove-ai-phrases')
+
+    return edits
+
+@register_pass('remove-ai-phrases', sections=GUIDE_SECTIONS, finalize=merge_stats,
+               depends=['lede-rules.json', 'sitetools/rules.py'])
+def ai_phrases_pass(doc):
+    """Pipeline pass: same cleanup as process_file on a shared document"""
+    if '<p class="lede">' not in doc.text:
+        return []
+
+    stats = RuleStats()
+    edits = clean_lede(doc.text, stats)
+    doc.outputs['remove-ai-phrases'] = stats.data
+    if not edits:
+        return []
+
+    return ["AI phrases removed"] + doc.apply_edits(edits)
 
 def process_file(filepath):
     """Process single file"""
@@ -65,34 +57,48 @@ def process_file(filepath):
     if '<p class="lede">' not in content:
         return False
 
-    original_content = content
-    content = clean_lede(content)
+    edits = clean_lede(content)
+    if not edits:
+        return False
 
-    if content != original_content:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return True
+    content = edits.apply()
+    for line in edits.describe_conflicts():
+        print(f"⚠️  {filepath}: {line}")
 
-    return False
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Remove AI template phrases from lede paragraphs")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
     print("🚀 Removing AI template phrases...")
     print()
 
     # Find all guide pages
-    guide_files = list(ROOT_DIR.glob("guide/**/*.html")) + list(ROOT_DIR.glob("sicilia/**/*.html"))
+    guide_files = select_pages(GUIDE_SECTIONS)
 
     processed = 0
 
+    # Skip pages already processed by this version of the script
+    cache = BuildCache()
+    version = PASSES['remove-ai-phrases'].version
+    if not args.force:
+        guide_files = cache.stale('remove-ai-phrases', version, guide_files)
+
     for filepath in guide_files:
-        if 'backup-original' in str(filepath):
-            continue
+        changed = process_file(filepath)
+        cache.record('remove-ai-phrases', version, filepath)
 
-        if process_file(filepath):
+        if changed:
             processed += 1
             if processed <= 10:
                 print(f"✅ {filepath.relative_to(ROOT_DIR)}")
 
+    cache.save()
+
     print()
     print(f"✅ Done! Cleaned {processed} files")
     print()
@@ -101,6 +107,7 @@ def main():
     print("  ❌ 'serve mettere in fila dati, requisiti e verifiche misurabili'")
     print()
     print("Result: More natural, less template-y content.")
+    print_report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Restore pages from the backup store (sitetools/backup.py)
+
+Every run of run-pipeline.py or fix-structured-data.py that changes
+pages saves their previous content as a backup run. Restoring a run puts
+its pages back as they were before it (undoing it and any later run).
+
+Usage:
+  python3 restore-backup.py --list
+  python3 restore-backup.py --run latest                      # undo the last run
+  python3 restore-backup.py --run -2 guide/palermo/x.html     # one page, before the 2nd-last run
+  python3 restore-backup.py --run first --to /tmp/originals   # export the original pages
+  python3 restore-backup.py --import backup-original          # migrate an old mirror
+  python3 restore-backup.py --stats
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.site import ROOT_DIR, iter_html_files
+
+
+def list_runs(store):
+    runs = store.runs()
+    if not runs:
+        print(f"No backup runs in {store.path}")
+        return
+    print(f"💾 Backup runs in {store.path} (oldest first):")
+    for run_id in runs:
+        manifest = store.load_run(run_id)
+        print(f"  • {run_id:<40} {manifest['created']}  {len(manifest['files']):>5} pages  ({manifest['label']})")
+
+
+def show_stats(store):
+    blobs = [p for p in store.objects_dir.rglob('*') if p.is_file()] if store.objects_dir.is_dir() else []
+    stored = sum(p.stat().st_size for p in blobs)
+    referenced = set()
+    pages = 0
+    for run_id in store.runs():
+        files = store.load_run(run_id)['files']
+        pages += len(files)
+        referenced.update(files.values())
+    print(f"💾 {store.path}")
+    print(f"   Runs: {len(store.runs())}, page versions: {pages}, distinct blobs: {len(referenced)}")
+    print(f"   On disk: {stored / 1024:.0f} KB in {len(blobs)} blobs")
+
+
+def import_mirror(store, mirror):
+    """Store a backup-original style copy of the site as a run of its own"""
+    run = BackupRun(store, 'import-' + mirror.name)
+    for filepath in iter_html_files(mirror):
+        run.add(filepath, root=mirror)
+    run_id = run.save()
+    if run_id is None:
+        print(f"⚠️  No HTML pages found in {mirror}")
+        return 1
+    print(f"✅ Imported {len(run.files)} pages from {mirror} as run {run_id}")
+    print(f"   The mirror can now be deleted: python3 restore-backup.py --run {run_id} --to <dir> brings it back")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore pages from the backup store")
+    parser.add_argument('paths', nargs='*', help="Pages to restore, relative to the site root (default: all)")
+    parser.add_argument('--run', default=None,
+                        help="Run to undo: id (or unique prefix), 'latest', 'first' or -N")
+    parser.add_argument('--to', type=Path, default=None,
+                        help="Write the pages under this directory instead of the site")
+    parser.add_argument('--dry-run', action='store_true', help="Show what would be restored")
+    parser.add_argument('--list', action='store_true', help="List backup runs")
+    parser.add_argument('--stats', action='store_true', help="Show store size")
+    parser.add_argument('--import', dest='import_dir', type=Path, default=None, metavar='DIR',
+                        help="Import a mirror of the site (e.g. backup-original) as a backup run")
+    parser.add_argument('--store', type=Path, default=None,
+                        help="Backup store directory (default: $SITE_BACKUP_DIR or ../architetti-sicilia-backups)")
+    args = parser.parse_args()
+
+    store = BackupStore(args.store)
+
+    if args.list:
+        list_runs(store)
+        return 0
+    if args.stats:
+        show_stats(store)
+        return 0
+    if args.import_dir:
+        return import_mirror(store, args.import_dir)
+    if not args.run:
+        parser.error("--run is required to restore (see --list)")
+
+    try:
+        run_id = store.resolve_run(args.run)
+    except LookupError as e:
+        print(f"❌ {e}")
+        return 1
+
+    paths = None
+    if args.paths:
+        paths = {Path(os.path.relpath(Path(p).resolve(), ROOT_DIR.resolve())).as_posix() for p in args.paths}
+        known = store.state_before(run_id, paths)
+        for missing in sorted(paths - set(known)):
+            print(f"⚠️  {missing}: not changed by {run_id} or any later run")
+
+    target = args.to or ROOT_DIR
+    # Restoring over the live site is itself a run, so it can be undone too
+    undo = None if args.dry_run or args.to else BackupRun(store, 'restore')
+
+    print(f"♻️  Restoring pages as they were before {run_id}")
+    print(f"📁 Target: {Path(target).absolute()}")
+    if args.dry_run:
+        print("🧪 Dry run: no files will be written")
+    print()
+
+    restored = store.restore(run_id, paths, target=target, dry_run=args.dry_run, backup=undo)
+    for relpath in restored:
+        print(f"  ✅ {relpath}")
+
+    print()
+    print(f"✅ Done! {len(restored)} pages {'to restore' if args.dry_run else 'restored'}")
+    undo_id = undo.save() if undo is not None else None
+    if undo_id:
+        print(f"💾 Previous content saved as run {undo_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
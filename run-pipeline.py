@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Run the fixer scripts as one pipeline
+Each page is read, parsed and written once, however many passes run on it.
+
+Usage:
+  python3 run-pipeline.py                       # default passes, default order
+  python3 run-pipeline.py --passes structured-data,social-proof
+  python3 run-pipeline.py --skip asset-references
+  python3 run-pipeline.py --jobs 4
+  python3 run-pipeline.py --force               # ignore the build cache
+  python3 run-pipeline.py --parser lxml         # faster parser backend
+  python3 run-pipeline.py --list
+"""
+
+import argparse
+
+from sitetools.backup import BackupRun, BackupStore
+from sitetools.cache import BuildCache, add_cache_arguments
+from sitetools.catalogue import select_pages
+from sitetools.parallel import add_jobs_argument
+from sitetools.parsing import add_parser_argument, set_backend
+from sitetools.pipeline import DEFAULT_PASSES, PASS_SCRIPTS, load_passes, run_pipeline
+from sitetools.rules import print_report
+from sitetools.site import ROOT_DIR
+
+
+def parse_pass_list(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fixer passes over every live page in one go")
+    parser.add_argument('--passes', type=parse_pass_list, default=None,
+                        help="Comma-separated passes, in the order to run them")
+    parser.add_argument('--skip', type=parse_pass_list, default=[],
+                        help="Comma-separated passes to leave out")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Report changes without writing files")
+    parser.add_argument('--list', action='store_true',
+                        help="List available passes and exit")
+    add_jobs_argument(parser)
+    add_cache_arguments(parser)
+    add_parser_argument(parser)
+    args = parser.parse_args()
+
+    if args.parser:
+        set_backend(args.parser)
+
+    if args.list:
+        print("Available passes (default order first):")
+        for name in DEFAULT_PASSES + [n for n in PASS_SCRIPTS if n not in DEFAULT_PASSES]:
+            marker = '•' if name in DEFAULT_PASSES else '○'
+            print(f"  {marker} {name:<22} ({PASS_SCRIPTS[name]})")
+        print()
+        print("○ = opt-in, enable with --passes")
+        return
+
+    names = args.passes if args.passes is not None else DEFAULT_PASSES
+    names = [name for name in names if name not in args.skip]
+    passes = load_passes(names)
+
+    print("🚀 Running pipeline...")
+    print(f"📁 Root directory: {ROOT_DIR.absolute()}")
+    print(f"🔧 Passes: {' → '.join(names)}")
+    if args.dry_run:
+        print("🧪 Dry run: no files will be written")
+    print()
+
+    html_files = select_pages()
+    cache = None if args.force else BuildCache()
+    backup = None if args.dry_run else BackupRun(BackupStore(), 'pipeline')
+
+    scanned = 0
+    modified = 0
+    total_changes = {}
+
+    for filepath, changes in run_pipeline(passes, html_files, write=not args.dry_run, jobs=args.jobs, cache=cache,
+                                            backup=backup):
+        scanned += 1
+        if not changes:
+            continue
+
+        modified += 1
+        print(f"✅ {filepath.relative_to(ROOT_DIR)}")
+        for pass_name, change in changes:
+            print(f"   → [{pass_name}] {change}")
+            total_changes[pass_name] = total_changes.get(pass_name, 0) + 1
+
+    if cache is not None:
+        cache.save()
+    run_id = backup.save() if backup is not None else None
+
+    print()
+    print(f"✅ Done! Modified {modified}/{scanned} files")
+    if scanned < len(html_files):
+        print(f"⏭️  {len(html_files) - scanned} files unchanged since last run (build cache)")
+    if run_id:
+        print(f"💾 Backup: {run_id} in {backup.store.path} (undo: python3 restore-backup.py --run {run_id})")
+    print()
+    print("Summary:")
+    for pass_name in names:
+        print(f"  • {pass_name}: {total_changes.get(pass_name, 0)} changes")
+    print_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Shared helpers for the site maintenance scripts.
+
+The fixer scripts at the repository root stay runnable on their own;
+this package holds the pieces they have in common (page discovery,
+the single-pass pipeline engine, ...).
+"""
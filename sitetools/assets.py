@@ -0,0 +1,197 @@
+"""
+Content-hashed asset names
+
+fingerprint_assets() gives every asset a copy whose name carries a hash
+of its content, and returns the manifest mapping logical URLs to them:
+
+    /assets/css/styles.min.css   -> /assets/css/styles.3f2a1b4c.min.css
+    /assets/images/og.jpg        -> /assets/images/og.9d01e6aa.jpg
+    /guides_it.json              -> /guides_it.5b7c2e10.json
+
+A hashed file never changes, so it can be cached for a year; a new
+deploy changes the name. Images and JSON are hashed first, then CSS
+(with its url()s pointing at hashed images) and JS (with its fetch URLs
+pointing at hashed JSON), so a changed image also renames the
+stylesheet using it.
+
+rewrite_references() points root-relative references ("/assets/...")
+at the hashed names; references to an older hash are updated too.
+Absolute URLs (og:image, JSON-LD) keep the stable logical name, which
+stays published next to the hashed copy.
+
+The manifest is saved to assets/manifest.json.
+"""
+
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+
+from sitetools.site import ROOT_DIR
+
+__all__ = ['fingerprint_assets', 'rewrite_references', 'rewrite_css_urls', 'logical_url',
+           'load_manifest', 'save_manifest', 'write_hashed_json', 'remove_unlisted', 'MANIFEST_PATH']
+
+MANIFEST_PATH = ROOT_DIR / "assets" / "manifest.json"
+
+HASH_LENGTH = 8
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif', '.gif', '.svg', '.ico')
+
+# Assets outside assets/ (the guide records, see sitetools/guides.py)
+ROOT_ASSETS = ('guides_it.json', 'guides_en.json')
+
+# "<stem>.<hash><.min>.<ext>"
+_HASHED_RE = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{%d}(?P<suffix>(?:\.min)?\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+# Root-relative URL of a file with an asset extension
+_REFERENCE_RE = re.compile(r'(?<![\w.:/-])/[\w./%-]+\.(?:css|js|json|jpe?g|png|webp|avif|gif|svg|ico)(?![\w.-])')
+_CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_QUERY_RE = re.compile(r'([^?#]*)(.*)', re.S)
+
+
+def _split_name(name):
+    """('styles', '.min.css') for styles.min.css"""
+    for suffix in ('.min.css', '.min.js'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)], suffix
+    stem, dot, ext = name.rpartition('.')
+    return (stem, dot + ext) if dot else (name, '')
+
+
+def hashed_name(name, content):
+    stem, suffix = _split_name(name)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{suffix}"
+
+
+def logical_url(url):
+    """URL without its content hash (/assets/css/styles.3f2a1b4c.min.css -> /assets/css/styles.min.css)"""
+    head, _, name = url.rpartition('/')
+    match = _HASHED_RE.match(name)
+    if not match:
+        return url
+    return f"{head}/{match.group('stem')}{match.group('suffix')}"
+
+
+def is_hashed(path):
+    return _HASHED_RE.match(Path(path).name) is not None
+
+
+def rewrite_references(text, manifest):
+    """Point root-relative asset references in text at their hashed names
+
+    A hashed reference missing from the manifest goes back to the
+    logical name, which always exists.
+    """
+    def replace(match):
+        logical = logical_url(match.group())
+        return manifest.get(logical, logical)
+    return _REFERENCE_RE.sub(replace, text)
+
+
+def rewrite_css_urls(css, css_url, manifest):
+    """Point the url()s of a stylesheet served at css_url at hashed names (relative ones included)"""
+    base = posixpath.dirname(css_url)
+
+    def replace(match):
+        url = match.group(2)
+        if url.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group()
+        path, rest = _QUERY_RE.match(url).groups()
+        absolute = path if path.startswith('/') else posixpath.normpath(posixpath.join(base, path))
+        target = manifest.get(logical_url(absolute))
+        if target is None:
+            return match.group()
+        return f"url({match.group(1)}{target}{rest}{match.group(1)})"
+
+    return _CSS_URL_RE.sub(replace, css)
+
+
+def _url(path, root):
+    return '/' + Path(path).relative_to(root).as_posix()
+
+
+def _asset_files(root):
+    """Logical asset files by stage: images and data, stylesheets, scripts"""
+    assets = Path(root) / "assets"
+
+    def files(directory, accept):
+        return sorted(p for p in directory.rglob('*')
+                      if p.is_file() and accept(p.name) and not is_hashed(p)) if directory.is_dir() else []
+
+    leaves = files(assets, lambda name: name.lower().endswith(IMAGE_EXTENSIONS))
+    leaves += files(assets / "data", lambda name: name.endswith('.json'))
+    leaves += [Path(root) / name for name in ROOT_ASSETS if (Path(root) / name).is_file()]
+    styles = files(assets / "css", lambda name: name.endswith('.min.css'))
+    scripts = files(assets / "js", lambda name: name.endswith('.min.js'))
+    return leaves, styles, scripts
+
+
+def fingerprint_assets(root=ROOT_DIR, previous=None):
+    """Write a hashed copy of every asset; returns the new manifest {logical URL: hashed URL}
+
+    Hashed copies listed in previous (the last manifest) that are no
+    longer current are deleted.
+    """
+    root = Path(root)
+    leaves, styles, scripts = _asset_files(root)
+    manifest = {}
+
+    def emit(path, content):
+        target = path.with_name(hashed_name(path.name, content))
+        if not target.exists():
+            target.write_bytes(content)
+        manifest[_url(path, root)] = _url(target, root)
+
+    for path in leaves:
+        emit(path, path.read_bytes())
+    for path in styles:
+        css = path.read_text(encoding='utf-8')
+        emit(path, rewrite_css_urls(css, _url(path, root), manifest).encode('utf-8'))
+    for path in scripts:
+        emit(path, rewrite_references(path.read_text(encoding='utf-8'), manifest).encode('utf-8'))
+
+    for logical, hashed in (previous or {}).items():
+        if manifest.get(logical) != hashed:
+            stale = root / hashed.lstrip('/')
+            if is_hashed(stale) and stale.is_file():
+                stale.unlink()
+    return manifest
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """{logical URL: hashed URL}, or {} before the first fingerprinting run"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def write_hashed_json(directory, name, data):
+    """Write data as compact JSON under its content-hashed name (once); returns the file name
+
+    For generated data (search index, guide explorer shards) whose
+    names are listed in a stable index file rather than the manifest.
+    """
+    content = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    target = Path(directory) / hashed_name(name, content)
+    if not target.exists():
+        target.write_bytes(content)
+    return target.name
+
+
+def remove_unlisted(directory, keep):
+    """Delete the files of directory whose name is not in keep (.gz/.br siblings follow their file)"""
+    stale = sorted(p for p in Path(directory).iterdir()
+                   if p.is_file() and p.name.removesuffix('.gz').removesuffix('.br') not in keep)
+    for path in stale:
+        path.unlink()
+    return stale
@@ -0,0 +1,263 @@
+"""
+Content-addressed backup store for pages the fixers overwrite
+
+Replaces the backup-original/ mirror inside the web root. Before a page
+is written, its current bytes are stored once as a compressed blob named
+by their sha256, and the run that overwrote it records (path, hash) in
+its manifest. Identical content is stored once however many runs or
+pages share it.
+
+Store layout (outside the site, SITE_BACKUP_DIR overrides the default
+../architetti-sicilia-backups):
+
+    dictionary              shared zlib dictionary, seeded by the first page stored
+    objects/ab/cdef...      blob: b'd' + zlib data (with the dictionary) or b'z' + zlib data
+    runs/<run id>.json      {"id", "label", "created", "files": {"<relpath>": "<sha256>"}}
+
+A run's manifest holds every page as it was *before* that run changed
+it, so restoring a run undoes it (and every later run) for those pages.
+Pages of one site share most of their markup, so compressing against a
+dictionary cut from one of them makes the blobs about 4x smaller than
+plain zlib.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from sitetools.site import ROOT_DIR, keep_file_mode
+
+ENV_VAR = 'SITE_BACKUP_DIR'
+DEFAULT_DIR_NAME = "architetti-sicilia-backups"
+
+# zlib only looks back 32 KB, so a longer dictionary would be wasted
+ZDICT_SIZE = 32 * 1024
+COMPRESS_LEVEL = 9
+
+
+def backup_dir():
+    """Where the store lives (SITE_BACKUP_DIR, else next to the site)"""
+    return Path(os.environ.get(ENV_VAR) or ROOT_DIR.resolve().parent / DEFAULT_DIR_NAME)
+
+
+def _write_atomic(path, data, page=False):
+    """Write bytes to path via a temporary file in the same directory
+
+    The temporary file is 0600, fine for blobs and manifests; a page
+    (page=True) keeps the mode of the file it replaces, else gets
+    PAGE_MODE minus the umask.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if page:
+            keep_file_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BackupStore:
+    """Deduplicated, compressed page blobs plus one manifest per run
+
+    Only holds a path, so it can be handed to worker processes: blobs are
+    written atomically and named by content, so concurrent writers never
+    clash. Manifests are written by the parent (BackupRun).
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else backup_dir()
+        self._zdict = None
+
+    @property
+    def objects_dir(self):
+        return self.path / "objects"
+
+    @property
+    def runs_dir(self):
+        return self.path / "runs"
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def _dictionary(self, seed=None):
+        """The store's zlib dictionary; the first caller with a seed creates it"""
+        if self._zdict is not None:
+            return self._zdict
+        dict_path = self.path / "dictionary"
+        if not dict_path.exists() and seed:
+            # Link a finished temp file into place: exactly one process
+            # wins, and the dictionary never changes afterwards
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(seed[-ZDICT_SIZE:])
+            try:
+                os.link(tmp_path, dict_path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp_path)
+        try:
+            self._zdict = dict_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        return self._zdict
+
+    def put(self, data):
+        """Store bytes (once); returns their sha256"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest
+
+        zdict = self._dictionary(seed=data)
+        if zdict:
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zdict=zdict)
+            blob = b'd' + compressor.compress(data) + compressor.flush()
+        else:
+            blob = b'z' + zlib.compress(data, COMPRESS_LEVEL)
+        _write_atomic(path, blob)
+        return digest
+
+    def put_file(self, filepath):
+        """Store a file's current bytes; returns their sha256"""
+        with open(filepath, 'rb') as f:
+            return self.put(f.read())
+
+    def get(self, digest):
+        """Bytes of a stored blob, checked against its hash"""
+        path = self._object_path(digest)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            raise KeyError(f"Backup blob {digest} is missing from {self.objects_dir}") from None
+
+        if blob[:1] == b'd':
+            zdict = self._dictionary()
+            if zdict is None:
+                raise RuntimeError(f"Backup store {self.path} has lost its dictionary")
+            decompressor = zlib.decompressobj(zdict=zdict)
+            data = decompressor.decompress(blob[1:]) + decompressor.flush()
+        else:
+            data = zlib.decompress(blob[1:])
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"Backup blob {digest} is corrupted")
+        return data
+
+    def runs(self):
+        """Run ids, oldest first"""
+        if not self.runs_dir.is_dir():
+            return []
+        return sorted(p.stem for p in self.runs_dir.glob("*.json"))
+
+    def load_run(self, run_id):
+        with open(self.runs_dir / f"{run_id}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def resolve_run(self, spec):
+        """Run id from 'latest', 'first', -N (Nth latest) or a unique id prefix"""
+        runs = self.runs()
+        if not runs:
+            raise LookupError(f"No backup runs in {self.path}")
+        if spec == 'latest':
+            return runs[-1]
+        if spec == 'first':
+            return runs[0]
+        if re.fullmatch(r'-[1-9][0-9]*', spec):
+            index = int(spec)
+            if -index > len(runs):
+                raise LookupError(f"Only {len(runs)} backup runs")
+            return runs[index]
+        matches = [run_id for run_id in runs if run_id.startswith(spec)]
+        if len(matches) != 1:
+            found = 'no run' if not matches else f"{len(matches)} runs"
+            raise LookupError(f"'{spec}' matches {found} (see --list)")
+        return matches[0]
+
+    def state_before(self, run_id, paths=None):
+        """{relpath: sha256} of the pages as they were before run_id
+
+        A page changed by run_id is taken from its manifest; one first
+        changed by a later run from that later run. Pages no run since
+        run_id touched are left out: they are still as they were.
+        """
+        runs = self.runs()
+        state = {}
+        for later in runs[runs.index(run_id):]:
+            for relpath, digest in self.load_run(later)['files'].items():
+                if paths is None or relpath in paths:
+                    state.setdefault(relpath, digest)
+        return state
+
+    def restore(self, run_id, paths=None, target=ROOT_DIR, dry_run=False, backup=None):
+        """Write the pages back as they were before run_id
+
+        target is the site root to restore into (another directory gives
+        an export). Pages whose content already matches are not touched;
+        the others are first saved in backup (a BackupRun), if given, so
+        the restore itself can be undone. Returns the restored relpaths.
+        """
+        target = Path(target)
+        restored = []
+        for relpath, digest in sorted(self.state_before(run_id, paths).items()):
+            dest = target / relpath
+            if dest.exists():
+                current = hashlib.sha256(dest.read_bytes()).hexdigest()
+                if current == digest:
+                    continue
+            restored.append(relpath)
+            if dry_run:
+                continue
+            data = self.get(digest)
+            if backup is not None and dest.exists():
+                backup.add(dest, root=target)
+            _write_atomic(dest, data, page=True)
+        return restored
+
+
+class BackupRun:
+    """The manifest of one fixer run, written when the run ends"""
+
+    def __init__(self, store, label):
+        self.store = store
+        self.label = label
+        self.created = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}"
+        self.files = {}
+
+    def add(self, filepath, root=ROOT_DIR):
+        """Back up filepath's current content (only its first state in this run counts)"""
+        relpath = Path(filepath).relative_to(root).as_posix()
+        if relpath not in self.files:
+            self.files[relpath] = self.store.put_file(filepath)
+
+    def record(self, filepath, digest, root=ROOT_DIR):
+        """Register a blob a worker process already stored for filepath"""
+        relpath = Path(filepath).relative_to(root).as_posix()
+        self.files.setdefault(relpath, digest)
+
+    def save(self):
+        """Write the manifest (nothing for a run that changed no page)"""
+        if not self.files:
+            return None
+        run_id = self.id
+        suffix = 1
+        while (self.store.runs_dir / f"{run_id}.json").exists():
+            suffix += 1
+            run_id = f"{self.id}-{suffix}"
+        self.id = run_id
+
+        manifest = {'id': run_id, 'label': self.label, 'created': self.created, 'files': self.files}
+        data = json.dumps(manifest, indent=1, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        _write_atomic(self.store.runs_dir / f"{run_id}.json", data)
+        return run_id
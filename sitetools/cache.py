@@ -0,0 +1,125 @@
+"""
+Incremental build cache
+
+A persistent manifest remembers, per pass, the content hash each page
+had right after that pass last processed it. On the next run a page
+whose content still matches is skipped without being parsed.
+
+Each pass has a version fingerprint built from its script source (and
+any data files it depends on), so editing a fixer, its templates
+(CTA_TEMPLATES, PHONE_CTA, ...) or its rules (lede-rules.json)
+invalidates its entries automatically.
+
+Manifest layout (.build-cache/manifest.json):
+    {"<pass>": {"version": "<fingerprint>",
+                "files": {"<relpath>": ["<sha256>", <mtime_ns>, <size>]}}}
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from sitetools.site import ROOT_DIR
+
+CACHE_DIR = ROOT_DIR / ".build-cache"
+MANIFEST_PATH = CACHE_DIR / "manifest.json"
+
+
+def file_hash(filepath):
+    """sha256 of a file's bytes"""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(*parts):
+    """Stable short hash of strings, JSON-able data and file contents (Path; a missing file hashes as empty)"""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, Path):
+            h.update(part.read_bytes() if part.is_file() else b'')
+        elif isinstance(part, str):
+            h.update(part.encode('utf-8'))
+        else:
+            h.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+
+class BuildCache:
+    """Per-pass record of which page contents have already been processed"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self.dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.data = {}
+
+    def _files(self, pass_name, version):
+        entry = self.data.get(pass_name)
+        if entry is None or entry.get('version') != version:
+            # New pass or changed fixer: forget everything it processed
+            entry = {'version': version, 'files': {}}
+            self.data[pass_name] = entry
+            self.dirty = True
+        return entry['files']
+
+    def is_fresh(self, pass_name, version, filepath):
+        """True if pass already processed filepath's current content"""
+        record = self._files(pass_name, version).get(Path(filepath).as_posix())
+        if record is None:
+            return False
+
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return False
+
+        recorded_hash, mtime_ns, size = record
+        if st.st_mtime_ns == mtime_ns and st.st_size == size:
+            return True
+
+        # Touched but possibly identical (checkout, copy): compare content
+        return file_hash(filepath) == recorded_hash
+
+    def record(self, pass_name, version, filepath):
+        """Remember filepath's current content as processed by pass"""
+        st = os.stat(filepath)
+        files = self._files(pass_name, version)
+        files[Path(filepath).as_posix()] = [file_hash(filepath), st.st_mtime_ns, st.st_size]
+        self.dirty = True
+
+    def recorded(self, pass_name):
+        """Paths pass has recorded, whatever version processed them"""
+        return list(self.data.get(pass_name, {}).get('files', {}))
+
+    def forget(self, pass_name, filepath):
+        files = self.data.get(pass_name, {}).get('files', {})
+        if files.pop(Path(filepath).as_posix(), None) is not None:
+            self.dirty = True
+
+    def stale(self, pass_name, version, files):
+        """Return the files pass still has to look at"""
+        return [f for f in files if not self.is_fresh(pass_name, version, f)]
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def add_cache_arguments(parser):
+    """Add the shared --force option to an argparse parser"""
+    parser.add_argument('--force', action='store_true',
+                        help="Ignore the build cache and process every file")
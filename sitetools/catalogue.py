@@ -0,0 +1,160 @@
+"""
+Persistent catalogue of the site's pages
+
+Scripts pick their targets by querying the catalogue instead of each
+walking the tree with its own glob and filters:
+
+    guide_files = select_pages(GUIDE_SECTIONS)
+    english = select_pages(language='en')
+    palermo = select_pages(('guide',), province='palermo')
+
+One row per live page (.build-cache/catalogue.sqlite):
+    path        relative to the site root, posix
+    section     top-level directory ('guide', 'sicilia', 'en', ...), '' for root pages
+    language    from <html lang>, else from the location (en/ -> 'en')
+    province    guide/<province>/ and province/<province>/ pages, else NULL
+    mtime_ns, size, hash (sha256)
+
+refresh() stats every page and only reads and hashes those whose mtime
+or size changed; rows of deleted pages are dropped. Results come back in
+the order iter_html_files() walks the tree, so output that depends on
+page order (first extracted CSS wins, ...) is unchanged.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+from sitetools.cache import CACHE_DIR
+from sitetools.site import (ROOT_DIR, iter_html_files, page_language, page_province, page_section,
+                            walk_order)
+
+CATALOGUE_PATH = CACHE_DIR / "catalogue.sqlite"
+
+# Bump when the schema or the derived columns change: the table is rebuilt
+SCHEMA_VERSION = 1
+
+_HTML_LANG_RE = re.compile(rb'<html\b[^>]*?\slang\s*=\s*["\']?([A-Za-z]+)', re.IGNORECASE)
+
+Page = namedtuple('Page', 'path section language province mtime_ns size hash')
+
+
+def _language(data, filepath, root):
+    match = _HTML_LANG_RE.search(data, 0, 4096)
+    if match:
+        return match.group(1).decode('ascii').lower()
+    return page_language(filepath, root)
+
+
+class Catalogue:
+    """SQLite index of every live page, kept current from stat() data"""
+
+    def __init__(self, root=ROOT_DIR, path=None):
+        self.root = Path(root)
+        self.path = Path(path) if path is not None else self.root / CATALOGUE_PATH.relative_to(ROOT_DIR)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self._create()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def _create(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS pages")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                path TEXT PRIMARY KEY,
+                section TEXT NOT NULL,
+                language TEXT NOT NULL,
+                province TEXT,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_section ON pages (section)")
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.commit()
+
+    def refresh(self):
+        """Bring the catalogue in line with the tree; returns (added, updated, removed) counts"""
+        known = {row[0]: (row[1], row[2]) for row in self.db.execute("SELECT path, mtime_ns, size FROM pages")}
+        seen = set()
+        added = updated = 0
+
+        for filepath in iter_html_files(self.root):
+            relpath = filepath.relative_to(self.root).as_posix()
+            seen.add(relpath)
+            st = os.stat(filepath)
+            if known.get(relpath) == (st.st_mtime_ns, st.st_size):
+                continue
+
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            row = (relpath, page_section(filepath, self.root), _language(data, filepath, self.root),
+                   page_province(filepath, self.root), st.st_mtime_ns, st.st_size,
+                   hashlib.sha256(data).hexdigest())
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            if relpath in known:
+                updated += 1
+            else:
+                added += 1
+
+        removed = [(relpath,) for relpath in known if relpath not in seen]
+        self.db.executemany("DELETE FROM pages WHERE path = ?", removed)
+        self.db.commit()
+        return added, updated, len(removed)
+
+    def query(self, sections=None, language=None, province=None):
+        """Matching Page rows in walk order
+
+        sections limits the result to those top-level directories (root
+        pages are only included when sections is None), like
+        iter_html_files().
+        """
+        clauses = []
+        params = []
+        if sections is not None:
+            sections = list(sections)
+            clauses.append(f"section IN ({', '.join('?' * len(sections))})")
+            params.extend(sections)
+        if language is not None:
+            clauses.append("language = ?")
+            params.append(language)
+        if province is not None:
+            clauses.append("province = ?")
+            params.append(province)
+
+        sql = "SELECT * FROM pages"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        rows = [Page(*row) for row in self.db.execute(sql, params)]
+        rows.sort(key=lambda page: walk_order(page.path))
+        return rows
+
+    def pages(self, sections=None, language=None, province=None):
+        """Paths (under root) of the matching pages, in walk order"""
+        return [self.root / page.path for page in self.query(sections, language, province)]
+
+    def get(self, filepath):
+        """Page row for one file, or None"""
+        relpath = Path(filepath).relative_to(self.root).as_posix()
+        row = self.db.execute("SELECT * FROM pages WHERE path = ?", (relpath,)).fetchone()
+        return Page(*row) if row else None
+
+
+def select_pages(sections=None, language=None, province=None, root=ROOT_DIR):
+    """Refresh the catalogue of root and return the matching page paths"""
+    with Catalogue(root) as catalogue:
+        catalogue.refresh()
+        return catalogue.pages(sections, language, province)
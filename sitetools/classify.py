@@ -0,0 +1,134 @@
+"""
+Keyword classification for page categories and lede topics
+
+A Classifier holds rules in priority order, each a label plus keywords,
+optionally restricted to some fields of the page (path, title, body,
+lede, ...). classify() scans each field once for every keyword of every
+rule together; the highest-priority rule with a hit in one of its
+fields wins.
+
+The scan is a single regex compiled from a trie of all keywords (the
+goto function of an Aho-Corasick automaton, run by the C regex engine),
+so its cost stays flat as topics and keywords are added: a pure-Python
+automaton would be far slower on whole pages than the substring checks
+it replaces.
+"""
+
+import re
+from collections import namedtuple
+
+Rule = namedtuple('Rule', 'label keywords fields')
+
+# Shared by fix-cta-improved.py (path + whole page) and add-social-proof.py (path + title)
+PAGE_CATEGORY_RULES = [
+    ('sanatoria', ['sanatoria', 'regolarit', 'rogito', 'vincoli', 'verifica-stato-legittimo']),
+    ('ristrutturazione', ['ristrutturazione', 'appartamento', 'villa', 'interni']),
+    ('pratiche', ['cila', 'scia', 'permess', 'pratica', 'autorizzazioni']),
+]
+
+
+def _trie_pattern(keywords):
+    """Regex matching the longest keyword that starts at a position"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ends here: the longer continuation is optional (and tried first)
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Find every occurrence of a fixed set of keywords in one scan"""
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set(keywords))
+        if not self.keywords or '' in self.keywords:
+            raise ValueError("KeywordMatcher needs non-empty keywords")
+        self._regex = re.compile(_trie_pattern(self.keywords))
+
+        # The regex reports the longest keyword at each offset; shorter
+        # keywords that are prefixes of it occur at the same offset
+        known = set(self.keywords)
+        self._at_offset = {
+            keyword: [keyword[:i] for i in range(1, len(keyword) + 1) if keyword[:i] in known]
+            for keyword in self.keywords
+        }
+
+    def finditer(self, text):
+        """Yield (offset, keyword) for every occurrence, overlapping ones included"""
+        search = self._regex.search
+        pos = 0
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return
+            start = match.start()
+            for keyword in self._at_offset[match.group()]:
+                yield start, keyword
+            pos = start + 1
+
+
+class Classifier:
+    """Priority-ordered keyword rules over named text fields"""
+
+    def __init__(self, rules, fields):
+        self.fields = tuple(fields)
+        self.rules = []
+        self._keyword_rules = {}    # keyword -> [(priority, set of field indexes)]
+
+        for priority, rule in enumerate(rules):
+            label, keywords = rule[0], rule[1]
+            rule_fields = rule[2] if len(rule) > 2 else None
+            rule = Rule(label, tuple(k.lower() for k in keywords), rule_fields)
+            self.rules.append(rule)
+
+            allowed = set(range(len(self.fields)))
+            if rule_fields is not None:
+                unknown = set(rule_fields) - set(self.fields)
+                if unknown:
+                    raise ValueError(f"Rule {label!r} uses unknown fields: {', '.join(sorted(unknown))}")
+                allowed = {self.fields.index(f) for f in rule_fields}
+
+            for keyword in rule.keywords:
+                self._keyword_rules.setdefault(keyword, []).append((priority, allowed))
+
+        self.matcher = KeywordMatcher(self._keyword_rules)
+
+    def _scan(self, values, stop_at_first):
+        unknown = set(values) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        # Each field is lowercased and scanned once, in order, so a
+        # top-priority hit in the path skips the body entirely
+        hits = set()
+        for index, field in enumerate(self.fields):
+            text = values.get(field)
+            if not text:
+                continue
+            for _pos, keyword in self.matcher.finditer(text.lower()):
+                for priority, allowed in self._keyword_rules[keyword]:
+                    if index in allowed and priority not in hits:
+                        hits.add(priority)
+                        if stop_at_first and priority == 0:
+                            return hits
+        return hits
+
+    def matches(self, **values):
+        """Labels of every rule with a hit, in priority order"""
+        return [self.rules[p].label for p in sorted(self._scan(values, False))]
+
+    def classify(self, default=None, **values):
+        """Label of the highest-priority rule with a hit, else default"""
+        hits = self._scan(values, True)
+        return self.rules[min(hits)].label if hits else default
@@ -0,0 +1,173 @@
+"""
+Above-the-fold ("critical") CSS for each page template
+
+A first screen shows the same part of every page built from one layout
+(sitetools.site.page_template): the nav, the hidden search modal, the
+start of <main> and whatever is positioned fixed or sticky. For a sample
+of pages per template those elements are collected and every selector
+of the page's local stylesheets that matches one of them is kept:
+
+    critical = compute_critical_css(pages)
+    # {'guide': {'/assets/css/styles.min.css': 'css...', ...}, ...}
+
+Stylesheets are keyed by their logical URL (without the content hash,
+see sitetools/assets.py), so the rules still apply after a rename.
+
+The page then inlines that subset in <head> and loads the full
+stylesheets without blocking render (inline-critical-css.py).
+
+Selectors are matched with soupsieve once pseudo-elements are removed.
+Selectors that only apply on interaction (:hover, :focus, ...) are not
+critical; a selector soupsieve cannot handle is kept, to be safe.
+@media wrappers, @keyframes and @font-face blocks are kept as they are;
+a rule that a stray "}" makes browsers ignore is left out.
+"""
+
+import re
+from collections import defaultdict
+from pathlib import Path
+
+import soupsieve
+from bs4 import Tag
+
+from sitetools.assets import logical_url
+from sitetools.cssmin import filter_css, style_rules
+from sitetools.parsing import parse_html
+from sitetools.site import ROOT_DIR, page_template
+
+__all__ = ['compute_critical_css', 'fold_elements', 'local_stylesheets', 'sample_pages']
+
+# Characters of <main> text a first screen shows (a phone in portrait
+# fits the breadcrumb, the h1, the lede and the first buttons)
+FOLD_TEXT = 600
+
+# Pages per template whose first screens are merged
+SAMPLE_SIZE = 12
+
+# Only stylesheets served from the site itself are inlined
+LOCAL_CSS_PREFIX = '/assets/css/'
+
+_INTERACTIVE_RE = re.compile(r':(hover|focus|focus-visible|focus-within|active|visited|target)\b')
+_PSEUDO_ELEMENT_RE = re.compile(r'::?(before|after|first-line|first-letter|placeholder|selection|marker|backdrop|-[\w-]+)\b')
+_ON_SCREEN_RE = re.compile(r'(^|;)position:(fixed|sticky)(;|$|!)')
+_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def local_stylesheets(soup):
+    """hrefs of the site's own stylesheets in <head>, in document order
+
+    A stylesheet that is already deferred (rel=preload as=style) counts;
+    its <noscript> fallback does not.
+    """
+    hrefs = []
+    for link in soup.find_all('link', href=True):
+        if link.find_parent('noscript') or not link['href'].startswith(LOCAL_CSS_PREFIX):
+            continue
+        rel = link.get('rel') or []
+        if 'stylesheet' in rel or ('preload' in rel and link.get('as') == 'style'):
+            hrefs.append(link['href'])
+    return hrefs
+
+
+def fold_elements(soup, budget=FOLD_TEXT):
+    """Elements of the first screen: all of <body> before <main>, then <main> until budget characters of text"""
+    body = soup.body or soup
+    main = body.find('main')
+    elements = [el for el in (soup.html, soup.body) if el is not None]
+    text = 0
+    for node in body.descendants:
+        if isinstance(node, Tag):
+            elements.append(node)
+        elif main is None or main in node.parents:
+            text += len(node.strip())
+            if text >= budget:
+                break
+    return elements
+
+
+def _match_target(selector):
+    """Selector to match against the page, or None if it only applies on interaction"""
+    if _INTERACTIVE_RE.search(selector):
+        return None
+    return _PSEUDO_ELEMENT_RE.sub('', selector).strip() or '*'
+
+
+def _select(selector, soup):
+    """Elements matching selector, or None if soupsieve cannot evaluate it"""
+    try:
+        return soupsieve.select(selector, soup)
+    except (soupsieve.SelectorSyntaxError, NotImplementedError, ValueError):
+        return None
+
+
+def critical_selectors(soup, rules, budget=FOLD_TEXT):
+    """Selectors of rules ([(selectors, declarations)]) that style the page's first screen"""
+    on_screen = set(map(id, fold_elements(soup, budget)))
+    for selectors, declarations in rules:
+        if _ON_SCREEN_RE.search(declarations):
+            for selector in selectors:
+                target = _match_target(selector)
+                for el in (_select(target, soup) or []) if target else []:
+                    on_screen.add(id(el))
+                    on_screen.update(id(child) for child in el.find_all(True))
+
+    critical = set()
+    for selectors, _ in rules:
+        for selector in selectors:
+            target = _match_target(selector)
+            if target is None:
+                continue
+            matches = _select(target, soup)
+            if matches is None or any(id(el) in on_screen for el in matches):
+                critical.add(selector)
+    return critical
+
+
+def sample_pages(pages, size=SAMPLE_SIZE):
+    """Up to size pages spread evenly over pages"""
+    pages = list(pages)
+    if len(pages) <= size:
+        return pages
+    return [pages[i * len(pages) // size] for i in range(size)]
+
+
+def _rebase_urls(css, href):
+    """Make relative url()s absolute, since the CSS moves from href into the page"""
+    base = href.rsplit('/', 1)[0] + '/'
+
+    def rebase(match):
+        url = match.group(2)
+        if url.startswith(('/', '#', 'data:', 'http:', 'https:')):
+            return match.group()
+        return f"url({match.group(1)}{base}{url}{match.group(1)})"
+
+    return _URL_RE.sub(rebase, css)
+
+
+def compute_critical_css(pages, root=ROOT_DIR, sample=SAMPLE_SIZE, budget=FOLD_TEXT):
+    """{template: {stylesheet href: critical CSS}} for pages (a sample of each template is analysed)"""
+    by_template = defaultdict(list)
+    for filepath in pages:
+        by_template[page_template(filepath, root)].append(filepath)
+
+    sheets = {}
+    critical = {}
+    for template, template_pages in sorted(by_template.items()):
+        selected = defaultdict(set)
+        for filepath in sample_pages(template_pages, sample):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                soup = parse_html(f.read())
+            for href in local_stylesheets(soup):
+                if href not in sheets:
+                    path = Path(root) / href.lstrip('/')
+                    css = path.read_text(encoding='utf-8') if path.is_file() else None
+                    sheets[href] = (css, list(style_rules(css)) if css is not None else None)
+                css, rules = sheets[href]
+                if css is not None:
+                    selected[href] |= critical_selectors(soup, rules, budget)
+
+        critical[template] = {}
+        for href, selectors in selected.items():
+            css, _ = filter_css(sheets[href][0], selectors.__contains__, stray=False)
+            critical[template][logical_url(href)] = _rebase_urls(css, href)
+    return critical
@@ -0,0 +1,365 @@
+"""
+CSS minifier and unused-selector purge for the asset step
+
+No dependencies. The stylesheet is split into tokens first (strings,
+url(...) and comments are never touched by the whitespace rules), then
+into rules, so whitespace is only removed where CSS ignores it:
+
+    minified = minify_css(source)
+
+The purge drops selectors that cannot match anything on the site: a
+selector is kept when every class, id and element it requires is used
+somewhere (see collect_usage) or matches the safelist. Parts inside
+:not()/:is()/:where()/:has() and attribute selectors are not required.
+
+    usage = collect_usage(pages, scripts, templates)
+    minified, dropped = purge_css(source, usage, safelist=('open', 'ge-*'))
+
+dropped lists (selector, bytes saved) for the report. Rules inside
+@keyframes, @font-face and other non-selector blocks are never purged.
+filter_css() is the same walk with any selector predicate (see
+sitetools/critical.py).
+"""
+
+import fnmatch
+import re
+
+__all__ = ['minify_css', 'purge_css', 'filter_css', 'style_rules', 'collect_usage', 'Usage']
+
+_TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<url>url\(\s*[^\s"'()]*\s*\))
+  | (?P<ws>\s+)
+  | (?P<punct>[{}();:,>+~!\[\]])
+  | (?P<other>\\.|[^\s{}();:,>+~!\[\]"'\\/]+|[/\\])
+''', re.S | re.X | re.I)
+
+# At-rules whose block holds rules (purged like the top level)
+_NESTING_AT_RULES = frozenset(('media', 'supports', 'layer', 'container', 'document', '-moz-document', 'scope'))
+# At-rules whose block holds rules that are not selectors
+_FRAME_AT_RULES = re.compile(r'(-[a-z]+-)?keyframes$')
+
+
+def _atoms(css):
+    """Tokens with whitespace and comments folded into single ' ' atoms ('/*!' comments kept)"""
+    atoms = []
+    for match in _TOKEN_RE.finditer(css):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == 'comment' and not text.startswith('/*!'):
+            kind, text = 'ws', ' '
+        if kind == 'ws':
+            if atoms and atoms[-1] != ' ':
+                atoms.append(' ')
+            continue
+        if kind == 'url':
+            text = 'url(' + text[4:-1].strip() + ')'
+        atoms.append(text)
+    return atoms
+
+
+def _join(atoms, left=(), right=()):
+    """Join atoms, dropping the ' ' after an atom in left or before one in right"""
+    out = []
+    for i, atom in enumerate(atoms):
+        if atom == ' ':
+            if not out or i + 1 == len(atoms) or out[-1] in left or atoms[i + 1] in right:
+                continue
+        out.append(atom)
+    return ''.join(out).strip()
+
+
+# Where whitespace can go. Values keep it before '(' ('calc(1px + (2px))')
+# and at-rule preludes after ')' ('(a) and (b)')
+_SELECTOR_SPACE = (frozenset(', > + ~ ('.split()), frozenset(', > + ~ )'.split()))
+_AT_SPACE = (frozenset(', : ('.split()), frozenset(', : )'.split()))
+_VALUE_SPACE = (frozenset(', ( / !'.split()), frozenset(', ) / !'.split()))
+
+
+def _split(atoms, separator):
+    """Split atoms on separator outside parentheses and brackets"""
+    parts = [[]]
+    depth = 0
+    for atom in atoms:
+        if atom in ('(', '['):
+            depth += 1
+        elif atom in (')', ']'):
+            depth -= 1
+        elif atom == separator and depth == 0:
+            parts.append([])
+            continue
+        parts[-1].append(atom)
+    return parts
+
+
+def _declarations(atoms):
+    """'name:value;...' with the ignorable whitespace and the last ';' removed"""
+    decls = []
+    for part in _split(atoms, ';'):
+        if ':' not in part:
+            text = _join(part, *_VALUE_SPACE)
+            if text:
+                decls.append(text)
+            continue
+        colon = part.index(':')
+        name = _join(part[:colon])
+        value = _join(part[colon + 1:], *_VALUE_SPACE)
+        decls.append(f"{name}:{value}")
+    return ';'.join(decls)
+
+
+class _Rule:
+    """Style rule (selectors + declarations) or at-rule (with rules, declarations or nothing)"""
+
+    def __init__(self, prelude, body=None, children=None, purgeable=True):
+        self.prelude = prelude          # already minified text
+        self.body = body                # declarations text, or None
+        self.children = children        # list of _Rule, or None
+        self.purgeable = purgeable
+
+    def render(self):
+        if self.children is not None:
+            return self.prelude + '{' + _render(self.children) + '}'
+        if self.body is None:
+            return self.prelude + ';' if self.prelude.startswith('@') else self.prelude
+        return self.prelude + '{' + self.body + '}'
+
+
+def _matching_brace(atoms, start):
+    depth = 0
+    for i in range(start, len(atoms)):
+        if atoms[i] == '{':
+            depth += 1
+        elif atoms[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(atoms)
+
+
+def _parse_rules(atoms, purgeable=True):
+    rules = []
+    prelude = []
+    i = 0
+    while i < len(atoms):
+        atom = atoms[i]
+        if atom.startswith('/*!'):
+            rules.append(_Rule(atom))
+        elif atom == ';' and prelude and prelude[0].startswith('@'):
+            rules.append(_Rule(_join(prelude, *_AT_SPACE)))
+            prelude = []
+        elif atom == '{':
+            end = _matching_brace(atoms, i)
+            inner = atoms[i + 1:end]
+            rules.append(_parse_block(prelude, inner, purgeable))
+            prelude = []
+            i = end
+        else:
+            # A stray '}' stays in the next rule's prelude, where browsers see it too
+            prelude.append(atom)
+        i += 1
+    if _join(prelude):
+        rules.append(_Rule(_join(prelude)))
+    return rules
+
+
+def _parse_block(prelude, inner, purgeable):
+    head = next((a for a in prelude if a != ' '), '')
+    if head.startswith('@'):
+        name = head[1:].lower()
+        text = _join(prelude, *_AT_SPACE)
+        if name in _NESTING_AT_RULES:
+            return _Rule(text, children=_parse_rules(inner, purgeable))
+        if _FRAME_AT_RULES.match(name):
+            return _Rule(text, children=_parse_rules(inner, purgeable=False))
+        return _Rule(text, body=_declarations(inner), purgeable=False)
+    text = _join(prelude, *_SELECTOR_SPACE)
+    if '{' in inner:
+        # Nested rules (CSS nesting): keep the block as written, minus whitespace
+        left, right = _SELECTOR_SPACE
+        return _Rule(text, body=_join(inner, left | {';', '{', '}'}, right | {';', '{', '}'}), purgeable=False)
+    return _Rule(text, body=_declarations(inner), purgeable=purgeable and not text.startswith('}'))
+
+
+def _parse(css):
+    return _parse_rules(_atoms(css))
+
+
+def _render(rules):
+    # Empty blocks ('a{}', '@media x{}') are dropped
+    return ''.join(rule.render() for rule in rules if rule.children != [] and rule.body != '')
+
+
+def minify_css(css):
+    """Minified stylesheet: comments and ignorable whitespace removed"""
+    return _render(_parse(css))
+
+
+# -- purge ----------------------------------------------------------------------
+
+class Usage:
+    """Classes, ids and element names the site's markup and scripts can produce"""
+
+    def __init__(self):
+        self.classes = set()
+        self.ids = set()
+        self.tags = {'html', 'body'}
+
+    def add_markup(self, html):
+        for match in _CLASS_ATTR_RE.finditer(html):
+            self.classes.update(_attr_value(match).split())
+        for match in _ID_ATTR_RE.finditer(html):
+            self.ids.update(_attr_value(match).split())
+        self.tags.update(tag.lower() for tag in _TAG_RE.findall(html))
+
+    def add_script(self, js):
+        """Every word of a script may be a class, id or tag it sets (classList.add('open'), createElement('button'))"""
+        self.add_markup(js)
+        words = set(_WORD_RE.findall(js))
+        self.classes |= words
+        self.ids |= words
+        self.tags |= {word.lower() for word in words}
+
+
+_CLASS_ATTR_RE = re.compile(r'''\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))''', re.I)
+_ID_ATTR_RE = re.compile(r'''\bid\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))''', re.I)
+_TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+_WORD_RE = re.compile(r'-?[A-Za-z_][\w-]*')
+
+
+def _attr_value(match):
+    return next(group for group in match.groups() if group is not None)
+
+
+def collect_usage(pages=(), scripts=(), templates=()):
+    """Usage across HTML pages, JS sources and Python files holding markup templates"""
+    usage = Usage()
+    for filepath in pages:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            usage.add_markup(f.read())
+    for filepath in scripts:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            usage.add_script(f.read())
+    for filepath in templates:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            usage.add_markup(f.read())
+    return usage
+
+
+# Optional parts of a selector: functional pseudo-classes, attribute
+# selectors, other pseudo-classes and pseudo-elements
+_FUNCTIONAL_PSEUDO_RE = re.compile(r'::?[\w-]+\(')
+_ATTRIBUTE_RE = re.compile(r'\[[^\]]*\]')
+_PSEUDO_RE = re.compile(r'::?[\w-]+')
+_SIMPLE_RE = re.compile(r'([.#]?)(-?[A-Za-z_][\w-]*|\*)')
+
+
+def _strip_functional_pseudos(selector):
+    while True:
+        match = _FUNCTIONAL_PSEUDO_RE.search(selector)
+        if not match:
+            return selector
+        depth = 1
+        i = match.end()
+        while i < len(selector) and depth:
+            depth += {'(': 1, ')': -1}.get(selector[i], 0)
+            i += 1
+        selector = selector[:match.start()] + selector[i:]
+
+
+def required_names(selector):
+    """(classes, ids, tags) a selector needs, or None if it cannot be analysed"""
+    if '\\' in selector or '"' in selector or "'" in selector:
+        return None
+    selector = _strip_functional_pseudos(selector)
+    selector = _ATTRIBUTE_RE.sub('', selector)
+    selector = _PSEUDO_RE.sub('', selector)
+    classes, ids, tags = set(), set(), set()
+    for prefix, name in _SIMPLE_RE.findall(selector):
+        if prefix == '.':
+            classes.add(name)
+        elif prefix == '#':
+            ids.add(name)
+        elif name != '*':
+            tags.add(name.lower())
+    return classes, ids, tags
+
+
+def _safe(name, safelist):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in safelist)
+
+
+def selector_used(selector, usage, safelist=()):
+    required = required_names(selector)
+    if required is None:
+        return True
+    classes, ids, tags = required
+    return (all(c in usage.classes or _safe(c, safelist) for c in classes)
+            and all(i in usage.ids or _safe(i, safelist) for i in ids)
+            and all(t in usage.tags for t in tags))
+
+
+def _filter_rules(rules, keep, dropped, stray=True):
+    kept = []
+    for rule in rules:
+        if not stray and rule.prelude.startswith('}'):
+            dropped.append((rule.prelude, len(rule.render())))
+            continue
+        if rule.children is not None:
+            if rule.purgeable:
+                rule.children = _filter_rules(rule.children, keep, dropped, stray)
+                if not rule.children:
+                    continue
+            kept.append(rule)
+            continue
+        if not rule.purgeable or rule.body is None or rule.prelude.startswith('@'):
+            kept.append(rule)
+            continue
+
+        selectors = _selectors(rule)
+        used = [s for s in selectors if keep(s)]
+        if not used:
+            dropped.append((rule.prelude, len(rule.render())))
+            continue
+        if len(used) < len(selectors):
+            for selector in selectors:
+                if selector not in used:
+                    dropped.append((selector, len(selector) + 1))
+            rule.prelude = ','.join(used)
+        kept.append(rule)
+    return kept
+
+
+def _selectors(rule):
+    return [''.join(part) for part in _split(list(rule.prelude), ',')]
+
+
+def filter_css(css, keep, stray=True):
+    """Minified stylesheet keeping only the selectors keep(selector) accepts, plus [(selector, bytes saved)]
+
+    Rules that are not selector rules (@font-face, @keyframes, ...) are always kept.
+    stray=False also drops the rules that a stray '}' before them turns
+    into a prelude browsers ignore.
+    """
+    dropped = []
+    rules = _filter_rules(_parse(css), keep, dropped, stray)
+    return _render(rules), dropped
+
+
+def style_rules(css):
+    """Yield (selectors, declarations) for every selector rule, at any @media depth"""
+    def walk(rules):
+        for rule in rules:
+            if rule.children is not None:
+                if rule.purgeable:
+                    yield from walk(rule.children)
+            elif rule.purgeable and rule.body is not None and not rule.prelude.startswith('@'):
+                yield _selectors(rule), rule.body
+    yield from walk(_parse(css))
+
+
+def purge_css(css, usage, safelist=()):
+    """Minified stylesheet without unused selectors, plus [(selector, bytes saved)]"""
+    safelist = tuple(safelist)
+    return filter_css(css, lambda selector: selector_used(selector, usage, safelist))
@@ -0,0 +1,142 @@
+"""
+Class-based styling of the injected call-to-action blocks
+
+The CTA boxes, the phone box under the H1 and the homepage badges added
+by add-social-proof.py and fix-cta-improved.py only carry classes; their
+rules (CTA_CSS) are written once into the shared stylesheet by
+write_cta_css():
+
+    div.phone-cta            box under the H1 (its p and link)
+    p.cta-actions            the buttons row of a CTA box
+    a.btn.cta-call           the larger call button of the urgent box
+    p.cta-proof              the small rating line
+    div.social-proof-badges  homepage badges
+
+Earlier versions of those scripts wrote the same rules as style=""
+attributes on every page; migrate_inline_styles() turns that markup
+into the class-based one without touching anything else in the page.
+"""
+
+import re
+from pathlib import Path
+
+from sitetools.rewriter import HTMLRewriter
+from sitetools.site import ROOT_DIR
+
+__all__ = ['CTA_CSS', 'CTA_STYLESHEET', 'write_cta_css', 'migrate_inline_styles', 'has_inline_styles']
+
+CTA_STYLESHEET = ROOT_DIR / "assets" / "css" / "inline-fixes.css"
+
+# The phone box background is left out: styles.css forces it to white
+CTA_CSS = """.phone-cta{margin:14px 0;padding:12px;border-left:4px solid #7a1d52;border-radius:12px;}
+.phone-cta p{margin:0;font-size:14px;font-weight:600;}
+.phone-cta a{color:#7a1d52;font-weight:700;}
+.cta-actions{margin-top:12px;}
+.cta-actions .btn.secondary{margin-left:10px;}
+.btn.cta-call{font-size:16px;}
+.cta-proof{font-size:13px;opacity:.8;margin-top:8px;}
+.social-proof-badges{display:flex;gap:12px;flex-wrap:wrap;margin-top:12px;}
+.social-proof-badges .badge{font-weight:600;}
+"""
+
+_CSS_START = '/* CTA blocks (generated by sitetools/cta.py) */\n'
+_CSS_END = '/* End CTA blocks */\n'
+_CSS_BLOCK_RE = re.compile(re.escape(_CSS_START) + r'.*?' + re.escape(_CSS_END), re.S)
+
+# Block class -> {(tag, inline style of the old markup): class replacing it (None: the block rule covers it)}
+LEGACY_STYLES = {
+    'phone-cta': {
+        ('div', 'margin:14px 0; padding:12px; background:rgba(122,29,82,0.08); border-left:4px solid #7a1d52; border-radius:12px'): None,
+        ('p', 'margin:0; font-size:14px; font-weight:600'): None,
+        ('a', 'color:#7a1d52; font-weight:700'): None,
+    },
+    'cta-urgent': {
+        ('p', 'margin-top:12px'): 'cta-actions',
+        ('a', 'font-size:16px'): 'cta-call',
+        ('a', 'margin-left:10px'): None,
+        ('p', 'font-size:13px; opacity:0.8; margin-top:8px'): 'cta-proof',
+    },
+    'social-proof-badges': {
+        ('div', 'display:flex; gap:12px; flex-wrap:wrap; margin-top:12px'): None,
+        ('span', 'font-weight:600'): None,
+    },
+}
+LEGACY_STYLES['cta-standard'] = LEGACY_STYLES['cta-urgent']
+
+_STYLE_ATTR_RE = re.compile(r'''[\t\n\f\r ]+style[\t\n\f\r ]*=[\t\n\f\r ]*("[^"]*"|'[^']*'|[^\t\n\f\r >]+)''', re.I)
+_CLASS_ATTR_RE = re.compile(r'''(\sclass[\t\n\f\r ]*=[\t\n\f\r ]*)("([^"]*)"|'([^']*)'|([^\t\n\f\r >]+))''', re.I)
+
+
+def write_cta_css(path=CTA_STYLESHEET):
+    """Put CTA_CSS in the stylesheet (replacing an older copy); returns True if the file changed"""
+    path = Path(path)
+    css = path.read_text(encoding='utf-8')
+    block = _CSS_START + CTA_CSS + _CSS_END
+    if _CSS_BLOCK_RE.search(css):
+        updated = _CSS_BLOCK_RE.sub(lambda m: block, css, count=1)
+    else:
+        updated = css.rstrip('\n') + '\n\n' + block
+    if updated == css:
+        return False
+    path.write_text(updated, encoding='utf-8')
+    return True
+
+
+def _restyle(raw, add_class):
+    """Start tag raw without its style attribute, with add_class appended to its classes"""
+    raw = _STYLE_ATTR_RE.sub('', raw, count=1)
+    if add_class is None:
+        return raw
+    match = _CLASS_ATTR_RE.search(raw)
+    if match is None:
+        end = len(raw) - (2 if raw.endswith('/>') else 1)
+        return f'{raw[:end]} class="{add_class}"{raw[end:]}'
+    classes = next(g for g in match.groups()[2:] if g is not None)
+    return f'{raw[:match.start(1)]}{match.group(1)}"{classes} {add_class}"{raw[match.end():]}'
+
+
+def _classes(tag):
+    return (tag.attrs.get('class') or '').split()
+
+
+def has_inline_styles(text):
+    """Quick check: could text contain old-style CTA markup?"""
+    return 'style=' in text and any(name in text for name in LEGACY_STYLES)
+
+
+def migrate_inline_styles(text):
+    """Replace the inline styles of old CTA markup with the classes; returns (text, blocks migrated)"""
+    if not has_inline_styles(text):
+        return text, 0
+
+    rewriter = HTMLRewriter()
+    state = {'block': None, 'count': 0, 'changed': False}
+
+    def restyle(tag):
+        styles = LEGACY_STYLES[state['block']]
+        key = (tag.name, (tag.attrs.get('style') or '').strip())
+        if key in styles:
+            tag.replace(_restyle(tag.raw, styles[key]))
+            state['changed'] = True
+
+    def start(tag):
+        if state['block'] is None:
+            if tag.name == 'div':
+                block = next((c for c in _classes(tag) if c in LEGACY_STYLES), None)
+                if block is not None:
+                    state.update(block=block, changed=False)
+                    restyle(tag)
+            return
+        restyle(tag)
+
+    def div_end(tag):
+        # None of the blocks contains a nested <div>
+        if state['block'] is not None:
+            state['count'] += state['changed']
+            state['block'] = None
+
+    for name in ('div', 'p', 'a', 'span'):
+        rewriter.on_start_tag(name, start)
+    rewriter.on_end_tag('div', div_end)
+    text = rewriter.rewrite_string(text)
+    return text, state['count']
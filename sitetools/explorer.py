@@ -0,0 +1,144 @@
+"""
+Columnar data for the guide explorer
+
+The guide explorer in assets/js/main.js lists 12 guides per page,
+filtered by province and topic. Instead of the whole guides_<lang>.json
+it loads the files write_explorer_data() puts in assets/guides/:
+
+    index.json                    per language: number of guides and,
+                                  for every province and every topic,
+                                  its count and shard URL (provinces in
+                                  listing order)
+    <lang>-p-<slug>.<hash>.json   the guides of one province
+    <lang>-t-<slug>.<hash>.json   the guides of one topic
+
+so page 1 needs index.json and a single shard: the first province when
+nothing is filtered (the listing is the province shards one after the
+other), else the province or topic picked.
+
+Shards are columnar, with one string table shared by the columns:
+
+    {"count": 49,
+     "strings": ["/guide/palermo/...", "Architetto a Palermo: ...", ...],
+     "url": [0, 3, ...], "title": [1, 4, ...], "excerpt": [2, 2, ...], ...}
+
+so an excerpt, province or topic repeated across guides is stored once
+per shard. Like the search index, shards carry a hash of their content
+in the name and index.json keeps its stable name.
+"""
+
+import json
+import re
+from pathlib import Path
+
+from sitetools.assets import remove_unlisted, write_hashed_json
+from sitetools.search import fold, load_index
+from sitetools.site import ROOT_DIR
+
+__all__ = ['EXPLORER_DIR', 'EXPLORER_INDEX_PATH', 'EXPLORER_INDEX_URL', 'COLUMNS', 'columnar',
+           'build_explorer_data', 'write_explorer_data', 'load_explorer_index', 'explorer_files']
+
+EXPLORER_DIR = ROOT_DIR / "assets" / "guides"
+EXPLORER_INDEX_PATH = EXPLORER_DIR / "index.json"
+EXPLORER_URL = '/assets/guides/'
+EXPLORER_INDEX_URL = EXPLORER_URL + EXPLORER_INDEX_PATH.name
+
+# What a card shows; topic is categoryLabel, else category
+COLUMNS = ('url', 'title', 'excerpt', 'province', 'topic')
+
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _slug(name):
+    return _SLUG_RE.sub('-', fold(name)).strip('-') or 'none'
+
+
+def _row(record):
+    return {
+        'url': record['url'],
+        'title': record['title'],
+        'excerpt': record.get('excerpt') or '',
+        'province': record.get('province') or '',
+        'topic': record.get('categoryLabel') or record.get('category') or '',
+    }
+
+
+def columnar(rows):
+    """Shard for rows: one index list per column into a shared string table"""
+    strings = []
+    positions = {}
+    shard = {'count': len(rows), 'strings': strings}
+    for column in COLUMNS:
+        values = shard[column] = []
+        for row in rows:
+            value = row[column]
+            if value not in positions:
+                positions[value] = len(strings)
+                strings.append(value)
+            values.append(positions[value])
+    return shard
+
+
+def _groups(rows, key):
+    """{value: rows} in order of first appearance"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[key], []).append(row)
+    return groups
+
+
+def build_explorer_data(records, lang):
+    """(counts, {shard name: shard}) for the records of one language
+
+    counts is {'count': n, 'provinces': [(name, count, shard name)], 'topics': [...]}.
+    """
+    rows = [_row(record) for record in records]
+    counts = {'count': len(rows)}
+    shards = {}
+    for key, kind in (('province', 'p'), ('topic', 't')):
+        entries = counts[key + 's'] = []
+        for name, group in _groups(rows, key).items():
+            stem = f"{lang}-{kind}-{_slug(name)}"
+            shard_name, n = f"{stem}.json", 1
+            while shard_name in shards:
+                n += 1
+                shard_name = f"{stem}-{n}.json"
+            shards[shard_name] = columnar(group)
+            entries.append((name, len(group), shard_name))
+    return counts, shards
+
+
+def write_explorer_data(guides, directory=EXPLORER_DIR):
+    """Write the explorer files for {lang: records}; returns (index.json path, files written, stale files removed)
+
+    Shards of an earlier build that are no longer listed are deleted.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    index = {}
+    for lang, records in guides.items():
+        counts, shards = build_explorer_data(records, lang)
+        urls = {name: EXPLORER_URL + write_hashed_json(directory, name, shard) for name, shard in shards.items()}
+        index[lang] = {'count': counts['count']}
+        for key in ('provinces', 'topics'):
+            index[lang][key] = [{'name': name, 'count': count, 'url': urls[shard_name]}
+                                for name, count, shard_name in counts[key]]
+
+    index_path = directory / EXPLORER_INDEX_PATH.name
+    content = json.dumps(index, ensure_ascii=False, separators=(',', ':'), sort_keys=True) + '\n'
+    if not index_path.is_file() or index_path.read_text(encoding='utf-8') != content:
+        index_path.write_text(content, encoding='utf-8')
+
+    current = {index_path.name} | {url.rsplit('/', 1)[1] for url in explorer_files(index)}
+    return index_path, len(current), remove_unlisted(directory, current)
+
+
+def load_explorer_index(path=EXPLORER_INDEX_PATH):
+    """Contents of assets/guides/index.json, or {} before the first build"""
+    return load_index(path)
+
+
+def explorer_files(index):
+    """URLs of the content-hashed shards index.json points at"""
+    return [entry['url'] for data in index.values() for key in ('provinces', 'topics') for entry in data[key]]
@@ -0,0 +1,206 @@
+"""
+Guide records: guides_it.json and guides_en.json
+
+One record per published guide (title, shortTitle, excerpt, url,
+province, category, categoryLabel, image, lang). They are the only
+copy: build-guide-data.py derives from them the guide explorer shards
+(sitetools/explorer.py) and the search index (sitetools/search.py).
+
+The records are extracted from the live pages (extract_guide()):
+
+    title        <title> (else the last breadcrumb item)
+    shortTitle   title, cut to SHORT_TITLE_LENGTH with "..."
+    excerpt      the lede, cut to EXCERPT_LENGTH with "..."
+    province     name of the breadcrumb item linking to guide/<province>/,
+                 else the section's area (Sicilia, Sicily)
+    category, categoryLabel, image
+                 the section's defaults (GUIDE_SOURCES); a label or
+                 image set by hand in the JSON is kept
+
+The breadcrumb is read from the page's <div class="breadcrumb">, else
+from its BreadcrumbList JSON-LD.
+
+write_guides() serializes one record at a time, with the same bytes as
+json.dump(records, indent=2, ensure_ascii=False), and leaves the file
+untouched when nothing changed.
+"""
+
+import html
+import json
+import os
+import re
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from sitetools.site import LEDE_RE, ROOT_DIR, page_province, page_section
+
+__all__ = ['GUIDE_FILES', 'GUIDE_SOURCES', 'FIELDS', 'load_guides', 'guide_pages', 'guide_order',
+           'extract_guide', 'keep_fields', 'write_guides']
+
+# Language -> records file, in listing order (search results: Italian first)
+GUIDE_FILES = {'it': 'guides_it.json', 'en': 'guides_en.json'}
+
+# Language -> {section: defaults of its records}; index.html pages are not guides
+GUIDE_SOURCES = {
+    'it': {
+        'guide': {'category': 'guide', 'categoryLabel': 'Guide', 'province': 'Sicilia',
+                  'image': '/assets/images/hero/pratiche.svg'},
+        'sicilia': {'category': 'sicilia', 'categoryLabel': 'Sicilia', 'province': 'Sicilia',
+                    'image': '/assets/images/hero/verifiche.svg'},
+    },
+    'en': {
+        'en': {'category': 'guides', 'categoryLabel': 'Guides', 'province': 'Sicily',
+               'image': '/assets/images/hero/design.svg'},
+    },
+}
+
+# Fields a page does not carry: a value set by hand in the JSON wins over the default
+KEPT_FIELDS = ('categoryLabel', 'image')
+
+# Listing order of the provinces (as on the site and in assets/data/provinces.json)
+PROVINCE_ORDER = ('palermo', 'catania', 'messina', 'siracusa', 'ragusa', 'trapani', 'agrigento', 'enna',
+                  'caltanissetta')
+
+SHORT_TITLE_LENGTH = 70
+EXCERPT_LENGTH = 160
+
+FIELDS = ('title', 'shortTitle', 'excerpt', 'url', 'province', 'category', 'categoryLabel', 'image', 'lang')
+
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+_BREADCRUMB_RE = re.compile(r'<div class="breadcrumb">(.*?)</div>', re.S)
+_BREADCRUMB_ITEM_RE = re.compile(r'<a\b[^>]*?href="?([^" >]*)"?[^>]*>(.*?)</a>|<span>(.*?)</span>', re.S)
+_JSON_LD_RE = re.compile(r'<script\b[^>]*type="?application/ld\+json"?[^>]*>(.*?)</script>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def load_guides(lang, root=ROOT_DIR):
+    """Records of guides_<lang>.json that have a title and a URL, each with its lang; [] without the file"""
+    path = Path(root) / GUIDE_FILES[lang]
+    if not path.is_file():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        return []
+    return [{**item, 'lang': lang} for item in data
+            if isinstance(item, dict) and item.get('title') and item.get('url')]
+
+
+def guide_order(filepath, root=ROOT_DIR):
+    """Sort key of a guide page within its section: province in listing order, then file name"""
+    province = page_province(filepath, root)
+    rank = PROVINCE_ORDER.index(province) if province in PROVINCE_ORDER else len(PROVINCE_ORDER)
+    return rank, Path(filepath).name
+
+
+def guide_pages(catalogue, lang):
+    """Guide pages of one language from a refreshed Catalogue, in listing order"""
+    pages = []
+    for section in GUIDE_SOURCES[lang]:
+        found = [p for p in catalogue.pages((section,)) if p.name != 'index.html']
+        pages += sorted(found, key=lambda p: guide_order(p, catalogue.root))
+    return pages
+
+
+def _text(markup):
+    return _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub('', markup))).strip()
+
+
+def _clip(text, length):
+    return text if len(text) <= length else text[:length - 3].rstrip() + '...'
+
+
+def _json_ld(page):
+    """Every JSON-LD object of a page (lists flattened, invalid blocks skipped)"""
+    for block in _JSON_LD_RE.findall(page):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        yield from (data if isinstance(data, list) else [data])
+
+
+def _breadcrumb(page):
+    """[(url or None, name)] of the page's breadcrumb"""
+    match = _BREADCRUMB_RE.search(page)
+    if match:
+        return [(href if href else None, _text(a_text if href else span))
+                for href, a_text, span in _BREADCRUMB_ITEM_RE.findall(match.group(1))]
+    for data in _json_ld(page):
+        if isinstance(data, dict) and data.get('@type') == 'BreadcrumbList':
+            items = sorted(data.get('itemListElement') or [], key=lambda item: item.get('position', 0))
+            return [(item.get('item'), item.get('name') or '') for item in items]
+    return []
+
+
+def extract_guide(filepath, root=ROOT_DIR):
+    """Record of one guide page (runs in worker processes with --jobs)"""
+    filepath = Path(filepath)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        page = f.read()
+
+    section = page_section(filepath, root)
+    lang = next(lang for lang, sections in GUIDE_SOURCES.items() if section in sections)
+    defaults = GUIDE_SOURCES[lang][section]
+    crumbs = _breadcrumb(page)
+
+    match = _TITLE_RE.search(page)
+    title = _text(match.group(1)) if match else ''
+    if not title and crumbs:
+        title = crumbs[-1][1]
+    match = LEDE_RE.search(page)
+    excerpt = _text(match.group(1)) if match else ''
+
+    record = {**defaults, 'title': title, 'shortTitle': _clip(title, SHORT_TITLE_LENGTH),
+              'excerpt': _clip(excerpt, EXCERPT_LENGTH),
+              'url': '/' + filepath.relative_to(root).as_posix(), 'lang': lang}
+
+    # Home › Guide › <province> › page: the province as the site names it
+    province = page_province(filepath, root)
+    for url, name in crumbs[1:-1]:
+        if province and name and [p for p in urlsplit(url or '').path.split('/') if p] == [section, province]:
+            record['province'] = name
+
+    return {field: record[field] for field in FIELDS}
+
+
+def keep_fields(record, previous):
+    """record with the KEPT_FIELDS values previous (its current JSON entry) set by hand"""
+    if not previous:
+        return record
+    kept = {field: previous[field] for field in KEPT_FIELDS if previous.get(field)}
+    return {**record, **kept}
+
+
+def write_guides(path, records):
+    """Write records (any iterable) to path one at a time; returns True if the file changed
+
+    The output is byte-identical to json.dump(list(records), f, indent=2,
+    ensure_ascii=False), and an unchanged file keeps its mtime.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        separator = '[\n  '
+        for record in records:
+            f.write(separator)
+            f.write(json.dumps(record, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+            separator = ',\n  '
+        f.write('[]' if separator == '[\n  ' else '\n]')
+
+    if path.is_file() and _same_bytes(path, tmp_path):
+        tmp_path.unlink()
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def _same_bytes(a, b):
+    if a.stat().st_size != b.stat().st_size:
+        return False
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        for block in iter(lambda: fa.read(1 << 16), b''):
+            if block != fb.read(len(block)):
+                return False
+    return True
@@ -0,0 +1,219 @@
+"""
+Conservative HTML minifier
+
+    minified = minify_html(page)
+
+What it does:
+- collapses runs of whitespace in text to one space, and drops
+  whitespace next to block-level tags and inside <head>, where browsers
+  do not render it
+- drops comments, except the Google Tag Manager markers and
+  conditional comments
+- rewrites tags with single spaces between attributes, without the
+  quotes a value does not need, without the value of empty attributes
+  (defer="" -> defer) and without the '/' of void elements
+- minifies JSON-LD through a json round-trip and <style> blocks with
+  sitetools/cssmin.py
+- omits </body> and </html> at the end of the document
+
+What it never touches: the content of <pre>, <textarea> and every other
+<script>, and tags inside <svg>/<math> (self-closing syntax matters
+there). class values keep their quotes because the text fixers find
+their hooks by them (<p class="lede">, <div class="notice">).
+
+Other optional end tags (</p>, </li>, </td>, ...) are only omitted with
+omit_end_tags=True: html.parser, the default backend of the soup fixers,
+nests instead of closing them (<p>a<p>b -> <p>a<p>b</p></p>), so pages
+minified that way must only be re-parsed with lxml or html5lib.
+"""
+
+import json
+import re
+
+from sitetools.cssmin import minify_css
+
+__all__ = ['minify_html']
+
+_TOKEN_RE = re.compile(r'''
+    (?P<comment><!--.*?(?:-->|\Z))
+  | (?P<decl><![^>]*>?)
+  | (?P<end></(?P<end_name>[A-Za-z][^\t\n\f\r />]*)[^>]*>)
+  | (?P<start><(?P<name>[A-Za-z][^\t\n\f\r />]*)(?P<attrs>(?:[^>"']|"[^"]*"|'[^']*')*)>)
+  | (?P<text>[^<]+|<)
+''', re.S | re.X)
+
+_ATTR_RE = re.compile(r'''([^\t\n\f\r />=][^\t\n\f\r />=]*)(?:[\t\n\f\r ]*=[\t\n\f\r ]*("[^"]*"|'[^']*'|[^\t\n\f\r >]+))?''')
+_SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+# A value that can go without quotes (and cannot be mistaken for '/>')
+_UNQUOTED_RE = re.compile(r'''^[^ \t\n\r\f"'=<>`]*[^ \t\n\r\f"'=<>`/]$''')
+
+RAW_TEXT_ELEMENTS = {'script', 'style', 'textarea', 'title', 'xmp', 'iframe', 'noembed', 'noframes', 'plaintext'}
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                 'source', 'track', 'wbr'}
+FOREIGN_ELEMENTS = {'svg', 'math'}
+
+# Whitespace next to these tags is not rendered
+BLOCK_ELEMENTS = {
+    'html', 'head', 'body', 'title', 'meta', 'link', 'base',
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'colgroup', 'dd', 'details', 'dialog',
+    'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hgroup', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary',
+    'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+
+# Comments that must survive (tag manager markers, IE conditionals)
+KEEP_COMMENT_RE = re.compile(r'^<!--(\s*(End )?Google Tag Manager|\[if|<!\[endif)')
+
+# Attributes whose values keep their quotes (see module docstring)
+KEEP_QUOTED_ATTRIBUTES = {'class'}
+
+# End tag -> what may follow it when it is omitted (start tags, '/'+end tags)
+OPTIONAL_END_TAGS = {
+    'li': {'li', '/ul', '/ol', '/menu'},
+    'dt': {'dt', 'dd'},
+    'dd': {'dt', 'dd', '/dl'},
+    'p': {'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'fieldset', 'figcaption',
+          'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main',
+          'menu', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul',
+          '/div', '/section', '/article', '/aside', '/main', '/header', '/footer', '/nav', '/li', '/td',
+          '/th', '/blockquote', '/form', '/details', '/figure', '/body'},
+    'td': {'td', 'th', '/tr', '/tbody', '/table'},
+    'th': {'td', 'th', '/tr', '/tbody', '/table'},
+    'tr': {'tr', '/tbody', '/thead', '/tfoot', '/table'},
+    'option': {'option', 'optgroup', '/select', '/optgroup'},
+}
+
+
+class _Token:
+    __slots__ = ('kind', 'name', 'text')
+
+    def __init__(self, kind, text, name=None):
+        self.kind = kind        # 'start', 'end', 'text', 'raw' (kept as is)
+        self.name = name
+        self.text = text
+
+
+def _minify_attrs(attrs):
+    out = []
+    for match in _ATTR_RE.finditer(attrs):
+        name, value = match.group(1), match.group(2)
+        if value is None:
+            out.append(name)
+            continue
+        if value[0] in '"\'':
+            inner = value[1:-1]
+        else:
+            inner = value
+        if inner == '':
+            out.append(name)
+        elif _UNQUOTED_RE.match(inner) and name.lower() not in KEEP_QUOTED_ATTRIBUTES:
+            out.append(f"{name}={inner}")
+        elif '"' in inner:
+            out.append(f"{name}='{inner}'")
+        else:
+            out.append(f'{name}="{inner}"')
+    return out
+
+
+def _minify_raw(name, attrs, content):
+    """Content of a raw-text element: JSON-LD and CSS are minified, the rest is kept"""
+    if name == 'style':
+        return minify_css(content)
+    if name == 'script' and re.search(r'''\btype\s*=\s*["']?application/ld\+json''', attrs, re.I):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return content
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return content
+
+
+def _tokenize(html):
+    """Tokens with raw-text content, <pre> content and foreign tags already final"""
+    tokens = []
+    pos = 0
+    pre = foreign = 0
+    while pos < len(html):
+        match = _TOKEN_RE.match(html, pos)
+        kind = next(k for k in ('comment', 'decl', 'end', 'start', 'text') if match.group(k) is not None)
+        text = match.group()
+        pos = match.end()
+
+        if kind == 'comment':
+            if KEEP_COMMENT_RE.match(text):
+                tokens.append(_Token('raw', text))
+        elif kind == 'decl':
+            tokens.append(_Token('raw', text))
+        elif kind == 'text':
+            tokens.append(_Token('raw' if pre else 'text', text))
+        elif kind == 'end':
+            name = match.group('end_name').lower()
+            if name in FOREIGN_ELEMENTS:
+                foreign = max(0, foreign - 1)
+            if name == 'pre':
+                pre = max(0, pre - 1)
+            tokens.append(_Token('end', f"</{match.group('end_name')}>", name))
+        else:
+            name = match.group('name').lower()
+            attrs = match.group('attrs')
+            self_closing = attrs.rstrip().endswith('/')
+            if foreign or name in FOREIGN_ELEMENTS:
+                tokens.append(_Token('start', text, name))
+                if name in FOREIGN_ELEMENTS and not self_closing:
+                    foreign += 1
+                continue
+            tag = '<' + ' '.join([match.group('name')] + _minify_attrs(attrs.rstrip().rstrip('/') if self_closing else attrs))
+            if self_closing and name not in VOID_ELEMENTS:
+                tag += '/'
+            tokens.append(_Token('start', tag + '>', name))
+            if name == 'pre':
+                pre += 1
+            if name in RAW_TEXT_ELEMENTS:
+                end = re.compile(r'</' + re.escape(name) + r'[\t\n\f\r />]', re.I).search(html, pos)
+                stop = end.start() if end else len(html)
+                content = html[pos:stop]
+                tokens.append(_Token('raw', _minify_raw(name, attrs, content) if not pre else content))
+                pos = stop
+    return tokens
+
+
+def _is_block(token):
+    return token is not None and token.kind in ('start', 'end') and token.name in BLOCK_ELEMENTS
+
+
+def minify_html(html, omit_end_tags=False):
+    """Minified page (see the module docstring for what changes)"""
+    tokens = _tokenize(html)
+
+    # Whitespace: collapse, then drop it where it is not rendered
+    in_head = False
+    kept = []
+    for i, token in enumerate(tokens):
+        if token.name == 'head' or token.name == 'body':
+            in_head = token.kind == 'start' and token.name == 'head'
+        if token.kind == 'text':
+            text = _SPACE_RE.sub(' ', token.text)
+            prev = kept[-1] if kept else None
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if in_head or prev is None or _is_block(prev) or (prev.kind == 'raw' and prev.text.startswith('<!')):
+                text = text.lstrip(' ')
+            if following is None or _is_block(following):
+                text = text.rstrip(' ')
+            if not text:
+                continue
+            token.text = text
+        kept.append(token)
+
+    out = []
+    for i, token in enumerate(kept):
+        if token.kind == 'end':
+            rest = kept[i + 1:]
+            following = rest[0] if rest else None
+            if token.name in ('body', 'html') and all(t.kind == 'end' and t.name in ('body', 'html') for t in rest):
+                continue
+            if omit_end_tags and token.name in OPTIONAL_END_TAGS and following is not None:
+                key = following.name if following.kind == 'start' else '/' + (following.name or '')
+                if following.kind in ('start', 'end') and key in OPTIONAL_END_TAGS[token.name]:
+                    continue
+        out.append(token.text)
+    return ''.join(out)
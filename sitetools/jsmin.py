@@ -0,0 +1,1262 @@
+"""
+JavaScript minifier for the asset step
+
+A regex pass cannot minify JavaScript safely: '//' inside a URL string
+is not a comment, whitespace inside string and template literals is
+content, and '/' may start a regex literal or be a division. This
+module parses the script instead (a small recursive-descent parser for
+ES2020 classic scripts, no modules), so every token is known:
+
+- comments and whitespace are dropped; '/*! ... */' comments are kept
+- strings, template literals, regex literals and numbers are copied
+  exactly as written
+- where the source relied on automatic semicolon insertion, an explicit
+  ';' is written, so the output needs no line breaks
+- local bindings (parameters, var/let/const, functions and classes
+  declared inside functions or blocks) get short names, scope by scope;
+  globals, property names and anything in reach of eval/with keep theirs
+
+    minified = minify_js(source)
+    minified = minify_js(source, mangle=False)
+
+check_equivalent(source, minified) parses both again and compares them
+token by token, with each name replaced by the binding it resolves to.
+It fails on any change of meaning the parser can see: a renamed name
+captured by another binding, a dropped line break that mattered, a
+literal that changed.
+"""
+
+import re
+import unicodedata
+
+__all__ = ['JSSyntaxError', 'minify_js', 'check_equivalent', 'parse']
+
+
+class JSSyntaxError(ValueError):
+    """The script uses syntax this parser does not understand (or is invalid)"""
+
+
+# Reserved words: never identifiers
+KEYWORDS = frozenset("""
+break case catch class const continue debugger default delete do else enum export extends
+false finally for function if import in instanceof new null return super switch this throw
+true try typeof var void while with
+""".split())
+
+# Never generated as a short name, even where the language would allow it
+_AVOID_NAMES = KEYWORDS | frozenset("""
+let static yield await async of get set implements interface package private protected
+public arguments eval undefined NaN Infinity
+""".split())
+
+# After these names an expression may start (so '/' begins a regex)
+_EXPR_BEFORE_NAMES = frozenset("""
+return typeof instanceof in of new delete void throw case do else yield await extends
+""".split())
+
+_PUNCTUATORS = sorted("""
+>>>= ... === !== **= <<= >>= >>> &&= ||= ??= => == != <= >= && || ?? ?. ++ -- += -= *= %= &= |= ^=
+** << >> { } ( ) [ ] ; , < > + - * % & | ^ ! ~ ? : = . @
+""".split(), key=len, reverse=True)
+
+_ASSIGN_OPS = frozenset('= += -= *= /= %= **= <<= >>= >>>= &= |= ^= &&= ||= ??='.split())
+_BINARY_OPS = frozenset('?? || && | ^ & == != === !== < > <= >= << >> >>> + - * / % **'.split())
+_BINARY_NAMES = frozenset(('in', 'instanceof'))
+_UNARY_OPS = frozenset('! ~ + - ++ --'.split())
+_UNARY_NAMES = frozenset(('typeof', 'void', 'delete'))
+
+_LINE_TERMINATORS = '\n\r  '
+_NUMBER_RE = re.compile(r'''
+    0[xX][0-9a-fA-F_]+n? | 0[oO][0-7_]+n? | 0[bB][01_]+n?
+  | [0-9][0-9_]*n
+  | (?: [0-9][0-9_]*(?:\.[0-9_]*)? | \.[0-9][0-9_]* ) (?:[eE][+-]?[0-9][0-9_]*)?
+''', re.VERBOSE)
+_NAME_RE = re.compile(r'(?:[^\W\d]|[$]|\\u[0-9a-fA-F]{4}|\\u\{[0-9a-fA-F]+\})'
+                      r'(?:[\w$‌‍]|\\u[0-9a-fA-F]{4}|\\u\{[0-9a-fA-F]+\})*')
+_REGEX_FLAGS_RE = re.compile(r'[\w$]*')
+
+
+def _is_space(ch):
+    return ch in ' \t\v\f ﻿' or (ch > '\x7f' and unicodedata.category(ch) == 'Zs')
+
+
+class Token:
+    __slots__ = ('type', 'value', 'start', 'end', 'nl_before', 'comments', 'tail',
+                 'binding', 'shorthand', 'scope', 'is_property')
+
+    def __init__(self, type_, value, start, end, nl_before, comments=None, tail=False):
+        self.type = type_           # name num string template regex punct private eof
+        self.value = value
+        self.start = start
+        self.end = end
+        self.nl_before = nl_before  # a line terminator precedes the token
+        self.comments = comments    # kept /*! */ comments before the token
+        self.tail = tail            # template token that closes the literal
+        self.binding = None         # Binding the name declares or refers to
+        self.shorthand = False      # {name} in an object literal or pattern
+        self.scope = None           # scope a reference was made from
+        self.is_property = False    # property or member name, never renamed
+
+    def is_punct(self, value):
+        return self.type == 'punct' and self.value == value
+
+    def is_name(self, value):
+        return self.type == 'name' and self.value == value
+
+    def __repr__(self):
+        return f"Token({self.type}, {self.value!r}, {self.start})"
+
+
+class Lexer:
+    """Produces one token at a time; the parser says whether '/' may start a regex"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        if text.startswith('#!'):
+            end = self._line_end(0)
+            self.hashbang = text[:end]
+            self.pos = end
+        else:
+            self.hashbang = None
+
+    def error(self, message, pos=None):
+        pos = self.pos if pos is None else pos
+        line = self.text.count('\n', 0, pos) + 1
+        column = pos - (self.text.rfind('\n', 0, pos) + 1) + 1
+        return JSSyntaxError(f"{message} at line {line}, column {column}")
+
+    def _line_end(self, pos):
+        ends = [i for i in (self.text.find(c, pos) for c in _LINE_TERMINATORS) if i != -1]
+        return min(ends) if ends else len(self.text)
+
+    def _skip(self):
+        """Skip whitespace and comments; returns (saw a line terminator, kept comments)"""
+        text = self.text
+        n = len(text)
+        nl = False
+        comments = None
+        while self.pos < n:
+            ch = text[self.pos]
+            if ch in _LINE_TERMINATORS:
+                nl = True
+                self.pos += 1
+            elif _is_space(ch):
+                self.pos += 1
+            elif text.startswith('//', self.pos):
+                self.pos = self._line_end(self.pos)
+            elif text.startswith('/*', self.pos):
+                end = text.find('*/', self.pos + 2)
+                if end == -1:
+                    raise self.error("Unterminated comment")
+                body = text[self.pos:end + 2]
+                if any(c in body for c in _LINE_TERMINATORS):
+                    nl = True
+                if body.startswith('/*!'):
+                    comments = (comments or []) + [body]
+                self.pos = end + 2
+            else:
+                break
+        return nl, comments
+
+    def next(self, expr_allowed):
+        nl, comments = self._skip()
+        text = self.text
+        start = self.pos
+        if start >= len(text):
+            return Token('eof', '', start, start, True, comments)
+
+        ch = text[start]
+        if ch in '\'"':
+            end = self._scan_string(start)
+            return self._token('string', start, end, nl, comments)
+        if ch == '`':
+            end, tail = self._scan_template(start + 1)
+            return self._token('template', start, end, nl, comments, tail)
+        if ch.isdigit() or (ch == '.' and text[start + 1:start + 2].isdigit()):
+            match = _NUMBER_RE.match(text, start)
+            return self._token('num', start, match.end(), nl, comments)
+        if ch == '#':
+            match = _NAME_RE.match(text, start + 1)
+            if not match:
+                raise self.error("Unexpected '#'")
+            return self._token('private', start, match.end(), nl, comments)
+        match = _NAME_RE.match(text, start)
+        if match:
+            return self._token('name', start, match.end(), nl, comments)
+        if ch == '/':
+            if expr_allowed:
+                end = self._scan_regex(start)
+                return self._token('regex', start, end, nl, comments)
+            end = start + (2 if text.startswith('/=', start) else 1)
+            return self._token('punct', start, end, nl, comments)
+        for punct in _PUNCTUATORS:
+            if text.startswith(punct, start):
+                # '?.5' is '?' followed by the number .5
+                if punct == '?.' and text[start + 2:start + 3].isdigit():
+                    continue
+                return self._token('punct', start, start + len(punct), nl, comments)
+        raise self.error(f"Unexpected character {ch!r}")
+
+    def _token(self, type_, start, end, nl, comments, tail=False):
+        self.pos = end
+        return Token(type_, self.text[start:end], start, end, nl, comments, tail)
+
+    def _scan_string(self, start):
+        text = self.text
+        quote = text[start]
+        i = start + 1
+        while i < len(text):
+            ch = text[i]
+            if ch == '\\':
+                i += 3 if text.startswith('\r\n', i + 1) else 2
+                continue
+            if ch == quote:
+                return i + 1
+            if ch in '\n\r':
+                break
+            i += 1
+        raise self.error("Unterminated string", start)
+
+    def _scan_template(self, i):
+        """Scan template characters from i; returns (end, closes the literal)"""
+        text = self.text
+        while i < len(text):
+            ch = text[i]
+            if ch == '\\':
+                i += 2
+            elif ch == '`':
+                return i + 1, True
+            elif ch == '$' and text.startswith('${', i):
+                return i + 2, False
+            else:
+                i += 1
+        raise self.error("Unterminated template literal")
+
+    def template_continuation(self, brace):
+        """Re-scan from the '}' that closes a ${...} substitution"""
+        self.pos = brace.start
+        end, tail = self._scan_template(brace.start + 1)
+        return self._token('template', brace.start, end, False, brace.comments, tail)
+
+    def _scan_regex(self, start):
+        text = self.text
+        i = start + 1
+        in_class = False
+        while i < len(text):
+            ch = text[i]
+            if ch in _LINE_TERMINATORS:
+                break
+            if ch == '\\':
+                i += 2
+                continue
+            if ch == '[':
+                in_class = True
+            elif ch == ']':
+                in_class = False
+            elif ch == '/' and not in_class:
+                return _REGEX_FLAGS_RE.match(text, i + 1).end()
+            i += 1
+        raise self.error("Unterminated regular expression", start)
+
+
+class Binding:
+    __slots__ = ('name', 'scope', 'tokens', 'pinned', 'new_name', 'order')
+
+    def __init__(self, name, scope, order):
+        self.name = name
+        self.scope = scope
+        self.tokens = []
+        self.pinned = '\\' in name      # escaped names are left alone
+        self.new_name = None
+        self.order = order
+
+
+class Scope:
+    __slots__ = ('parent', 'kind', 'bindings', 'children', 'unsafe', 'outer')
+
+    def __init__(self, parent, kind):
+        self.parent = parent
+        self.kind = kind                # 'global', 'function' or 'block'
+        self.bindings = {}
+        self.children = []
+        self.unsafe = False             # direct eval or with: keep every name
+        self.outer = set()              # names used inside that resolve further out
+
+    def function_scope(self):
+        scope = self
+        while scope.kind == 'block':
+            scope = scope.parent
+        return scope
+
+
+class _Backtrack(Exception):
+    pass
+
+
+class Parser:
+    """Recursive-descent parser that records tokens, scopes and ASI points"""
+
+    def __init__(self, text):
+        self.lexer = Lexer(text)
+        self.tokens = []
+        self.asi = set()                # token indexes a ';' was inserted before
+        self.global_scope = Scope(None, 'global')
+        self.scope = self.global_scope
+        self.refs = []                  # (token, scope, is direct eval call)
+        self.in_async = False
+        self.in_generator = False
+        self._binding_order = 0
+        self.tok = self.lexer.next(True)
+
+    # -- token plumbing --------------------------------------------------
+
+    def error(self, message=None, tok=None):
+        tok = tok or self.tok
+        if message is None:
+            message = "Unexpected end of input" if tok.type == 'eof' else f"Unexpected {tok.value!r}"
+        return self.lexer.error(message, tok.start)
+
+    def next(self, expr_allowed=None):
+        """Consume the current token; expr_allowed says how to read a '/' after it"""
+        tok = self.tok
+        if tok.type == 'eof':
+            raise self.error()
+        self.tokens.append(tok)
+        if expr_allowed is None:
+            if tok.type == 'punct':
+                expr_allowed = tok.value not in (')', ']', '}')
+            elif tok.type == 'name':
+                expr_allowed = tok.value in _EXPR_BEFORE_NAMES
+            else:
+                expr_allowed = False
+        self.tok = self.lexer.next(expr_allowed)
+        return tok
+
+    def expect(self, value, expr_allowed=None):
+        if not self.tok.is_punct(value):
+            raise self.error(f"Expected {value!r}, found {self.tok.value or 'end of input'!r}")
+        return self.next(expr_allowed)
+
+    def eat(self, value, expr_allowed=None):
+        if self.tok.is_punct(value):
+            self.next(expr_allowed)
+            return True
+        return False
+
+    def peek(self):
+        saved = self.lexer.pos
+        tok = self.lexer.next(False)
+        self.lexer.pos = saved
+        return tok
+
+    def save(self):
+        return (self.lexer.pos, self.tok, len(self.tokens), set(self.asi), len(self.refs),
+                self.scope, len(self.scope.children), self._binding_order)
+
+    def restore(self, state):
+        pos, tok, ntokens, asi, nrefs, scope, nchildren, order = state
+        self.lexer.pos = pos
+        self.tok = tok
+        del self.tokens[ntokens:]
+        self.asi = asi
+        del self.refs[nrefs:]
+        self.scope = scope
+        del scope.children[nchildren:]
+        self._binding_order = order
+
+    def semicolon(self):
+        if self.tok.is_punct(';'):
+            self.next(True)
+        elif self.tok.is_punct('}') or self.tok.type == 'eof' or self.tok.nl_before:
+            self.asi.add(len(self.tokens))
+        else:
+            raise self.error()
+
+    # -- scopes ----------------------------------------------------------
+
+    def push_scope(self, kind):
+        scope = Scope(self.scope, kind)
+        self.scope.children.append(scope)
+        self.scope = scope
+        return scope
+
+    def pop_scope(self):
+        self.scope = self.scope.parent
+
+    def declare(self, tok, scope, pinned=False):
+        binding = scope.bindings.get(tok.value)
+        if binding is None:
+            binding = Binding(tok.value, scope, self._binding_order)
+            self._binding_order += 1
+            scope.bindings[tok.value] = binding
+        binding.tokens.append(tok)
+        binding.pinned = binding.pinned or pinned
+        tok.binding = binding
+        tok.scope = self.scope          # a var declared in a block is used from the block
+
+    def declare_binding(self, tok, kind):
+        if kind == 'var':
+            self.declare(tok, self.scope.function_scope())
+        else:
+            self.declare(tok, self.scope)
+
+    def reference(self, tok):
+        tok.scope = self.scope
+        self.refs.append(tok)
+
+    def binding_name(self):
+        tok = self.tok
+        if tok.type != 'name' or tok.value in KEYWORDS:
+            raise self.error()
+        return tok
+
+    # -- statements ------------------------------------------------------
+
+    def parse_program(self):
+        while self.tok.type != 'eof':
+            self.parse_statement()
+        self.tokens.append(self.tok)
+        return self
+
+    def parse_statement(self):
+        tok = self.tok
+        if tok.type == 'punct':
+            if tok.value == '{':
+                self.push_scope('block')
+                self.parse_block_body()
+                self.pop_scope()
+                return
+            if tok.value == ';':
+                self.next(True)
+                return
+        elif tok.type == 'name':
+            handler = getattr(self, 'stmt_' + tok.value, None) if tok.value.isalpha() else None
+            if handler is not None and handler():
+                return
+            if tok.value not in KEYWORDS and self.peek().is_punct(':'):
+                tok.is_property = True      # label: its own namespace
+                self.next(False)
+                self.next(True)
+                self.parse_statement()
+                return
+        self.parse_expression()
+        self.semicolon()
+
+    def parse_block_body(self, expr_allowed_after=True):
+        """'{' statements '}' in the current scope"""
+        self.expect('{', True)
+        while not self.tok.is_punct('}'):
+            if self.tok.type == 'eof':
+                raise self.error()
+            self.parse_statement()
+        self.next(expr_allowed_after)
+
+    def stmt_var(self):
+        self.parse_declarations('var')
+        self.semicolon()
+        return True
+
+    def stmt_const(self):
+        self.parse_declarations('const')
+        self.semicolon()
+        return True
+
+    def stmt_let(self):
+        after = self.peek()
+        if after.type == 'name' and after.value not in KEYWORDS or after.is_punct('[') or after.is_punct('{'):
+            self.parse_declarations('let')
+            self.semicolon()
+            return True
+        return False
+
+    def parse_declarations(self, kind, no_in=False):
+        self.next(False)
+        while True:
+            self.parse_binding_target(kind)
+            if self.eat('=', True):
+                self.parse_assignment(no_in)
+            if not self.eat(',', True):
+                return
+
+    def parse_binding_target(self, kind):
+        tok = self.tok
+        if tok.is_punct('['):
+            self.next(True)
+            while not self.tok.is_punct(']'):
+                if self.eat(',', True):
+                    continue
+                self.eat('...', True)
+                self.parse_binding_element(kind)
+                if not self.tok.is_punct(']'):
+                    self.expect(',', True)
+            self.next(False)
+        elif tok.is_punct('{'):
+            self.next(True)
+            while not self.tok.is_punct('}'):
+                if self.eat('...', True):
+                    self.parse_binding_target(kind)
+                else:
+                    key = self.tok
+                    if self.parse_property_key():
+                        self.expect(':', True)
+                        self.parse_binding_element(kind)
+                    else:
+                        if key.type != 'name' or key.value in KEYWORDS:
+                            raise self.error(tok=key)
+                        key.is_property = False
+                        key.shorthand = True
+                        self.declare_binding(key, kind)
+                        if self.eat('=', True):
+                            self.parse_assignment()
+                if not self.tok.is_punct('}'):
+                    self.expect(',', True)
+            self.next(False)
+        else:
+            self.declare_binding(self.binding_name(), kind)
+            self.next(False)
+
+    def parse_binding_element(self, kind):
+        self.parse_binding_target(kind)
+        if self.eat('=', True):
+            self.parse_assignment()
+
+    def parse_property_key(self):
+        """Consume a property name; True if followed by more than a shorthand"""
+        tok = self.tok
+        if tok.is_punct('['):
+            self.next(True)
+            self.parse_assignment()
+            self.expect(']', False)
+            return True
+        if tok.type in ('name', 'string', 'num', 'private'):
+            tok.is_property = True
+            self.next(False)
+            return tok.type != 'name' or not (self.tok.is_punct(',') or self.tok.is_punct('}')
+                                              or self.tok.is_punct('='))
+        raise self.error()
+
+    def stmt_function(self):
+        self.parse_function(statement=True)
+        return True
+
+    def stmt_async(self):
+        after = self.peek()
+        if after.is_name('function') and not after.nl_before:
+            self.next(False)
+            self.parse_function(statement=True, is_async=True)
+            return True
+        return False
+
+    def stmt_class(self):
+        self.parse_class(statement=True)
+        return True
+
+    def stmt_if(self):
+        self.next(False)
+        self.parse_paren_head()
+        self.parse_statement()
+        if self.tok.is_name('else'):
+            self.next(True)
+            self.parse_statement()
+        return True
+
+    def parse_paren_head(self):
+        """'(' expression ')' of if/while/with/switch: a statement follows"""
+        self.expect('(', True)
+        self.parse_expression()
+        self.expect(')', True)
+
+    def stmt_while(self):
+        self.next(False)
+        self.parse_paren_head()
+        self.parse_statement()
+        return True
+
+    def stmt_do(self):
+        self.next(True)
+        self.parse_statement()
+        if not self.tok.is_name('while'):
+            raise self.error()
+        self.next(False)
+        self.parse_paren_head()
+        # The ';' after do-while is optional even on the same line
+        if not self.eat(';', True):
+            self.asi.add(len(self.tokens))
+        return True
+
+    def stmt_for(self):
+        self.next(False)
+        if self.tok.is_name('await'):
+            self.next(False)
+        self.expect('(', True)
+        self.push_scope('block')
+        tok = self.tok
+        if tok.is_punct(';'):
+            pass
+        elif tok.is_name('var') or tok.is_name('const') or (tok.is_name('let') and self._let_in_for_head()):
+            self.parse_declarations(tok.value, no_in=True)
+        else:
+            self.parse_expression(no_in=True)
+
+        if self.tok.is_name('of') or self.tok.is_name('in'):
+            self.next(True)
+            self.parse_assignment() if self.tokens[-1].value == 'of' else self.parse_expression()
+        else:
+            self.expect(';', True)
+            if not self.tok.is_punct(';'):
+                self.parse_expression()
+            self.expect(';', True)
+            if not self.tok.is_punct(')'):
+                self.parse_expression()
+        self.expect(')', True)
+        self.parse_statement()
+        self.pop_scope()
+        return True
+
+    def _let_in_for_head(self):
+        after = self.peek()
+        return after.type == 'name' and after.value not in ('in', 'of') or after.is_punct('[') or after.is_punct('{')
+
+    def stmt_return(self):
+        self.next(True)
+        if not (self.tok.is_punct(';') or self.tok.is_punct('}') or self.tok.type == 'eof' or self.tok.nl_before):
+            self.parse_expression()
+        self.semicolon()
+        return True
+
+    def stmt_break(self):
+        self.next(False)
+        if self.tok.type == 'name' and not self.tok.nl_before and self.tok.value not in KEYWORDS:
+            self.tok.is_property = True
+            self.next(False)
+        self.semicolon()
+        return True
+
+    stmt_continue = stmt_break
+
+    def stmt_throw(self):
+        self.next(True)
+        if self.tok.nl_before:
+            raise self.error("Line break after throw")
+        self.parse_expression()
+        self.semicolon()
+        return True
+
+    def stmt_try(self):
+        self.next(False)
+        self.push_scope('block')
+        self.parse_block_body()
+        self.pop_scope()
+        if self.tok.is_name('catch'):
+            self.next(False)
+            self.push_scope('block')
+            if self.eat('(', True):
+                self.parse_binding_target('let')
+                self.expect(')', False)
+            self.parse_block_body()
+            self.pop_scope()
+        if self.tok.is_name('finally'):
+            self.next(False)
+            self.push_scope('block')
+            self.parse_block_body()
+            self.pop_scope()
+        return True
+
+    def stmt_switch(self):
+        self.next(False)
+        self.parse_paren_head()
+        self.push_scope('block')
+        self.expect('{', True)
+        while not self.tok.is_punct('}'):
+            if self.tok.is_name('case'):
+                self.next(True)
+                self.parse_expression()
+                self.expect(':', True)
+            elif self.tok.is_name('default'):
+                self.next(False)
+                self.expect(':', True)
+            else:
+                self.parse_statement()
+        self.next(True)
+        self.pop_scope()
+        return True
+
+    def stmt_with(self):
+        scope = self.scope
+        while scope is not None:
+            scope.unsafe = True
+            scope = scope.parent
+        self.next(False)
+        self.parse_paren_head()
+        self.parse_statement()
+        return True
+
+    def stmt_debugger(self):
+        self.next(False)
+        self.semicolon()
+        return True
+
+    def stmt_import(self):
+        after = self.peek()
+        if after.is_punct('(') or after.is_punct('.'):
+            return False
+        raise self.error("ES modules are not supported")
+
+    def stmt_export(self):
+        raise self.error("ES modules are not supported")
+
+    # -- functions and classes -------------------------------------------
+
+    def parse_function(self, statement=False, is_async=False):
+        self.next(False)                        # 'function'
+        is_generator = self.eat('*', False)
+        name = None
+        if self.tok.type == 'name':
+            name = self.binding_name()
+            self.next(False)
+            if statement:
+                # A function declared in a block is also hoisted to the function (Annex B): keep its name
+                in_block = self.scope.kind == 'block'
+                self.declare(name, self.scope if in_block else self.scope.function_scope(), pinned=in_block)
+        elif statement:
+            raise self.error()
+        scope = self.push_scope('function')
+        if name is not None and not statement:
+            self.declare(name, scope)
+        self.parse_function_rest(is_async, is_generator, expr_allowed_after=statement)
+        self.pop_scope()
+
+    def parse_function_rest(self, is_async, is_generator, expr_allowed_after=False):
+        """Parameters and body, in the current (function) scope"""
+        saved = self.in_async, self.in_generator
+        self.in_async, self.in_generator = is_async, is_generator
+        self.expect('(', True)
+        self.parse_params()
+        self.parse_block_body(expr_allowed_after)
+        self.in_async, self.in_generator = saved
+
+    def parse_params(self):
+        """Formal parameters after '(' up to and including ')'"""
+        while not self.tok.is_punct(')'):
+            self.eat('...', True)
+            self.parse_binding_element('param')
+            if not self.tok.is_punct(')'):
+                self.expect(',', True)
+        self.next(False)
+
+    def parse_method(self, is_async=False, is_generator=False):
+        self.push_scope('function')
+        self.parse_function_rest(is_async, is_generator)
+        self.pop_scope()
+
+    def parse_class(self, statement=False):
+        self.next(False)                        # 'class'
+        if self.tok.type == 'name' and not self.tok.is_name('extends'):
+            name = self.binding_name()
+            self.next(False)
+            self.declare(name, self.scope)
+        elif statement:
+            raise self.error()
+        if self.tok.is_name('extends'):
+            self.next(True)
+            self.parse_lhs()
+        self.expect('{', True)
+        while not self.tok.is_punct('}'):
+            if self.eat(';', True):
+                continue
+            self.parse_class_member()
+        self.next(statement)
+
+    def parse_class_member(self):
+        tok = self.tok
+        if tok.is_name('static'):
+            after = self.peek()
+            if after.is_punct('{'):
+                self.next(False)
+                self.push_scope('function')
+                self.parse_block_body(True)
+                self.pop_scope()
+                return
+            if not (after.is_punct('(') or after.is_punct('=') or after.is_punct(';') or after.is_punct('}')):
+                self.next(False)
+        is_async, is_generator = self.parse_method_modifiers()
+        self.parse_property_key()
+        if self.tok.is_punct('('):
+            self.parse_method(is_async, is_generator)
+            return
+        # Field: its initializer runs like a method body (own 'this')
+        if self.eat('=', True):
+            self.push_scope('function')
+            self.parse_assignment()
+            self.pop_scope()
+        self.semicolon()
+
+    def parse_method_modifiers(self):
+        """Consume async / get / set / '*' before a method name"""
+        is_async = is_generator = False
+        tok = self.tok
+        if tok.type == 'name' and tok.value in ('async', 'get', 'set'):
+            after = self.peek()
+            if not (after.is_punct('(') or after.is_punct(',') or after.is_punct(':') or after.is_punct('}')
+                    or after.is_punct('=') or after.is_punct(';')) and not (tok.value == 'async' and after.nl_before):
+                tok.is_property = True
+                is_async = tok.value == 'async'
+                self.next(False)
+        if self.eat('*', False):
+            is_generator = True
+        return is_async, is_generator
+
+    # -- expressions -----------------------------------------------------
+
+    def parse_expression(self, no_in=False):
+        self.parse_assignment(no_in)
+        while self.eat(',', True):
+            self.parse_assignment(no_in)
+
+    def parse_assignment(self, no_in=False):
+        tok = self.tok
+        if tok.type == 'name':
+            if tok.value == 'yield' and self.in_generator:
+                self.next(True)
+                if not self.tok.nl_before:
+                    self.eat('*', True)
+                    if not (self.tok.is_punct(')') or self.tok.is_punct(']') or self.tok.is_punct('}')
+                            or self.tok.is_punct(',') or self.tok.is_punct(';') or self.tok.is_punct(':')
+                            or self.tok.type == 'eof' or self.tok.nl_before):
+                        self.parse_assignment(no_in)
+                return
+            if tok.value == 'async' and self.try_async_arrow(no_in):
+                return
+            if tok.value not in KEYWORDS:
+                after = self.peek()
+                if after.is_punct('=>') and not after.nl_before:
+                    self.parse_arrow_single(no_in)
+                    return
+        elif tok.is_punct('(') and self.try_arrow(no_in):
+            return
+
+        self.parse_conditional(no_in)
+        if self.tok.type == 'punct' and (self.tok.value in _ASSIGN_OPS):
+            self.next(True)
+            self.parse_assignment(no_in)
+
+    def parse_arrow_single(self, no_in, is_async=False):
+        self.push_scope('function')
+        self.declare(self.tok, self.scope)
+        self.next(False)
+        self.expect('=>', True)
+        self.parse_arrow_body(no_in, is_async)
+        self.pop_scope()
+
+    def try_arrow(self, no_in, is_async=False):
+        """Parse '(params) => body' if that is what follows; False (nothing consumed) otherwise"""
+        state = self.save()
+        self.push_scope('function')
+        try:
+            self.expect('(', True)
+            self.parse_params()
+            if not self.tok.is_punct('=>') or self.tok.nl_before:
+                raise _Backtrack
+        except (_Backtrack, JSSyntaxError):
+            self.restore(state)
+            return False
+        self.next(True)
+        self.parse_arrow_body(no_in, is_async)
+        self.pop_scope()
+        return True
+
+    def try_async_arrow(self, no_in):
+        after = self.peek()
+        if after.nl_before:
+            return False
+        if after.type == 'name' and after.value not in KEYWORDS:
+            state = self.save()
+            self.next(False)
+            if self.peek().is_punct('=>'):
+                self.parse_arrow_single(no_in, is_async=True)
+                return True
+            self.restore(state)
+            return False
+        if after.is_punct('('):
+            state = self.save()
+            self.next(False)
+            if self.try_arrow(no_in, is_async=True):
+                return True
+            self.restore(state)
+        return False
+
+    def parse_arrow_body(self, no_in, is_async):
+        saved = self.in_async, self.in_generator
+        self.in_async, self.in_generator = is_async, False
+        if self.tok.is_punct('{'):
+            self.parse_block_body(False)
+        else:
+            self.parse_assignment(no_in)
+        self.in_async, self.in_generator = saved
+
+    def parse_conditional(self, no_in):
+        self.parse_binary(no_in)
+        if self.eat('?', True):
+            self.parse_assignment()
+            self.expect(':', True)
+            self.parse_assignment(no_in)
+
+    def parse_binary(self, no_in):
+        self.parse_unary()
+        while True:
+            tok = self.tok
+            if tok.type == 'punct' and tok.value in _BINARY_OPS:
+                pass
+            elif tok.type == 'name' and tok.value in _BINARY_NAMES and not (no_in and tok.value == 'in'):
+                pass
+            else:
+                return
+            self.next(True)
+            self.parse_unary()
+
+    def parse_unary(self):
+        tok = self.tok
+        if (tok.type == 'punct' and tok.value in _UNARY_OPS or tok.type == 'name' and tok.value in _UNARY_NAMES
+                or tok.is_name('await') and self.in_async):
+            self.next(True)
+            self.parse_unary()
+            return
+        self.parse_lhs()
+        if (self.tok.is_punct('++') or self.tok.is_punct('--')) and not self.tok.nl_before:
+            self.next(False)
+
+    def parse_lhs(self):
+        if self.tok.is_name('new'):
+            self.parse_new()
+        else:
+            self.parse_primary()
+        self.parse_member_tail(calls=True)
+
+    def parse_new(self):
+        self.next(True)
+        if self.tok.is_punct('.'):                 # new.target
+            self.next(False)
+            self.tok.is_property = True
+            self.next(False)
+            return
+        if self.tok.is_name('new'):
+            self.parse_new()
+        else:
+            self.parse_primary()
+        self.parse_member_tail(calls=False)
+        if self.tok.is_punct('('):
+            self.parse_arguments()
+
+    def parse_member_tail(self, calls):
+        while True:
+            tok = self.tok
+            if tok.is_punct('.') or tok.is_punct('?.'):
+                self.next(False)
+                if tok.value == '?.' and (self.tok.is_punct('(') or self.tok.is_punct('[')):
+                    continue
+                if self.tok.type not in ('name', 'private'):
+                    raise self.error()
+                self.tok.is_property = True
+                self.next(False)
+            elif tok.is_punct('['):
+                self.next(True)
+                self.parse_expression()
+                self.expect(']', False)
+            elif tok.is_punct('(') and calls:
+                self.parse_arguments()
+            elif tok.type == 'template':
+                self.parse_template()
+            else:
+                return
+
+    def parse_arguments(self):
+        self.expect('(', True)
+        while not self.tok.is_punct(')'):
+            self.eat('...', True)
+            self.parse_assignment()
+            if not self.tok.is_punct(')'):
+                self.expect(',', True)
+        self.next(False)
+
+    def parse_template(self):
+        tok = self.tok
+        while True:
+            self.next(not tok.tail)
+            if tok.tail:
+                return
+            self.parse_expression()
+            if not self.tok.is_punct('}'):
+                raise self.error("Expected '}' in template literal")
+            tok = self.tok = self.lexer.template_continuation(self.tok)
+
+    def parse_primary(self):
+        tok = self.tok
+        if tok.type == 'name':
+            value = tok.value
+            if value == 'function':
+                self.parse_function()
+            elif value == 'class':
+                self.parse_class()
+            elif value == 'async' and self.peek().is_name('function') and not self.peek().nl_before:
+                self.next(False)
+                self.parse_function(is_async=True)
+            elif value in ('this', 'super', 'null', 'true', 'false'):
+                self.next(False)
+            elif value == 'import':
+                self.next(False)
+                if self.tok.is_punct('.'):
+                    self.next(False)
+                    self.tok.is_property = True
+                    self.next(False)
+            elif value in KEYWORDS:
+                raise self.error()
+            else:
+                self.reference(tok)
+                self.next(False)
+        elif tok.type in ('num', 'string', 'regex', 'private'):
+            self.next(False)
+        elif tok.type == 'template':
+            self.parse_template()
+        elif tok.is_punct('('):
+            self.next(True)
+            self.parse_expression()
+            self.expect(')', False)
+        elif tok.is_punct('['):
+            self.next(True)
+            while not self.tok.is_punct(']'):
+                if self.eat(',', True):
+                    continue
+                self.eat('...', True)
+                self.parse_assignment()
+                if not self.tok.is_punct(']'):
+                    self.expect(',', True)
+            self.next(False)
+        elif tok.is_punct('{'):
+            self.parse_object()
+        else:
+            raise self.error()
+
+    def parse_object(self):
+        self.next(True)
+        while not self.tok.is_punct('}'):
+            if self.eat('...', True):
+                self.parse_assignment()
+            else:
+                is_async, is_generator = self.parse_method_modifiers()
+                key = self.tok
+                if self.parse_property_key():
+                    if self.tok.is_punct('('):
+                        self.parse_method(is_async, is_generator)
+                    else:
+                        self.expect(':', True)
+                        self.parse_assignment()
+                else:
+                    if key.value in KEYWORDS:
+                        raise self.error(tok=key)
+                    key.is_property = False
+                    key.shorthand = True
+                    self.reference(key)
+                    if self.eat('=', True):         # {a = 1} = obj (destructuring assignment)
+                        self.parse_assignment()
+            if not self.tok.is_punct('}'):
+                self.expect(',', True)
+        self.next(False)
+
+
+def parse(text):
+    """Parse a script and resolve every reference to its binding"""
+    parser = Parser(text).parse_program()
+    for tok in parser.refs:
+        scope = tok.scope
+        while scope is not None and tok.value not in scope.bindings:
+            scope = scope.parent
+        if scope is not None:
+            binding = scope.bindings[tok.value]
+            binding.tokens.append(tok)
+            tok.binding = binding
+        elif tok.value == 'eval':
+            # Direct eval can see every enclosing binding by name
+            scope = tok.scope
+            while scope is not None:
+                scope.unsafe = True
+                scope = scope.parent
+    return parser
+
+
+# -- mangling ---------------------------------------------------------------
+
+_FIRST_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ$_'
+_NEXT_CHARS = _FIRST_CHARS + '0123456789'
+
+
+def _short_name(index):
+    name = _FIRST_CHARS[index % len(_FIRST_CHARS)]
+    index //= len(_FIRST_CHARS)
+    while index:
+        index -= 1
+        name += _NEXT_CHARS[index % len(_NEXT_CHARS)]
+        index //= len(_NEXT_CHARS)
+    return name
+
+
+def _scope_tree(scope):
+    yield scope
+    for child in scope.children:
+        yield from _scope_tree(child)
+
+
+def _renamable(binding):
+    scope = binding.scope
+    return scope.kind != 'global' and not scope.unsafe and not binding.pinned
+
+
+def _mangle(parser):
+    """Give every renamable binding a short name that captures no other reference"""
+    # For each scope: the names used in it that must keep meaning what
+    # they mean outside (outer bindings, globals, free names), plus
+    # bindings inside it that keep their own name
+    for tok in parser.tokens:
+        if tok.type != 'name' or tok.is_property:
+            continue
+        binding = tok.binding
+        if binding is None:
+            scope = tok.scope
+            while scope is not None:
+                scope.outer.add(tok.value)
+                scope = scope.parent
+        else:
+            scope = tok.scope
+            while scope is not binding.scope:
+                scope.outer.add(binding)
+                scope = scope.parent
+    for scope in _scope_tree(parser.global_scope):
+        for binding in scope.bindings.values():
+            if not _renamable(binding):
+                parent = scope
+                while parent is not None:
+                    parent.outer.add(binding.name)
+                    parent = parent.parent
+
+    for scope in _scope_tree(parser.global_scope):
+        bindings = [b for b in scope.bindings.values() if _renamable(b)]
+        if not bindings:
+            continue
+        taken = set()
+        for item in scope.outer:
+            if isinstance(item, str):
+                taken.add(item)
+            else:
+                taken.add(item.new_name or item.name)
+        bindings.sort(key=lambda b: (-len(b.tokens), b.order))
+        index = 0
+        for binding in bindings:
+            while True:
+                name = _short_name(index)
+                index += 1
+                if name not in taken and name not in _AVOID_NAMES:
+                    break
+            binding.new_name = name
+
+
+# -- output -----------------------------------------------------------------
+
+def _word_char(ch):
+    return ch.isalnum() or ch in '$_\\' or ch > '\x7f'
+
+
+def _needs_space(prev, text):
+    a = prev[-1]
+    b = text[0]
+    if _word_char(a) and _word_char(b):
+        return True
+    if (a == '+' or a == '-') and b == a:
+        return True
+    if a == '/' and b in '/*':
+        return True
+    if a == '<' and b == '!':                   # '<!--' would open an HTML comment
+        return True
+    if prev.endswith('--') and b == '>':        # '-->' would close one
+        return True
+    if a.isdigit() and b == '.' and re.fullmatch(r'[0-9]+', prev):
+        return True
+    return False
+
+
+def _token_text(tok, mangle):
+    if tok.type == 'name' and not tok.is_property and mangle and tok.binding is not None and tok.binding.new_name:
+        if tok.shorthand:
+            return f"{tok.value}:{tok.binding.new_name}"
+        return tok.binding.new_name
+    return tok.value
+
+
+def minify_js(text, mangle=True):
+    """Minified source of a classic script (raises JSSyntaxError if it cannot be parsed)"""
+    parser = parse(text)
+    if mangle:
+        _mangle(parser)
+
+    out = []
+    if parser.lexer.hashbang:
+        out.append(parser.lexer.hashbang + '\n')
+    prev = ''
+    for index, tok in enumerate(parser.tokens):
+        if tok.comments:
+            if prev:
+                out.append('\n')
+            out.append('\n'.join(tok.comments) + '\n')
+            prev = ''
+        if index in parser.asi and tok.type != 'eof' and not tok.is_punct('}'):
+            out.append(';')
+            prev = ';'
+        if tok.type == 'eof':
+            break
+        text_ = _token_text(tok, mangle)
+        if prev and _needs_space(prev, text_):
+            out.append(' ')
+        out.append(text_)
+        prev = text_
+    return ''.join(out)
+
+
+# -- verification -------------------------------------------------------------
+
+def _signature(parser):
+    """Token stream with names replaced by what they resolve to"""
+    ids = {}
+    signature = []
+    for index, tok in enumerate(parser.tokens):
+        if index in parser.asi:
+            signature.append(('punct', ';'))
+        if tok.type == 'eof':
+            break
+        if tok.type != 'name' or tok.is_property:
+            signature.append((tok.type, tok.value))
+            continue
+        binding = tok.binding
+        if binding is None or not _renamable(binding):
+            meaning = ('free', tok.value)
+        else:
+            meaning = ('binding', ids.setdefault(id(binding), len(ids)))
+        if tok.shorthand:
+            signature.extend([('name', tok.value), ('punct', ':'), meaning])
+        else:
+            signature.append(meaning)
+    return signature
+
+
+def check_equivalent(original, minified):
+    """Raise AssertionError if minified does not parse to the same program as original"""
+    before = _signature(parse(original))
+    after = _signature(parse(minified))
+    if before == after:
+        return
+    for index, (a, b) in enumerate(zip(before, after)):
+        if a != b:
+            break
+    else:
+        index = min(len(before), len(after))
+    context = before[max(0, index - 5):index + 5]
+    raise AssertionError(f"Minified script differs at token {index}: "
+                         f"{before[index:index + 1]} != {after[index:index + 1]} (around {context})")
@@ -0,0 +1,224 @@
+"""
+Persistent graph of the references between pages and files
+
+Every live page is scanned for the URLs it makes the browser (or the
+visitor) fetch:
+
+    a[href]  link[href]  script[src]  img[src|srcset]  source[src|srcset]
+
+Inline script and style bodies are skipped: a URL built in JavaScript
+("${it.url}") is not a reference. Each URL is resolved against the page
+(relative URLs included) and the site:
+
+    ok         an existing page or file
+    redirect   redirected by _redirects (sitetools/redirects.py); final
+               is where it ends up, and the reference is broken if
+               that does not exist
+    broken     nothing is served there: a 404 for the visitor
+    external   another host (not checked)
+
+mailto:, tel:, javascript:, data: and same-page #fragment URLs are not
+recorded.
+
+The graph is kept in .build-cache/linkgraph.sqlite, next to the page
+catalogue:
+
+    pages  path, hash (the catalogue hash the references were read at)
+    refs   page, tag, attr, url (as written), target (site path), status, final
+
+update() reads again only the pages whose hash changed, in parallel
+with --jobs; resolve() recomputes every status, since files and
+_redirects change independently of the pages. Other build stages can
+query it without scanning the tree: references(page), referrers(target),
+refs(status=...).
+"""
+
+import posixpath
+import re
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import unquote, urljoin, urlsplit
+
+from sitetools.cache import CACHE_DIR
+from sitetools.parallel import map_files
+from sitetools.redirects import RedirectMap, load_redirects, site_path_exists
+from sitetools.site import ROOT_DIR, SITE_URL
+
+__all__ = ['LINKGRAPH_PATH', 'Reference', 'extract_references', 'page_url', 'site_target', 'LinkGraph']
+
+LINKGRAPH_PATH = CACHE_DIR / "linkgraph.sqlite"
+
+# Bump when the schema or the extraction rules change: the tables are rebuilt
+SCHEMA_VERSION = 1
+
+# tag -> attributes holding a URL
+REFERENCE_ATTRIBUTES = {
+    'a': ('href',),
+    'link': ('href',),
+    'script': ('src',),
+    'img': ('src', 'srcset'),
+    'source': ('src', 'srcset'),
+}
+
+SITE_HOST = urlsplit(SITE_URL).netloc
+
+Reference = namedtuple('Reference', 'page tag attr url target status final')
+
+_SKIPPED_BODIES_RE = re.compile(r'(<(script|style)\b[^>]*>).*?(</\2\s*>)', re.S | re.I)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_TAG_RE = re.compile(r'<(%s)\b([^>]*)>' % '|'.join(REFERENCE_ATTRIBUTES), re.I)
+_ATTR_RE = re.compile(r'''(?<![\w-])([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))''')
+_SKIPPED_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:', 'sms:', 'whatsapp:')
+
+
+def extract_references(filepath):
+    """[(tag, attr, url)] of a page, in document order (runs in worker processes with --jobs)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        page = f.read()
+    page = _COMMENT_RE.sub('', _SKIPPED_BODIES_RE.sub(r'\1\3', page))
+
+    references = []
+    for match in _TAG_RE.finditer(page):
+        tag = match.group(1).lower()
+        wanted = REFERENCE_ATTRIBUTES[tag]
+        for attr in _ATTR_RE.finditer(match.group(2)):
+            name = attr.group(1).lower()
+            if name not in wanted:
+                continue
+            value = next(v for v in attr.group(2, 3, 4) if v is not None).strip()
+            urls = [part.split()[0] for part in value.split(',') if part.strip()] if name == 'srcset' else [value]
+            references.extend((tag, name, url) for url in urls if url)
+    return references
+
+
+def page_url(relpath):
+    """URL path of a page relative to the site root"""
+    return '/' + Path(relpath).as_posix()
+
+
+def site_target(url, base):
+    """Site path a URL points at from the page at base, '' for another host, None if not a reference"""
+    if url.startswith('#') or url.lower().startswith(_SKIPPED_SCHEMES):
+        return None
+    absolute = urlsplit(urljoin(SITE_URL + base, url))
+    if absolute.scheme not in ('http', 'https'):
+        return None
+    if absolute.netloc.lower() != SITE_HOST:
+        return ''
+    path = unquote(absolute.path) or '/'
+    normalized = posixpath.normpath(path)
+    return normalized + '/' if path.endswith('/') and normalized != '/' else normalized
+
+
+class LinkGraph:
+    """SQLite graph of page references, kept current from the catalogue hashes"""
+
+    def __init__(self, root=ROOT_DIR, path=None):
+        self.root = Path(root)
+        self.path = Path(path) if path is not None else self.root / LINKGRAPH_PATH.relative_to(ROOT_DIR)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self._create()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def _create(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS pages")
+            self.db.execute("DROP TABLE IF EXISTS refs")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages (path TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS refs (
+                page TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                attr TEXT NOT NULL,
+                url TEXT NOT NULL,
+                target TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT '',
+                final TEXT
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS refs_page ON refs (page)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS refs_target ON refs (target)")
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.commit()
+
+    def update(self, catalogue, jobs=1, force=False):
+        """Read the references of the catalogue's pages whose hash changed; returns (read, removed) counts"""
+        known = dict(self.db.execute("SELECT path, hash FROM pages"))
+        pages = catalogue.query()
+        todo = [page for page in pages if force or known.get(page.path) != page.hash]
+
+        hashes = {page.path: page.hash for page in todo}
+        files = [catalogue.root / page.path for page in todo]
+        for filepath, references in map_files(extract_references, files, jobs):
+            relpath = filepath.relative_to(catalogue.root).as_posix()
+            base = page_url(relpath)
+            rows = []
+            for position, (tag, attr, url) in enumerate(references):
+                target = site_target(url, base)
+                if target is not None:
+                    rows.append((relpath, position, tag, attr, url, target))
+            self.db.execute("DELETE FROM refs WHERE page = ?", (relpath,))
+            self.db.executemany("INSERT INTO refs (page, position, tag, attr, url, target) VALUES (?, ?, ?, ?, ?, ?)",
+                                rows)
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?)", (relpath, hashes[relpath]))
+
+        live = {page.path for page in pages}
+        removed = [(path,) for path in known if path not in live]
+        self.db.executemany("DELETE FROM refs WHERE page = ?", removed)
+        self.db.executemany("DELETE FROM pages WHERE path = ?", removed)
+        self.db.commit()
+        return len(todo), len(removed)
+
+    def resolve(self, rules=None):
+        """Set status and final of every reference against the tree and _redirects"""
+        redirects = RedirectMap(load_redirects(self.root / '_redirects') if rules is None else rules,
+                                lambda path: site_path_exists(path, self.root))
+        updates = []
+        for (target,) in self.db.execute("SELECT DISTINCT target FROM refs").fetchall():
+            if not target:
+                updates.append(('external', None, target))
+            elif site_path_exists(target, self.root):
+                updates.append(('ok', None, target))
+            else:
+                final = redirects.final(target)
+                if final is None:
+                    updates.append(('broken', None, target))
+                else:
+                    final_target = site_target(final, target)
+                    broken = final_target and not site_path_exists(final_target, self.root)
+                    updates.append(('broken' if broken else 'redirect', final, target))
+        self.db.executemany("UPDATE refs SET status = ?, final = ? WHERE target = ?", updates)
+        self.db.commit()
+
+    def _refs(self, where='', params=()):
+        sql = "SELECT page, tag, attr, url, target, status, final FROM refs"
+        if where:
+            sql += " WHERE " + where
+        return [Reference(*row) for row in self.db.execute(sql + " ORDER BY page, position", params)]
+
+    def refs(self, status=None):
+        """Every reference, or those with one status, by page"""
+        return self._refs("status = ?", (status,)) if status else self._refs()
+
+    def references(self, page):
+        """References of one page (path relative to the root), in document order"""
+        return self._refs("page = ?", (Path(page).as_posix(),))
+
+    def referrers(self, target):
+        """References pointing at a site path ('/assets/css/styles.min.css', '/guide/palermo/')"""
+        return self._refs("target = ?", (target,))
+
+    def counts(self):
+        """{status: number of references}"""
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM refs GROUP BY status"))
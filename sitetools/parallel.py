@@ -0,0 +1,49 @@
+"""
+Process-pool execution for per-file work
+
+Parsing with html.parser is CPU-bound, so the fixers can spread files
+over several processes. Results always come back in input order, so a
+parallel run prints and aggregates exactly like a serial one.
+
+Worker functions must be defined at module level (picklable) and must
+not print: they return their results and the caller reports them.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def default_jobs():
+    """Number of worker processes to use for --jobs 0"""
+    return os.cpu_count() or 1
+
+
+def add_jobs_argument(parser):
+    """Add the shared --jobs option to an argparse parser"""
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="Worker processes (default: 1, 0 = one per CPU)")
+
+
+def map_files(func, files, jobs=1, chunksize=None):
+    """Yield (file, func(file)) for every file, in input order
+
+    jobs <= 1 runs in-process; otherwise files are spread over a
+    process pool of that size.
+    """
+    files = list(files)
+
+    if jobs == 0:
+        jobs = default_jobs()
+
+    if jobs <= 1 or len(files) <= 1:
+        for filepath in files:
+            yield filepath, func(filepath)
+        return
+
+    if chunksize is None:
+        # A few chunks per worker keeps the pool busy without much IPC
+        chunksize = max(1, len(files) // (jobs * 4))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for filepath, result in zip(files, pool.map(func, files, chunksize=chunksize)):
+            yield filepath, result
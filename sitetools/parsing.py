@@ -0,0 +1,143 @@
+"""
+Pluggable HTML parser backend for the BeautifulSoup-based fixers
+
+Pages are parsed with parse_html(), which uses the backend selected by
+--parser (or the SITE_HTML_PARSER environment variable, so worker
+processes inherit it). html.parser stays the default: it needs nothing
+installed. lxml is several times faster; html5lib is the slowest but
+parses exactly like a browser.
+
+Template snippets (CTA boxes, GTM tags, ...) always go through
+parse_fragment(), i.e. html.parser: lxml and html5lib would wrap a
+fragment in <html><body>, which must never end up inside a page.
+Fixed templates use template_fragment(), which parses each one once
+per process and returns copies.
+
+Serialized output is byte-identical across backends except for the
+differences listed in DOCUMENTED_DIFFERENCES (checked on the real pages
+by check-parser-parity.py).
+"""
+
+import copy
+import importlib.util
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+ENV_VAR = 'SITE_HTML_PARSER'
+DEFAULT_BACKEND = 'html.parser'
+
+# Backend name -> module that has to be importable for it
+BACKENDS = {
+    'html.parser': None,
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+}
+
+# Whitespace-only text between two tags, outside <pre> and <textarea>
+_WHITESPACE_RE = re.compile(r'(<(pre|textarea)\b.*?</\2\s*>)|>([ \t\n\r\f]+)<', re.S | re.I)
+
+
+def _collapse_whitespace(markup):
+    """What html.parser and lxml make of whitespace-only text: one newline if it has one, else one space"""
+    def collapse(match):
+        if match.group(1):
+            return match.group(1)
+        return '>\n<' if '\n' in match.group(3) else '> <'
+    return _WHITESPACE_RE.sub(collapse, markup)
+
+
+# (backends, description, normalizer) - applied to both sides before comparing
+DOCUMENTED_DIFFERENCES = [
+    (
+        ('lxml', 'html5lib'),
+        "blank line after <!DOCTYPE html> is dropped",
+        lambda s: re.sub(r'^(<!DOCTYPE html>)\n+', r'\1\n', s, flags=re.IGNORECASE),
+    ),
+    (
+        ('html5lib',),
+        "SVG attributes keep their camelCase (viewBox instead of viewbox)",
+        lambda s: re.sub(r'(<svg\b[^>]*?\s)viewBox=', r'\1viewbox=', s),
+    ),
+    (
+        ('html5lib',),
+        "whitespace between <html> and <head> is dropped",
+        lambda s: re.sub(r'(<html\b[^>]*>)\s+(<head\b)', r'\1\2', s, count=1, flags=re.IGNORECASE),
+    ),
+    (
+        ('html5lib',),
+        "whitespace between </body> and </html> moves to the end of <body>",
+        lambda s: re.sub(r'(</body>)\s+(</html>)', r'\1\2', s, count=1, flags=re.IGNORECASE),
+    ),
+    (
+        ('html5lib',),
+        "whitespace-only text between tags is kept verbatim instead of collapsed to one newline or space",
+        _collapse_whitespace,
+    ),
+    (
+        ('html5lib',),
+        "whitespace after </html> is dropped",
+        lambda s: s.rstrip(),
+    ),
+]
+
+
+def backend_available(name):
+    if name not in BACKENDS:
+        return False
+    module = BACKENDS[name]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_backends():
+    return [name for name in BACKENDS if backend_available(name)]
+
+
+def get_backend():
+    """Currently selected backend name"""
+    return os.environ.get(ENV_VAR) or DEFAULT_BACKEND
+
+
+def set_backend(name):
+    """Select the backend for this process and any worker it starts"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name} (choose from {', '.join(BACKENDS)})")
+    if not backend_available(name):
+        raise RuntimeError(f"Parser backend {name} is not installed. Run: pip install {BACKENDS[name]}")
+    os.environ[ENV_VAR] = name
+
+
+def add_parser_argument(parser):
+    """Add the shared --parser option to an argparse parser"""
+    parser.add_argument('--parser', choices=list(BACKENDS), default=None,
+                        help=f"HTML parser backend (default: {DEFAULT_BACKEND}, or ${ENV_VAR})")
+
+
+def parse_html(markup, backend=None):
+    """Parse a whole page with the selected backend"""
+    return BeautifulSoup(markup, backend or get_backend())
+
+
+def parse_fragment(markup):
+    """Parse a template snippet for insertion into a page"""
+    return BeautifulSoup(markup, 'html.parser')
+
+
+_templates = {}
+
+
+def template_fragment(markup):
+    """parse_fragment() for a fixed template: parsed once per process, a fresh copy on every call"""
+    parsed = _templates.get(markup)
+    if parsed is None:
+        parsed = _templates[markup] = parse_fragment(markup)
+    return copy.copy(parsed)
+
+
+def normalize_for_parity(markup, backend):
+    """Apply the documented normalizations for backend to serialized output"""
+    for backends, _description, normalize in DOCUMENTED_DIFFERENCES:
+        if backend in backends:
+            markup = normalize(markup)
+    return markup
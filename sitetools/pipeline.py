@@ -0,0 +1,285 @@
+"""
+Single-pass transform pipeline
+
+Every fixer script registers its work as a pass. The pipeline reads each
+page once, hands the same in-memory Document to every enabled pass in
+order, and writes the page back once at the end.
+
+Passes come in two kinds:
+- 'soup' passes work on doc.soup (BeautifulSoup, parsed on first use
+  with the backend selected in sitetools.parsing)
+- 'text' passes work on doc.text (the raw HTML string), ideally by
+  recording span edits (sitetools.spans) and calling doc.apply_edits()
+
+Consecutive soup passes share one parse; the soup is only serialized
+again when a later text pass asks for doc.text or the page is written.
+
+Passes that produce something besides the page itself (e.g. an extracted
+stylesheet) store it in doc.outputs[pass name]; their finalize hook then
+receives it in the parent process, in file order, even with --jobs.
+
+With a BuildCache, pages every enabled pass has already processed (same
+content, same pass version) are skipped before they are even read.
+"""
+
+import importlib.util
+import inspect
+import sys
+from functools import partial
+from pathlib import Path
+
+from sitetools.cache import fingerprint
+from sitetools.catalogue import select_pages
+from sitetools.parallel import map_files
+from sitetools.site import ROOT_DIR, page_section
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+# Pass name -> script that registers it
+PASS_SCRIPTS = {
+    'structured-data': 'fix-structured-data.py',
+    'social-proof': 'add-social-proof.py',
+    'cta-improved': 'fix-cta-improved.py',
+    'cta-classes': 'migrate-cta-styles.py',
+    'remove-ai-phrases': 'remove-ai-phrases.py',
+    'keyword-stuffing': 'fix-keyword-stuffing.py',
+    'unnatural-lede': 'fix-unnatural-lede.py',
+    'redirect-links': 'compile-redirects.py',
+    'conversion-tracking': 'add-conversion-tracking.py',
+    'asset-references': 'minify-assets.py',
+    'critical-css': 'inline-critical-css.py',
+    'html-minify': 'minify-html.py',
+}
+
+# Order used for a full refresh. conversion-tracking is opt-in because
+# it needs a real GTM ID (see add-conversion-tracking.py).
+DEFAULT_PASSES = [
+    'structured-data',
+    'social-proof',
+    'cta-improved',
+    'cta-classes',
+    'remove-ai-phrases',
+    'keyword-stuffing',
+    'unnatural-lede',
+    'redirect-links',
+    'asset-references',
+    'critical-css',
+    'html-minify',
+]
+
+PASSES = {}
+
+
+class Pass:
+    """A registered transform: name, kind ('soup' or 'text') and target sections"""
+
+    def __init__(self, name, func, kind='text', sections=None, finalize=None, depends=(), settings=None):
+        if kind not in ('soup', 'text'):
+            raise ValueError(f"Unknown pass kind: {kind}")
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.sections = sections
+        self.finalize = finalize
+        self.depends = tuple(depends)
+        self.settings = settings
+        self._version = None
+
+    @property
+    def version(self):
+        """Fingerprint of the script defining the pass plus its data files
+
+        Soup passes also depend on sitetools/parsing.py and on the parser
+        backend: the same page parsed by lxml can serialize differently.
+        So does whatever the pass's settings() returns (options read from
+        the environment).
+        """
+        if self._version is None:
+            source = Path(inspect.getsourcefile(self.func))
+            depends = list(self.depends)
+            if self.kind == 'soup':
+                depends.append('sitetools/parsing.py')
+            self._version = fingerprint(source, *[SCRIPTS_DIR / d for d in depends])
+        version = self._version
+        if self.kind == 'soup':
+            from sitetools.parsing import get_backend
+            version = fingerprint(version, get_backend())
+        if self.settings is not None:
+            version = fingerprint(version, *self.settings())
+        return version
+
+    def applies_to(self, filepath, root=ROOT_DIR):
+        if self.sections is None:
+            return True
+        return page_section(filepath, root) in self.sections
+
+    def run(self, doc):
+        changes = self.func(doc) or []
+        if changes and self.kind == 'soup':
+            doc.soup_dirty = True
+        return changes
+
+
+def register_pass(name, kind='text', sections=None, finalize=None, depends=(), settings=None):
+    """Decorator: register func(doc) -> list of change descriptions as a pass
+
+    finalize(filepath, output), if given, is called in the parent process
+    with doc.outputs[name] for every page the pass ran on.
+    depends lists extra files (rules, templates, shared modules; relative
+    to the repo root) that feed the pass version used by the build cache.
+    settings(), if given, returns the options the output depends on
+    (strings); they feed the version too.
+    """
+    def decorator(func):
+        PASSES[name] = Pass(name, func, kind, sections, finalize, depends, settings)
+        return func
+    return decorator
+
+
+class Document:
+    """One page held in memory while the passes run over it"""
+
+    def __init__(self, path, text):
+        self.path = Path(path)
+        self.original = text
+        self._text = text
+        self._soup = None
+        self.soup_dirty = False
+        self.outputs = {}
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            from sitetools.parsing import parse_html
+            self._soup = parse_html(self._text)
+            self.soup_dirty = False
+        return self._soup
+
+    @property
+    def text(self):
+        if self._soup is not None and self.soup_dirty:
+            self._text = str(self._soup)
+            self._soup = None
+            self.soup_dirty = False
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if self._soup is not None and self.soup_dirty:
+            raise RuntimeError("Pending soup changes would be lost; read doc.text first")
+        self._text = value
+        self._soup = None
+
+    def apply_edits(self, edits):
+        """Apply an EditList recorded against doc.text; returns warnings for skipped overlaps"""
+        if edits.text is not self._text and edits.text != self.text:
+            raise RuntimeError("Edits were recorded against an older version of the page")
+        self.text = edits.apply()
+        return [f"⚠️  {line}" for line in edits.describe_conflicts()]
+
+    @property
+    def changed(self):
+        return self.text != self.original
+
+
+def load_script(filename):
+    """Import one of the hyphen-named root scripts as a module"""
+    module_name = Path(filename).stem.replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_passes(names):
+    """Return the Pass objects for names, importing their scripts on demand"""
+    passes = []
+    for name in names:
+        if name not in PASS_SCRIPTS:
+            raise KeyError(f"Unknown pass: {name} (available: {', '.join(PASS_SCRIPTS)})")
+        if name not in PASSES:
+            load_script(PASS_SCRIPTS[name])
+        passes.append(PASSES[name])
+    return passes
+
+
+def process_document(filepath, passes, write=True, store=None):
+    """Run passes over one page; returns ([(pass name, change), ...], doc.outputs, backup hash)
+
+    With a BackupStore, the page's previous content is stored before it
+    is overwritten; the hash of that blob is returned (None if the page
+    was not written).
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        doc = Document(filepath, f.read())
+
+    changes = []
+    for p in passes:
+        if not p.applies_to(filepath):
+            continue
+        for change in p.run(doc):
+            changes.append((p.name, change))
+
+    backup_hash = None
+    if write and doc.changed:
+        if store is not None:
+            backup_hash = store.put_file(filepath)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(doc.text)
+
+    return changes, doc.outputs, backup_hash
+
+
+def _process_named(filepath, names, write, store):
+    """Worker entry point: passes travel by name and are loaded in the worker"""
+    return process_document(filepath, load_passes(names), write=write, store=store)
+
+
+def select_stale(passes, files, cache):
+    """Keep the files at least one applicable pass has not processed yet"""
+    stale = []
+    for filepath in files:
+        if not all(cache.is_fresh(p.name, p.version, filepath) for p in passes if p.applies_to(filepath)):
+            stale.append(filepath)
+    return stale
+
+
+def run_pipeline(passes, files=None, write=True, jobs=1, cache=None, backup=None):
+    """Run passes over files (default: every live page)
+
+    Yields (filepath, changes) for each processed page, in file order.
+    With a cache, already processed pages are skipped and every page
+    that was written (or left unchanged) is recorded for the next run.
+    With a BackupRun, every page is backed up before being overwritten;
+    the caller saves the run's manifest at the end.
+    """
+    if files is None:
+        files = select_pages()
+
+    if cache is not None:
+        files = select_stale(passes, files, cache)
+
+    store = backup.store if backup is not None else None
+    if jobs == 1:
+        worker = partial(process_document, passes=passes, write=write, store=store)
+    else:
+        worker = partial(_process_named, names=[p.name for p in passes], write=write, store=store)
+
+    for filepath, (changes, outputs, backup_hash) in map_files(worker, files, jobs):
+        if backup_hash is not None:
+            backup.record(filepath, backup_hash)
+
+        for p in passes:
+            if p.finalize and p.name in outputs:
+                p.finalize(filepath, outputs[p.name])
+
+        if cache is not None and write:
+            for p in passes:
+                if p.applies_to(filepath):
+                    cache.record(p.name, p.version, filepath)
+
+        yield filepath, changes
@@ -0,0 +1,261 @@
+"""
+Rules of the Netlify _redirects file
+
+One rule per line: source path, target, optional status (default 301,
+"!" forces the rule over an existing file) and optional conditions.
+Blank lines, comments ("#" starting a field; inside a target it is a
+fragment) and lines that do not start with "/" (the
+EN_REDIRECTS_START/END markers) are not rules.
+
+Sources may use a trailing "*" splat and ":name" placeholders, as on
+Netlify; redirected() tells whether a URL path matches a redirect
+(3xx) rule. Rewrites (200) and custom error pages (404) are not
+redirects.
+
+RedirectMap answers what a visitor actually gets, following Netlify:
+the first matching rule wins, a rule whose source is an existing page
+is shadowed unless forced, and rules with conditions (Country=, ...)
+only apply to some visitors, so they are never followed. compile_rules()
+follows every rule to its final URL and reports:
+
+    chains     rules whose target is redirected again (one extra
+               round trip per hop): their target becomes the final URL
+    temporary  permanent (301/308) rules whose chain goes through a
+               temporary redirect (302/303/307): left as they are, since
+               collapsing them would make the temporary hop permanent
+    loops      rules that come back to a URL already visited
+    missing    internal final targets with no page or file behind them
+    shadowed   unforced rules that never fire because the page exists
+
+rewrite_targets() applies the collapsed targets to the file text,
+keeping every other line (comments, markers) as it is.
+"""
+
+import re
+from collections import namedtuple
+from pathlib import Path
+
+from sitetools.site import ROOT_DIR
+
+__all__ = ['REDIRECTS_PATH', 'Redirect', 'parse_redirects', 'load_redirects', 'redirected', 'site_path_exists',
+           'RedirectMap', 'compile_rules', 'rewrite_targets']
+
+REDIRECTS_PATH = ROOT_DIR / "_redirects"
+
+DEFAULT_STATUS = 301
+
+# Statuses browsers and search engines may cache (the others are temporary)
+PERMANENT_STATUSES = (301, 308)
+
+# Longest chain followed before giving up (Netlify and browsers stop far earlier)
+MAX_HOPS = 20
+
+Redirect = namedtuple('Redirect', 'source target status force conditions line')
+
+_STATUS_RE = re.compile(r'^([0-9]{3})(!?)$')
+_PLACEHOLDER_RE = re.compile(r':([A-Za-z_][A-Za-z0-9_]*)')
+_URL_RE = re.compile(r'([^?#]*)(.*)', re.S)
+_COMMENT_RE = re.compile(r'(?:^|\s)#')
+
+
+def parse_redirects(text):
+    """Redirect rules of a _redirects file, in file order (line is 1-based)"""
+    rules = []
+    for number, raw in enumerate(text.splitlines(), 1):
+        fields = _COMMENT_RE.split(raw, 1)[0].split()
+        if len(fields) < 2 or not fields[0].startswith('/'):
+            continue
+        source, target, rest = fields[0], fields[1], fields[2:]
+        status, force = DEFAULT_STATUS, False
+        if rest:
+            match = _STATUS_RE.match(rest[0])
+            if match:
+                status, force = int(match.group(1)), bool(match.group(2))
+                rest = rest[1:]
+        rules.append(Redirect(source, target, status, force, tuple(rest), number))
+    return rules
+
+
+def load_redirects(path=REDIRECTS_PATH):
+    """Rules of path, or [] without the file"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return parse_redirects(f.read())
+    except FileNotFoundError:
+        return []
+
+
+def _is_pattern(source):
+    return source.endswith('*') or _PLACEHOLDER_RE.search(source) is not None
+
+
+def _pattern(source):
+    """Regex for a rule source; placeholders and the splat become named groups"""
+    splat = source.endswith('*')
+    body = source[:-1] if splat else source
+    parts = []
+    last = 0
+    for match in _PLACEHOLDER_RE.finditer(body):
+        parts.append(re.escape(body[last:match.start()]) + f'(?P<{match.group(1)}>[^/]+)')
+        last = match.end()
+    parts.append(re.escape(body[last:]))
+    return re.compile(''.join(parts) + ('(?P<splat>.*)' if splat else '') + '/?$')
+
+
+def _normalize(path):
+    """Netlify matches a path with or without its trailing slash"""
+    return path[:-1] if len(path) > 1 and path.endswith('/') else path
+
+
+def redirected(path, rules):
+    """True if a 3xx rule matches the URL path (a directory and its index.html are the same page)"""
+    paths = {path}
+    if path.endswith('/index.html'):
+        paths.add(path[:-len('index.html')])
+    elif path.endswith('/'):
+        paths.add(path + 'index.html')
+    for rule in rules:
+        if 300 <= rule.status < 400 and any(_pattern(rule.source).match(p) for p in paths):
+            return True
+    return False
+
+
+def site_path_exists(path, root=ROOT_DIR):
+    """True if the site serves a file at a URL path (directory index and pretty .html URLs included)"""
+    relpath = path.lstrip('/')
+    target = Path(root) / relpath
+    if not relpath or path.endswith('/'):
+        return (target / 'index.html').is_file()
+    return target.is_file() or (target / 'index.html').is_file() or target.with_name(target.name + '.html').is_file()
+
+
+class RedirectMap:
+    """Where each URL path ends up under a list of rules"""
+
+    def __init__(self, rules, exists=site_path_exists):
+        self.rules = [rule for rule in rules if not rule.conditions]
+        self.exists = exists
+        self.exact = {}
+        self.patterns = []
+        for index, rule in enumerate(self.rules):
+            if _is_pattern(rule.source):
+                self.patterns.append((index, _pattern(rule.source)))
+            else:
+                self.exact.setdefault(_normalize(rule.source), index)
+
+    def match(self, path):
+        """(rule, target with placeholders filled) of the first rule matching path, or None"""
+        index = self.exact.get(_normalize(path))
+        found = None
+        for pattern_index, pattern in self.patterns:
+            if index is not None and pattern_index > index:
+                break
+            match = pattern.match(path)
+            if match:
+                index, found = pattern_index, match
+                break
+        if index is None:
+            return None
+        rule = self.rules[index]
+        target = rule.target
+        if found:
+            for name, value in found.groupdict().items():
+                target = target.replace(':' + name, value or '')
+        return rule, target
+
+    def redirect(self, path):
+        """(rule, target) if a visitor asking for path is redirected, else None"""
+        matched = self.match(path)
+        if matched is None:
+            return None
+        rule, _ = matched
+        if not 300 <= rule.status < 400:
+            return None
+        if not rule.force and self.exists(path):
+            return None
+        return matched
+
+    def follow(self, target, seen=()):
+        """(final URL, hops, loop, temporary) after following the redirects from target
+
+        loop is the list of URLs visited when the chain comes back on
+        itself, else None; temporary is the first rule followed with a
+        temporary status, else None. A hop whose target has no query
+        string or fragment keeps the ones it was reached with, as the
+        browser does: /e -> /a?x=1#f -> /d ends at /d?x=1#f.
+        """
+        visited = list(seen)
+        hops = 0
+        temporary = None
+        while hops < MAX_HOPS:
+            path, rest = _URL_RE.match(target).groups()
+            if not path.startswith('/') or path.startswith('//'):
+                return target, hops, None, temporary
+            if _normalize(path) in visited:
+                return target, hops, visited + [_normalize(path)], temporary
+            matched = self.redirect(path)
+            if matched is None:
+                return target, hops, None, temporary
+            rule, target = matched
+            if temporary is None and rule.status not in PERMANENT_STATUSES:
+                temporary = rule
+            if not _URL_RE.match(target).group(2):
+                target += rest
+            visited.append(_normalize(path))
+            hops += 1
+        return target, hops, visited, temporary
+
+    def final(self, path):
+        """Final URL for a link to path, or None if path is not redirected (or loops)"""
+        if self.redirect(path) is None:
+            return None
+        target, _, loop, _ = self.follow(path)
+        return None if loop else target
+
+
+Compiled = namedtuple('Compiled', 'targets chains temporary loops missing shadowed')
+
+
+def compile_rules(rules, exists=site_path_exists):
+    """Follow every rule to its final URL; returns Compiled
+
+    targets   {line: final target} for the rules whose target changes
+    chains    [(rule, final target, hops)]
+    temporary [(rule, final target, temporary rule)]
+    loops     [(rule, [url, ...])]
+    missing   [(rule, final target)]
+    shadowed  [rule]
+    """
+    redirects = RedirectMap(rules, exists)
+    targets, chains, temporary, loops, missing, shadowed = {}, [], [], [], [], []
+    for rule in rules:
+        if not 300 <= rule.status < 400:
+            continue
+        if not _is_pattern(rule.source) and not rule.force and exists(rule.source):
+            shadowed.append(rule)
+            continue
+        if _PLACEHOLDER_RE.search(rule.target) or rule.target.endswith('*'):
+            # Depends on the URL asked for: nothing to follow or check
+            continue
+        final, hops, loop, through = redirects.follow(rule.target, [_normalize(rule.source)])
+        if loop:
+            loops.append((rule, loop))
+            continue
+        if hops and rule.status in PERMANENT_STATUSES and through is not None:
+            temporary.append((rule, final, through))
+        elif hops:
+            chains.append((rule, final, hops))
+            targets[rule.line] = final
+        path = _URL_RE.match(final).group(1)
+        if path.startswith('/') and not path.startswith('//') and not exists(path):
+            missing.append((rule, final))
+    return Compiled(targets, chains, temporary, loops, missing, shadowed)
+
+
+def rewrite_targets(text, targets):
+    """text of a _redirects file with the target of each {line: target} replaced"""
+    lines = text.splitlines(keepends=True)
+    for number, target in targets.items():
+        line = lines[number - 1]
+        lines[number - 1] = re.sub(r'^(\s*\S+\s+)\S+', lambda m: m.group(1) + target, line, count=1)
+    return ''.join(lines)
@@ -0,0 +1,326 @@
+"""
+Streaming HTML rewriter for insert-only passes
+
+Passes that only add markup next to a few tags (GTM in <head>, a script
+before </body>, ...) do not need a DOM. HTMLRewriter tokenizes the page
+chunk by chunk, calls the handlers registered for start/end tags, and
+copies every byte it was not asked to change straight to the output:
+no attribute re-quoting, no whitespace normalization, constant memory.
+
+    rewriter = HTMLRewriter()
+    rewriter.on_start_tag('head', lambda tag: tag.after(SNIPPET))
+    rewriter.on_end_tag('body', lambda tag: tag.before(SCRIPT))
+    changed = rewriter.rewrite_file(path)
+
+The tokenizer knows just enough HTML to find tag boundaries: comments,
+doctype/processing instructions, quoted attribute values containing '>'
+and raw-text elements (<script>, <style>, <textarea>, <title>, ...)
+whose content is never scanned for tags.
+"""
+
+import os
+import re
+import tempfile
+
+from sitetools.site import keep_file_mode
+
+CHUNK_SIZE = 1 << 16
+
+# Elements whose content is text up to the matching end tag
+RAW_TEXT_ELEMENTS = {'script', 'style', 'textarea', 'title', 'xmp', 'iframe', 'noembed', 'noframes', 'plaintext'}
+
+_TAG_NAME_RE = re.compile(r'[A-Za-z][^\t\n\f\r />]*')
+_SPACE_RE = re.compile(r'[\t\n\f\r /]*')
+_ATTR_NAME_RE = re.compile(r'[^\t\n\f\r />][^\t\n\f\r /=>]*')
+_ATTR_EQ_RE = re.compile(r'[\t\n\f\r ]*=[\t\n\f\r ]*')
+_UNQUOTED_RE = re.compile(r'[^\t\n\f\r >]*')
+_ATTR_RE = re.compile(r'''([^\t\n\f\r />][^\t\n\f\r /=>]*)(?:[\t\n\f\r ]*=[\t\n\f\r ]*("[^"]*"|'[^']*'|[^\t\n\f\r >]*))?''')
+
+_NEED_MORE = object()
+
+
+class Tag:
+    """A start or end tag handed to a handler
+
+    name is lowercase; raw is the exact source text of the tag.
+    before()/after() queue markup around the tag, replace() swaps the tag
+    itself (the queued markup is kept).
+    """
+
+    def __init__(self, name, raw, is_end):
+        self.name = name
+        self.raw = raw
+        self.is_end = is_end
+        self._before = []
+        self._after = []
+        self._replacement = None
+        self._attrs = None
+
+    @property
+    def attrs(self):
+        """Attributes of a start tag as a dict (values unquoted, not unescaped)"""
+        if self._attrs is None:
+            self._attrs = {}
+            if not self.is_end:
+                body = self.raw[1 + len(self.name):-1]
+                for match in _ATTR_RE.finditer(body):
+                    value = match.group(2)
+                    if value and value[0] in '"\'':
+                        value = value[1:-1]
+                    self._attrs.setdefault(match.group(1).lower(), value)
+        return self._attrs
+
+    def before(self, html):
+        self._before.append(html)
+
+    def after(self, html):
+        self._after.append(html)
+
+    def replace(self, html):
+        self._replacement = html
+
+    @property
+    def modified(self):
+        return bool(self._before or self._after or self._replacement is not None)
+
+    def render(self):
+        tag = self.raw if self._replacement is None else self._replacement
+        return ''.join(self._before) + tag + ''.join(self._after)
+
+
+class DocumentEnd:
+    """Handed to on_end() handlers once the whole input has been read"""
+
+    def __init__(self):
+        self._append = []
+
+    def append(self, html):
+        self._append.append(html)
+
+
+class HTMLRewriter:
+    """Register tag handlers, then stream a document through them"""
+
+    def __init__(self):
+        self._start_handlers = {}
+        self._end_handlers = {}
+        self._document_end = []
+        self.changed = False
+
+    def on_start_tag(self, name, handler):
+        """Call handler(tag) for every <name ...> ('*' for any tag)"""
+        self._start_handlers.setdefault(name.lower(), []).append(handler)
+        return self
+
+    def on_end_tag(self, name, handler):
+        """Call handler(tag) for every </name> ('*' for any tag)"""
+        self._end_handlers.setdefault(name.lower(), []).append(handler)
+        return self
+
+    def on_end(self, handler):
+        """Call handler(end) after the last token; end.append() adds trailing markup"""
+        self._document_end.append(handler)
+        return self
+
+    def _dispatch(self, handlers, name, raw, is_end):
+        funcs = handlers.get(name)
+        if '*' in handlers:
+            funcs = (funcs or []) + handlers['*']
+        if not funcs:
+            return None
+        tag = Tag(name, raw, is_end)
+        for func in funcs:
+            func(tag)
+        if not tag.modified:
+            return None
+        self.changed = True
+        return tag.render()
+
+    def _scan_start_tag(self, buf, pos, final):
+        """End offset of the start tag at pos, None if it is not one, _NEED_MORE if cut off"""
+        match = _TAG_NAME_RE.match(buf, pos + 1)
+        if not match:
+            return None
+        i = match.end()
+        n = len(buf)
+        while True:
+            i = _SPACE_RE.match(buf, i).end()
+            if i >= n:
+                return None if final else _NEED_MORE
+            if buf[i] == '>':
+                return i + 1
+            i = _ATTR_NAME_RE.match(buf, i).end()
+            eq = _ATTR_EQ_RE.match(buf, i)
+            if eq is None:
+                continue
+            i = eq.end()
+            if i >= n:
+                return None if final else _NEED_MORE
+            quote = buf[i]
+            if quote in '"\'':
+                close = buf.find(quote, i + 1)
+                if close == -1:
+                    return None if final else _NEED_MORE
+                i = close + 1
+            else:
+                i = _UNQUOTED_RE.match(buf, i).end()
+
+    def transform(self, chunks):
+        """Rewrite an iterable of str chunks, yielding output chunks"""
+        self.changed = False
+        buf = ''
+        raw_text_end = None     # compiled regex while inside <script> & co.
+        chunks = iter(chunks)
+        final = False
+
+        while not final:
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+            else:
+                buf += chunk
+            pos = 0             # next unscanned offset in buf
+            copied = 0          # buf[copied:pos] is unchanged source not yet yielded
+            out = []
+
+            while pos < len(buf):
+                if raw_text_end is not None:
+                    match = raw_text_end.search(buf, pos)
+                    if match is None:
+                        if not final:
+                            # Keep a tail that might hold the start of the end tag
+                            pos = max(pos, len(buf) - 16)
+                            break
+                        pos = len(buf)
+                        break
+                    pos = match.start()
+                    raw_text_end = None
+                    continue
+
+                lt = buf.find('<', pos)
+                if lt == -1:
+                    pos = len(buf)
+                    break
+                pos = lt
+
+                if buf.startswith('<!--', pos):
+                    close = buf.find('-->', pos + 4)
+                    if close == -1:
+                        if final:
+                            pos = len(buf)
+                        break
+                    pos = close + 3
+                    continue
+
+                nxt = buf[pos + 1:pos + 2]
+                if not nxt:
+                    if final:
+                        pos = len(buf)
+                    break
+
+                if nxt in '!?':
+                    close = buf.find('>', pos)
+                    if close == -1:
+                        if final:
+                            pos = len(buf)
+                        break
+                    pos = close + 1
+                    continue
+
+                if nxt == '/':
+                    match = _TAG_NAME_RE.match(buf, pos + 2)
+                    close = buf.find('>', pos)
+                    if match is None or close == -1:
+                        if close == -1 and not final:
+                            break
+                        pos += 1
+                        continue
+                    end = close + 1
+                    name = match.group().lower()
+                    rendered = self._dispatch(self._end_handlers, name, buf[pos:end], True)
+                    if rendered is not None:
+                        out.append(buf[copied:pos])
+                        out.append(rendered)
+                        copied = end
+                    pos = end
+                    continue
+
+                end = self._scan_start_tag(buf, pos, final)
+                if end is _NEED_MORE:
+                    break
+                if end is None:
+                    pos += 1
+                    continue
+
+                raw = buf[pos:end]
+                name = _TAG_NAME_RE.match(raw, 1).group().lower()
+                rendered = self._dispatch(self._start_handlers, name, raw, False)
+                if rendered is not None:
+                    out.append(buf[copied:pos])
+                    out.append(rendered)
+                    copied = end
+                pos = end
+                # Browsers ignore '/>' on non-void elements: <script/> still opens raw text
+                if name in RAW_TEXT_ELEMENTS:
+                    if name == 'plaintext':
+                        raw_text_end = re.compile(r'(?!)')
+                    else:
+                        raw_text_end = re.compile(r'</' + re.escape(name) + r'[\t\n\f\r />]', re.IGNORECASE)
+
+            out.append(buf[copied:pos])
+            buf = buf[pos:]
+            text = ''.join(out)
+            if text:
+                yield text
+
+        if buf:
+            yield buf
+
+        if self._document_end:
+            end = DocumentEnd()
+            for func in self._document_end:
+                func(end)
+            if end._append:
+                self.changed = True
+                yield ''.join(end._append)
+
+    def rewrite_string(self, text, chunk_size=CHUNK_SIZE):
+        """Rewrite a whole string (still tokenized chunk by chunk)"""
+        chunks = (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+        return ''.join(self.transform(chunks))
+
+    def rewrite_file(self, src, dst=None, chunk_size=CHUNK_SIZE):
+        """Stream src through the handlers into dst (default: src, in place)
+
+        Line endings and encoding are preserved byte for byte. The target
+        is only replaced when a handler changed something; returns True
+        in that case.
+        """
+        dst = dst or src
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dst)), suffix='.tmp')
+        try:
+            with open(src, 'r', encoding='utf-8', newline='') as fin, \
+                    os.fdopen(fd, 'w', encoding='utf-8', newline='') as fout:
+                for text in self.transform(iter(lambda: fin.read(chunk_size), '')):
+                    fout.write(text)
+            if self.changed or dst != src:
+                keep_file_mode(tmp_path, dst, src)
+                os.replace(tmp_path, dst)
+                tmp_path = None
+            return self.changed
+        finally:
+            if tmp_path is not None:
+                os.unlink(tmp_path)
+
+
+def file_contains(filepath, needle, chunk_size=CHUNK_SIZE):
+    """True if needle occurs in the file, reading it in chunks"""
+    overlap = len(needle) - 1
+    tail = ''
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            window = tail + chunk
+            if needle in window:
+                return True
+            tail = window[-overlap:] if overlap else ''
+    return False
@@ -0,0 +1,410 @@
+"""
+Declarative lede rewrite rules
+
+The lede fixers (remove-ai-phrases.py, fix-keyword-stuffing.py,
+fix-unnatural-lede.py) read their rules from lede-rules.json instead of
+hard-coding one re.sub per rule. Each ruleset there is a list of stages;
+all rules of a stage are compiled into one regex (an alternation of
+per-rule groups) and applied in a single scan. Rules whose pattern
+contains a fixed phrase are prefiltered: one trie scan finds which of
+those phrases occur, and only their rules join the combined regex, so
+adding phrase rules to a stage barely changes its cost.
+
+Rule fields:
+    name, description
+    pattern         Python regex; its groups stay local to the rule
+    flags           any of "imsx", scoped to this rule
+    replace         re template (\\1, \\g<name>) plus {table:group}, the
+                    first key of tables[table] contained in that group
+                    (or the table's "*" entry); omit for detection-only rules
+
+Stage conditions ("when"):
+    shorter_than    only if the text is shorter than N characters
+    if_unchanged    only if the earlier stages of the ruleset changed nothing
+    repeated_word   {"table", "within", "min_count"}: only if a word of the
+                    table occurs min_count times in the first `within` chars
+
+Hit counts per rule and time per stage are collected in STATS.
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+
+from sitetools.classify import KeywordMatcher
+
+RULES_PATH = Path(__file__).resolve().parent.parent / "lede-rules.json"
+
+_LOOKUP_RE = re.compile(r'\{(\w+):(\w+)\}')
+
+# Shortest literal worth prefiltering on
+MIN_LITERAL = 4
+_LITERAL_CHARS = re.compile(r"[A-Za-z0-9àèéìòùÀÈÉÌÒÙ ,;:'\"!-]")
+_ESCAPED_LITERALS = set('.,:;!?-/\'"()[]{}*+|^$ ')
+
+
+def _prefix_groups(pattern, prefix):
+    """Rename the groups of pattern (numbered and named) to prefix_N / prefix_name"""
+    out = []
+    number = 0
+    i = 0
+    n = len(pattern)
+    in_class = False
+    while i < n:
+        ch = pattern[i]
+        if ch == '\\':
+            digits = re.match(r'[1-9][0-9]?', pattern[i + 1:i + 3])
+            if digits and not in_class:
+                out.append(f'(?P={prefix}_{digits.group()})')
+                i += 1 + len(digits.group())
+            else:
+                out.append(pattern[i:i + 2])
+                i += 2
+            continue
+        if in_class:
+            if ch == ']':
+                in_class = False
+            out.append(ch)
+            i += 1
+            continue
+        if ch == '[':
+            in_class = True
+            out.append(ch)
+            i += 1
+            # A ']' right after '[' or '[^' is a literal
+            if pattern[i:i + 1] == '^':
+                out.append('^')
+                i += 1
+            if pattern[i:i + 1] == ']':
+                out.append(']')
+                i += 1
+            continue
+        if ch == '(':
+            if pattern.startswith('(?P<', i):
+                end = pattern.index('>', i)
+                out.append(f'(?P<{prefix}_{pattern[i + 4:end]}>')
+                i = end + 1
+                number += 1
+                continue
+            if pattern.startswith('(?P=', i):
+                end = pattern.index(')', i)
+                out.append(f'(?P={prefix}_{pattern[i + 4:end]})')
+                i = end + 1
+                continue
+            if not pattern.startswith('(?', i):
+                number += 1
+                out.append(f'(?P<{prefix}_{number}>')
+                i += 1
+                continue
+        out.append(ch)
+        i += 1
+    return ''.join(out)
+
+
+def _required_literal(pattern, flags):
+    """Longest plain text every match of pattern must contain (lowercased), or None
+
+    Only the top level of the pattern is considered; a pattern with a
+    top-level alternation, or verbose mode, gets no literal.
+    """
+    if 'x' in flags:
+        return None
+    runs = []
+    run = []
+    depth = 0
+    i = 0
+    n = len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == '\\':
+            nxt = pattern[i + 1:i + 2]
+            char, i = (nxt, i + 2) if nxt in _ESCAPED_LITERALS and nxt else (None, i + 2)
+        elif ch == '[':
+            # Skip the whole class, including a leading ']' and escapes
+            j = i + 1
+            if pattern[j:j + 1] == '^':
+                j += 1
+            if pattern[j:j + 1] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 2 if pattern[j] == '\\' else 1
+            char, i = None, j + 1
+        elif ch == '(':
+            depth += 1
+            char, i = None, i + 1
+        elif ch == '{':
+            close = pattern.find('}', i)
+            char, i = None, (close + 1 if close != -1 else n)
+        elif ch == ')':
+            depth -= 1
+            char, i = None, i + 1
+        elif ch == '|':
+            if depth == 0:
+                return None
+            char, i = None, i + 1
+        elif ch in '*?+':
+            char, i = None, i + 1
+        elif ch in '.^$':
+            char, i = None, i + 1
+        else:
+            char, i = ch, i + 1
+
+        # A quantified char ('u?', 'd*', 'x{2}') is not mandatory as written
+        if char is not None and depth == 0 and _LITERAL_CHARS.match(char) and pattern[i:i + 1] not in ('*', '?', '{'):
+            run.append(char)
+        else:
+            if run:
+                runs.append(''.join(run))
+            run = []
+    if run:
+        runs.append(''.join(run))
+
+    best = max(runs, key=len, default='')
+    return best.lower() if len(best) >= MIN_LITERAL else None
+
+
+def _prefix_template(template, prefix):
+    """Point \\N and \\g<...> references of a replacement template at prefixed groups"""
+    def rename(match):
+        ref = match.group(1) or match.group(2)
+        return f'\\g<{prefix}_{ref}>'
+    return re.sub(r'\\(?:([1-9][0-9]?)|g<(\w+)>)', rename, template)
+
+
+class Rule:
+    """One pattern of a stage, with its replacement"""
+
+    def __init__(self, spec, prefix, tables):
+        self.name = spec['name']
+        self.prefix = prefix
+        self.flags = spec.get('flags', '')
+        body = _prefix_groups(spec['pattern'], prefix)
+        scoped = f'(?{self.flags}:{body})' if self.flags else f'(?:{body})'
+        self.pattern = f'(?P<{prefix}>{scoped})'
+        self.replace = spec.get('replace')
+        self.tables = tables
+        self.literal = _required_literal(spec['pattern'], self.flags)
+
+        # Validate on its own so a bad rule is reported by name
+        try:
+            re.compile(self.pattern)
+        except re.error as e:
+            raise ValueError(f"Lede rule {self.name!r}: invalid pattern: {e}") from None
+
+        self._parts = None
+        if self.replace is not None:
+            # Literal template pieces alternate with (table, group) lookups
+            self._parts = []
+            pos = 0
+            for lookup in _LOOKUP_RE.finditer(self.replace):
+                self._parts.append(_prefix_template(self.replace[pos:lookup.start()], prefix))
+                self._parts.append((lookup.group(1), f'{prefix}_{lookup.group(2)}'))
+                pos = lookup.end()
+            self._parts.append(_prefix_template(self.replace[pos:], prefix))
+
+    def lookup(self, table_name, value):
+        table = self.tables[table_name]
+        value = value.lower().strip()
+        for key, entry in table.items():
+            if key != '*' and key in value:
+                return entry
+        return table.get('*', '')
+
+    def expand(self, match):
+        out = []
+        for part in self._parts:
+            if isinstance(part, tuple):
+                out.append(self.lookup(part[0], match.group(part[1]) or ''))
+            elif part:
+                out.append(match.expand(part))
+        return ''.join(out)
+
+
+class Stage:
+    """Rules compiled into one regex and applied in one scan"""
+
+    def __init__(self, ruleset, spec, tables):
+        self.name = spec['name']
+        self.when = spec.get('when', {})
+        self.tables = tables
+        self.rules = [Rule(rule, f'r{i}', tables) for i, rule in enumerate(spec['rules'])]
+        self.by_group = {rule.prefix: rule for rule in self.rules}
+        self.regex = re.compile('|'.join(rule.pattern for rule in self.rules))
+        self.key = f'{ruleset}/{self.name}'
+
+        # Rules with a required literal only join the matcher when one
+        # trie scan of the text finds that literal, so phrase rules that
+        # cannot match cost nothing
+        literals = [rule.literal for rule in self.rules if rule.literal]
+        self.prefilter = KeywordMatcher(literals) if literals else None
+        self._regexes = {}
+
+    def regex_for(self, text):
+        """Combined regex of the rules that can match text (None if none can)"""
+        if self.prefilter is None:
+            return self.regex
+        present = {keyword for _pos, keyword in self.prefilter.finditer(text.lower())}
+        candidates = tuple(i for i, rule in enumerate(self.rules) if rule.literal is None or rule.literal in present)
+        if not candidates:
+            return None
+        if len(candidates) == len(self.rules):
+            return self.regex
+        if candidates not in self._regexes:
+            self._regexes[candidates] = re.compile('|'.join(self.rules[i].pattern for i in candidates))
+        return self._regexes[candidates]
+
+    def applies(self, text, changed):
+        if 'shorter_than' in self.when and len(text) >= self.when['shorter_than']:
+            return False
+        if self.when.get('if_unchanged') and changed:
+            return False
+        repeated = self.when.get('repeated_word')
+        if repeated:
+            head = text[:repeated['within']].lower()
+            if not any(head.count(word.lower()) >= repeated['min_count'] for word in self.tables[repeated['table']]):
+                return False
+        return True
+
+    def sub(self, text, stats):
+        def dispatch(match):
+            rule = self.by_group[match.lastgroup]
+            stats.hit(self.key, rule.name)
+            return rule.expand(match)
+
+        start = time.perf_counter()
+        regex = self.regex_for(text)
+        result = regex.sub(dispatch, text) if regex else text
+        stats.timed(self.key, time.perf_counter() - start)
+        return result
+
+    def finditer(self, text, stats):
+        """Yield (rule, match) for every non-overlapping match"""
+        start = time.perf_counter()
+        regex = self.regex_for(text)
+        for match in (regex.finditer(text) if regex else ()):
+            rule = self.by_group[match.lastgroup]
+            stats.hit(self.key, rule.name)
+            yield rule, match
+        stats.timed(self.key, time.perf_counter() - start)
+
+
+class RuleSet:
+    """The stages of one fixer, in order"""
+
+    def __init__(self, name, stages, tables):
+        self.name = name
+        self.stages = [Stage(name, spec, tables) for spec in stages]
+
+    def apply(self, text, stats=None):
+        """Run every applicable stage over text"""
+        stats = STATS if stats is None else stats
+        original = text
+        for stage in self.stages:
+            if stage.applies(text, text != original):
+                text = stage.sub(text, stats)
+        return text
+
+    def search(self, text, stats=None):
+        """Name of the first detection rule that matches text, else None"""
+        stats = STATS if stats is None else stats
+        for stage in self.stages:
+            start = time.perf_counter()
+            regex = stage.regex_for(text)
+            match = regex.search(text) if regex else None
+            stats.timed(stage.key, time.perf_counter() - start)
+            if match:
+                rule = stage.by_group[match.lastgroup]
+                stats.hit(stage.key, rule.name)
+                return rule.name
+        return None
+
+    def finditer(self, text, stats=None):
+        """(rule, match) pairs of every stage, for span edits over a whole page"""
+        stats = STATS if stats is None else stats
+        for stage in self.stages:
+            yield from stage.finditer(text, stats)
+
+
+class RuleStats:
+    """Hits per rule and time per stage; mergeable across worker processes"""
+
+    def __init__(self):
+        self.data = {}
+
+    def _stage(self, key):
+        return self.data.setdefault(key, {'calls': 0, 'seconds': 0.0, 'hits': {}})
+
+    def hit(self, key, rule_name):
+        hits = self._stage(key)['hits']
+        hits[rule_name] = hits.get(rule_name, 0) + 1
+
+    def timed(self, key, seconds):
+        stage = self._stage(key)
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+
+    def merge(self, data):
+        for key, other in data.items():
+            stage = self._stage(key)
+            stage['calls'] += other['calls']
+            stage['seconds'] += other['seconds']
+            for rule_name, count in other['hits'].items():
+                stage['hits'][rule_name] = stage['hits'].get(rule_name, 0) + count
+
+    def report(self):
+        """Lines for the end-of-run summary"""
+        lines = []
+        for key in sorted(self.data):
+            stage = self.data[key]
+            lines.append(f"  • {key}: {stage['calls']} runs, {stage['seconds'] * 1000:.1f} ms")
+            for rule_name, count in sorted(stage['hits'].items(), key=lambda item: -item[1]):
+                lines.append(f"      {count:>5}  {rule_name}")
+        return lines
+
+
+STATS = RuleStats()
+
+_RULES = {}
+
+
+def load_rules(path=RULES_PATH):
+    """Parsed lede-rules.json (cached per path)"""
+    path = Path(path)
+    if path not in _RULES:
+        with open(path, 'r', encoding='utf-8') as f:
+            _RULES[path] = json.load(f)
+    return _RULES[path]
+
+
+def get_table(name, path=RULES_PATH):
+    return load_rules(path)['tables'][name]
+
+
+_RULESETS = {}
+
+
+def get_ruleset(name, path=RULES_PATH):
+    """Compiled ruleset by name (compiled once per process)"""
+    key = (Path(path), name)
+    if key not in _RULESETS:
+        rules = load_rules(path)
+        if name not in rules['rulesets']:
+            raise KeyError(f"Unknown lede ruleset: {name} (available: {', '.join(rules['rulesets'])})")
+        _RULESETS[key] = RuleSet(name, rules['rulesets'][name], rules['tables'])
+    return _RULESETS[key]
+
+
+def merge_stats(filepath, data):
+    """Pipeline finalize hook: fold a page's rule stats into STATS"""
+    STATS.merge(data)
+
+
+def print_report(stats=None):
+    stats = STATS if stats is None else stats
+    if not stats.data:
+        return
+    print()
+    print("Lede rules (hits per rule, time per stage):")
+    for line in stats.report():
+        print(line)
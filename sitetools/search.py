@@ -0,0 +1,140 @@
+"""
+Prebuilt inverted index for the site search modal
+
+The modal in assets/js/main.js used to download guides_it.json and
+guides_en.json whole and scan every title and excerpt on each key
+press. build_index() turns the same records into:
+
+    index.json          the entry point: number of documents, the areas,
+                        topics and languages string tables and the URLs
+                        of the files below
+    <ab>.<hash>.json    postings of every term starting with "ab":
+                        {"term": [posting, ...]}
+    docs-<n>.<hash>.json
+                        document table of documents n*DOC_CHUNK onwards,
+                        [url, title, excerpt, area, topic, lang] each
+                        (the last three as indexes into the string
+                        tables), fetched only for the results shown
+
+Terms are accent-folded and lowercased (fold(); "Attività" and
+"attivita" are the same term) and split on anything that is not a
+letter or digit. A posting is doc_id * 2 + 1 when the term is in the
+title, doc_id * 2 when it is only in the excerpt, area or topic, so the
+client can rank title hits first without a second list.
+
+A query term of at least SHARD_PREFIX characters needs exactly one
+shard, and prefix matching ("ristr" -> "ristrutturazione") stays inside
+it. Shards and document files carry a hash of their content in the
+name (like sitetools/assets.py), so they can be cached for good;
+index.json keeps its stable name.
+"""
+
+import json
+import re
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+from sitetools.assets import remove_unlisted, write_hashed_json
+from sitetools.site import ROOT_DIR
+
+__all__ = ['SEARCH_DIR', 'INDEX_PATH', 'INDEX_URL', 'fold', 'terms', 'build_index',
+           'write_index', 'load_index', 'index_files']
+
+SEARCH_DIR = ROOT_DIR / "assets" / "search"
+INDEX_PATH = SEARCH_DIR / "index.json"
+SEARCH_URL = '/assets/search/'
+INDEX_URL = SEARCH_URL + INDEX_PATH.name
+
+# Characters of a term that pick its shard; shorter terms are not indexed
+SHARD_PREFIX = 2
+
+# Documents per document table file
+DOC_CHUNK = 32
+
+# Area shown when a record has no province
+DEFAULT_AREA = {'it': 'Sicilia', 'en': 'Sicily'}
+
+_TERM_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Lowercase text without accents (same as fold() in main.js)"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def terms(text):
+    """Indexable terms of text, in order, without duplicates"""
+    return list(dict.fromkeys(t for t in _TERM_RE.findall(fold(text)) if len(t) >= SHARD_PREFIX))
+
+
+def build_index(records):
+    """(index, {shard key: shard}, [document table chunk, ...]) for the records"""
+    tables = {'areas': [], 'topics': [], 'langs': []}
+    docs = []
+    postings = defaultdict(dict)
+
+    def intern(table, value):
+        values = tables[table]
+        if value not in values:
+            values.append(value)
+        return values.index(value)
+
+    for doc_id, record in enumerate(records):
+        lang = record.get('lang') or 'it'
+        area = record.get('province') or DEFAULT_AREA.get(lang, '')
+        topic = record.get('categoryLabel') or record.get('category') or ''
+        docs.append([record['url'], record['title'], record.get('excerpt') or '',
+                     intern('areas', area), intern('topics', topic), intern('langs', lang)])
+
+        for term in terms(record['title']):
+            postings[term][doc_id] = 1
+        for term in terms(' '.join((record.get('excerpt') or '', area, topic))):
+            postings[term].setdefault(doc_id, 0)
+
+    shards = defaultdict(dict)
+    for term in sorted(postings):
+        shards[term[:SHARD_PREFIX]][term] = [doc_id * 2 + in_title for doc_id, in_title in sorted(postings[term].items())]
+
+    chunks = [docs[start:start + DOC_CHUNK] for start in range(0, len(docs), DOC_CHUNK)]
+
+    index = {'count': len(docs), 'prefix': SHARD_PREFIX, 'chunk': DOC_CHUNK, **tables}
+    return index, dict(shards), chunks
+
+
+def write_index(records, directory=SEARCH_DIR):
+    """Write the index files for records; returns (index.json path, files written, stale files removed)
+
+    Shards and document files of an earlier build that are no longer listed are deleted.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    index, shards, chunks = build_index(records)
+
+    index['shards'] = {key: SEARCH_URL + write_hashed_json(directory, f"{key}.json", shard)
+                       for key, shard in shards.items()}
+    index['docs'] = [SEARCH_URL + write_hashed_json(directory, f"docs-{n}.json", chunk)
+                     for n, chunk in enumerate(chunks)]
+
+    index_path = directory / INDEX_PATH.name
+    content = json.dumps(index, ensure_ascii=False, separators=(',', ':'), sort_keys=True) + '\n'
+    if not index_path.is_file() or index_path.read_text(encoding='utf-8') != content:
+        index_path.write_text(content, encoding='utf-8')
+
+    current = {index_path.name} | {url.rsplit('/', 1)[1] for url in index_files(index)}
+    return index_path, len(current), remove_unlisted(directory, current)
+
+
+def load_index(path=INDEX_PATH):
+    """Contents of index.json, or {} before the first build"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def index_files(index):
+    """URLs of the content-hashed files index.json points at"""
+    return list(index.get('shards', {}).values()) + list(index.get('docs', []))
@@ -0,0 +1,117 @@
+"""
+Page discovery for the live site tree
+"""
+
+import os
+import re
+import shutil
+from pathlib import Path
+
+ROOT_DIR = Path(".")
+
+# Directories that are never part of the published site
+EXCLUDED_DIRS = {'backup-original', '.git', '.build-cache', '__pycache__', 'node_modules'}
+
+# Mode of a page written from scratch, before the umask
+PAGE_MODE = 0o644
+
+# Sections that hold long-form guide articles
+GUIDE_SECTIONS = ('guide', 'sicilia')
+
+# Lede paragraph of a guide article; group 1 is its text
+LEDE_RE = re.compile(r'<p class="lede">([^<]+)</p>')
+
+# The nine provinces; guide/ and province/ have one directory per province
+PROVINCES = ('agrigento', 'caltanissetta', 'catania', 'enna', 'messina', 'palermo', 'ragusa', 'siracusa', 'trapani')
+
+# Public origin of the site (CNAME); absolute URLs in sitemaps
+SITE_URL = 'https://architettisicilia.it'
+
+# Site homepage (the English one lives in en/)
+HOMEPAGE = 'index.html'
+
+# Page layouts, as returned by page_template()
+TEMPLATES = ('home', 'guide', 'province', 'servizi', 'studio-4e', 'page')
+
+
+def page_section(filepath, root=ROOT_DIR):
+    """Return the top-level section of a page ('guide', 'en', ...) or '' for root pages"""
+    parts = Path(filepath).relative_to(root).parts
+    return parts[0] if len(parts) > 1 else ''
+
+
+def page_province(filepath, root=ROOT_DIR):
+    """Return the province of a page under guide/<province>/ or province/<province>/, else None"""
+    parts = Path(filepath).relative_to(root).parts
+    if len(parts) > 2 and parts[1] in PROVINCES:
+        return parts[1]
+    return None
+
+
+def page_language(filepath, root=ROOT_DIR):
+    """Language implied by a page's location: en/ is English, everything else Italian"""
+    return 'en' if page_section(filepath, root) == 'en' else 'it'
+
+
+def is_homepage(filepath, root=ROOT_DIR):
+    return Path(filepath).relative_to(root).as_posix() == HOMEPAGE
+
+
+def page_template(filepath, root=ROOT_DIR):
+    """Layout a page is built from (one of TEMPLATES)"""
+    parts = Path(filepath).relative_to(root).parts
+    section = parts[0] if len(parts) > 1 else ''
+    if parts in ((HOMEPAGE,), ('en', HOMEPAGE)):
+        return 'home'
+    if section in ('servizi', 'studio-4e'):
+        return section
+    if section in GUIDE_SECTIONS + ('province',) and (parts[-1] == 'index.html' or section == 'province'):
+        return 'province'
+    if section in GUIDE_SECTIONS + ('en',):
+        return 'guide'
+    return 'page'
+
+
+def walk_order(relpath):
+    """Sort key giving the order iter_html_files() yields pages in (files before subdirectories)"""
+    parts = Path(relpath).parts
+    return parts[:-1], parts[-1]
+
+
+def iter_html_files(root=ROOT_DIR, sections=None):
+    """Yield every live HTML page, pruning backups and tooling directories
+
+    sections limits the walk to the given top-level directories.
+    Root-level pages are included only when sections is None.
+    """
+    root = Path(root)
+
+    if sections is None:
+        tops = [root]
+    else:
+        tops = [root / section for section in sections]
+
+    for top in tops:
+        if not top.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+            for filename in sorted(filenames):
+                if filename.endswith('.html'):
+                    yield Path(dirpath) / filename
+
+
+def keep_file_mode(tmp_path, *sources):
+    """Give a temporary file the mode of the first existing source, else PAGE_MODE minus the umask
+
+    tempfile.mkstemp() creates files as 0600: without this, the
+    os.replace() that follows would leave the page unreadable by the
+    web server.
+    """
+    for source in sources:
+        if source is not None and os.path.exists(source):
+            shutil.copymode(source, tmp_path)
+            return
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp_path, PAGE_MODE & ~umask)
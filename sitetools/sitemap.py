@@ -0,0 +1,167 @@
+"""
+Sitemap index with one gzipped sitemap per section
+
+write_sitemaps() replaces the single hand-kept sitemap.xml with:
+
+    sitemap.xml                 sitemap index (robots.txt points at it)
+    sitemap-<chunk>.xml.gz      the pages of one chunk: guide, sicilia,
+                                en, province, servizi, and pages for the
+                                rest (home, studio-4e, ...); over
+                                MAX_URLS a chunk continues in
+                                sitemap-<chunk>-2.xml.gz
+
+Chunks sit at the site root: a sitemap may only list URLs under its
+own directory. An index.html page is listed as its directory URL, the
+form internal links use.
+
+Every URL carries a <lastmod>: the date its content last changed. The
+content is the page's title and the text of its <main> (content_hash()),
+so a template-wide change (scripts, styles, CTA markup) does not touch
+every date. sitemap-lastmod.json keeps, per URL, the page hash from the
+catalogue, the content hash and the date; it is committed with the
+sitemaps so a fresh checkout keeps the dates. A page whose file is
+unchanged is not read again.
+
+Files are only rewritten when their bytes change (gzip with mtime=0),
+and chunks of an earlier build that are no longer listed are deleted.
+"""
+
+import gzip
+import hashlib
+import html
+import json
+import re
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from sitetools.site import ROOT_DIR, SITE_URL
+
+__all__ = ['SITEMAP_PATH', 'LASTMOD_PATH', 'SITEMAP_SECTIONS', 'page_url', 'chunk_of', 'content_hash',
+           'load_lastmod', 'save_lastmod', 'render_urlset', 'render_index', 'write_sitemaps']
+
+SITEMAP_PATH = ROOT_DIR / "sitemap.xml"
+LASTMOD_PATH = ROOT_DIR / "sitemap-lastmod.json"
+
+# Sections with a sitemap of their own; root pages and other sections go in OTHER_CHUNK
+SITEMAP_SECTIONS = ('guide', 'sicilia', 'en', 'province', 'servizi')
+OTHER_CHUNK = 'pages'
+
+# Protocol limit of URLs per sitemap
+MAX_URLS = 50000
+
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+_MAIN_RE = re.compile(r'<main\b[^>]*>(.*)</main>', re.S | re.I)
+_BODY_RE = re.compile(r'<body\b[^>]*>(.*)</body>', re.S | re.I)
+_HIDDEN_RE = re.compile(r'<(script|style|template|noscript)\b.*?</\1\s*>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def page_url(relpath):
+    """URL path of a page: guide/palermo/index.html -> /guide/palermo/"""
+    path = '/' + relpath
+    return path[:-len('index.html')] if path.endswith('/index.html') else path
+
+
+def chunk_of(section):
+    return section if section in SITEMAP_SECTIONS else OTHER_CHUNK
+
+
+def _text(markup):
+    markup = _HIDDEN_RE.sub(' ', markup)
+    return _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', markup))).strip()
+
+
+def content_hash(filepath):
+    """Hash of a page's title and main text (runs in worker processes with --jobs)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        page = f.read()
+    title = _TITLE_RE.search(page)
+    main = _MAIN_RE.search(page) or _BODY_RE.search(page)
+    text = _text(title.group(1) if title else '') + '\n' + _text(main.group(1) if main else page)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def load_lastmod(path=LASTMOD_PATH):
+    """{url: [page hash, content hash, date]}, or {} before the first build"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_lastmod(state, path=LASTMOD_PATH):
+    """Write state one URL per line (readable diffs); returns True if the file changed"""
+    lines = [f"  {json.dumps(url)}: {json.dumps(state[url])}" for url in sorted(state)]
+    content = '{\n' + ',\n'.join(lines) + '\n}\n' if lines else '{}\n'
+    return _write_if_changed(Path(path), content.encode('utf-8'))
+
+
+def render_urlset(entries):
+    """<urlset> for [(url path, lastmod)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{XMLNS}">']
+    for url, lastmod in entries:
+        lines.append(f'  <url><loc>{escape(SITE_URL + url)}</loc><lastmod>{lastmod}</lastmod></url>')
+    lines.append('</urlset>')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def render_index(sitemaps):
+    """<sitemapindex> for [(file name, lastmod)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{XMLNS}">']
+    for name, lastmod in sitemaps:
+        lines.append(f'  <sitemap><loc>{escape(SITE_URL + "/" + name)}</loc><lastmod>{lastmod}</lastmod></sitemap>')
+    lines.append('</sitemapindex>')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _write_if_changed(path, data):
+    if path.is_file() and path.read_bytes() == data:
+        return False
+    path.write_bytes(data)
+    return True
+
+
+def _gzip_content(path):
+    """Uncompressed bytes of an existing .gz file, or None"""
+    try:
+        return gzip.decompress(path.read_bytes())
+    except (FileNotFoundError, OSError, EOFError):
+        return None
+
+
+def write_sitemaps(chunks, directory=ROOT_DIR):
+    """Write the index and the gzipped chunks for {chunk: [(url path, lastmod)]}
+
+    Returns ([(file name, urls)], files changed, stale chunks removed).
+    """
+    directory = Path(directory)
+    written = []
+    changed = 0
+    listed = []
+    for chunk, entries in chunks.items():
+        parts = [entries[start:start + MAX_URLS] for start in range(0, len(entries), MAX_URLS)]
+        for n, part in enumerate(parts, 1):
+            name = f"sitemap-{chunk}.xml.gz" if n == 1 else f"sitemap-{chunk}-{n}.xml.gz"
+            data = render_urlset(part)
+            path = directory / name
+            # Compare the XML, not the .gz bytes: another gzip build may compress differently
+            if _gzip_content(path) != data:
+                path.write_bytes(gzip.compress(data, 9, mtime=0))
+                changed += 1
+            written.append((name, len(part)))
+            listed.append((name, max(lastmod for _, lastmod in part)))
+
+    if _write_if_changed(directory / SITEMAP_PATH.name, render_index(listed)):
+        changed += 1
+
+    keep = {name for name, _ in written}
+    removed = []
+    for path in sorted(directory.glob('sitemap-*.xml.gz')):
+        if path.name not in keep:
+            path.unlink()
+            removed.append(path.name)
+    return written, changed, removed
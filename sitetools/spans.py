@@ -0,0 +1,94 @@
+"""
+Span edits for the regex-based text fixers
+
+Instead of building a new string per rule (re.sub over the whole page,
+content.replace(old, new) which also hits identical text elsewhere), a
+fixer records (offset, length, replacement) edits against the text it
+searched and applies them all at once:
+
+    edits = EditList(content)
+    match = LEDE_RE.search(content)
+    edits.replace_match(match, new_lede, group=1, source='lede')
+    content = edits.apply()
+
+apply() splices the edits in one linear pass. Edits that overlap an
+earlier-recorded one are not applied; they are kept in edits.conflicts
+so the fixer can report them.
+"""
+
+import bisect
+from collections import namedtuple
+
+Edit = namedtuple('Edit', 'offset length replacement source')
+
+
+def _overlaps(a, b):
+    """Do spans (offset, end, ...) a and b touch the same text?"""
+    if a[0] == a[1] or b[0] == b[1]:
+        # An insertion clashes with an edit around it, or another insertion at the same point
+        if a[0] == a[1] and b[0] == b[1]:
+            return a[0] == b[0]
+        return b[0] < a[0] < b[1] or a[0] < b[0] < a[1]
+    return a[0] < b[1] and b[0] < a[1]
+
+
+class EditList:
+    """Edits recorded against one text, applied together"""
+
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+        self.conflicts = []
+
+    def __len__(self):
+        return len(self.edits)
+
+    def replace(self, offset, length, replacement, source=None):
+        """Record: replace text[offset:offset + length] with replacement"""
+        if offset < 0 or length < 0 or offset + length > len(self.text):
+            raise ValueError(f"Edit {offset}+{length} outside text of length {len(self.text)}")
+        if self.text[offset:offset + length] != replacement:
+            self.edits.append(Edit(offset, length, replacement, source))
+
+    def replace_match(self, match, replacement, group=0, source=None, base=0):
+        """Record: replace a match group; base is the offset of the string the match was made on"""
+        start, end = match.span(group)
+        self.replace(base + start, end - start, replacement, source)
+
+    def apply(self):
+        """Return the edited text; overlapping edits go to self.conflicts"""
+        if not self.edits:
+            return self.text
+
+        # Accept edits in recording order, so an earlier edit wins a conflict
+        accepted = []       # (offset, end, index), sorted, never overlapping
+        self.conflicts = []
+        for index, edit in enumerate(self.edits):
+            span = (edit.offset, edit.offset + edit.length, index)
+            at = bisect.bisect_left(accepted, span)
+            clash = None
+            for other in accepted[max(at - 1, 0):at + 2]:
+                if _overlaps(span, other):
+                    clash = other
+                    break
+            if clash is None:
+                accepted.insert(at, span)
+            else:
+                self.conflicts.append((self.edits[clash[2]], edit))
+
+        parts = []
+        pos = 0
+        for offset, end, index in accepted:
+            parts.append(self.text[pos:offset])
+            parts.append(self.edits[index].replacement)
+            pos = end
+        parts.append(self.text[pos:])
+        return ''.join(parts)
+
+    def describe_conflicts(self):
+        """One line per dropped edit, for the fixer's report"""
+        lines = []
+        for kept, dropped in self.conflicts:
+            lines.append(f"Overlapping edit at {dropped.offset} ({dropped.source or '?'}) "
+                         f"skipped, conflicts with {kept.source or '?'} at {kept.offset}")
+        return lines